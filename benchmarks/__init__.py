@@ -0,0 +1 @@
+"""Offline benchmarks of looker_loader on synthetic warehouses, see benchmarks/run.py"""
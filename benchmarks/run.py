@@ -0,0 +1,248 @@
+"""
+    Benchmark the stages of a looker_loader run on a synthetic warehouse, fully offline.
+
+    Every stage runs on its own over all tables: parse (_parse_schema), mixturize, generate,
+    convert (convert_to_lkml) and write. Timings are the best of --repeat runs after a warm-up run, with the garbage
+    collector paused like timeit does, peak memory is measured in a separate run with tracemalloc. Results can be stored as a baseline in benchmarks/baselines,
+    and compared against it with --check, which fails on a regression larger than --tolerance.
+
+        python -m benchmarks.run small nested --check
+        python -m benchmarks.run --save-baseline
+        python -m benchmarks.run --tables 50 --columns 200 --depth 2 --recipes 30
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from dataclasses import asdict, replace
+
+from benchmarks.warehouse import SCENARIOS, Scenario, generate_cookbook, generate_warehouse
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.generator.lookml import LookmlGenerator
+from looker_loader.models.config import DatasetConfig
+from looker_loader.models.recipe import CookBook
+from looker_loader.tools.lkml_converter import convert_to_lkml
+from looker_loader.tools.recipe_mixer import RecipeMixer
+from looker_loader.utils import write_lookml_file
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+STAGES = ["parse", "mixturize", "generate", "convert", "write"]
+# differences below these are noise on millisecond stages, never reported as regressions
+NOISE_FLOOR = {"seconds": 0.02, "peak_mb": 1.0}
+# nor are differences below this share of the whole baseline run, summed over its stages
+RELATIVE_NOISE_FLOOR = 0.05
+
+
+def _stages(scenario: Scenario, output_dir: str):
+    """The stages of a run as (name, function) pairs, each function takes and returns the data between stages"""
+    tables = generate_warehouse(scenario)
+    cookbook = CookBook(**generate_cookbook(scenario))
+    config = DatasetConfig(explore=True)
+    database = BigQueryDatabase()
+    generator = LookmlGenerator(None)
+    state = {}
+
+    def parse(_):
+        return [database._parse_schema(table) for table in tables]
+
+    def mixturize(schemas):
+        # a new mixer per run, so the mixture cache starts cold like a real run
+        mixer = RecipeMixer(cookbook)
+        return [mixer.mixturize(schema, config) for schema in schemas]
+
+    def generate(mixtures):
+        return [generator.generate(model=mixture, config=config) for mixture in mixtures]
+
+    def convert(generated):
+        return [(f"tbl_{i}.view.lkml", convert_to_lkml(views, explore)) for i, (views, explore) in enumerate(generated)]
+
+    def write(contents):
+        for file_path, text in contents:
+            write_lookml_file(output_dir=output_dir, file_path=file_path, contents=text)
+        state["bytes"] = sum(len(text.encode("utf-8")) for _, text in contents)
+        state["views"] = sum(text.count("\nview: ") + text.startswith("view: ") for _, text in contents)
+        return contents
+
+    return [("parse", parse), ("mixturize", mixturize), ("generate", generate), ("convert", convert), ("write", write)], state
+
+
+def _count_fields(schemas) -> int:
+    def count(fields):
+        return sum(1 + count(f.fields or []) for f in fields)
+    return sum(count(schema.fields) for schema in schemas)
+
+
+def run_scenario(scenario: Scenario, repeat: int = 3) -> dict:
+    """Run a scenario, returns the timings and peak memory of every stage"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        stages, state = _stages(scenario, output_dir)
+
+        seconds = {name: float("inf") for name, _ in stages}
+        # the first run warms up the module level caches, like compiled templates, and is not counted
+        for run in range(repeat + 1):
+            data = None
+            for name, stage in stages:
+                # like timeit, a collection of the garbage of earlier stages does not land in the timing of a stage
+                gc.collect()
+                gc.disable()
+                try:
+                    start = time.perf_counter()
+                    data = stage(data)
+                    elapsed = time.perf_counter() - start
+                finally:
+                    gc.enable()
+                if run:
+                    seconds[name] = min(seconds[name], elapsed)
+
+        peak_mb = {}
+        data = None
+        fields = 0
+        tracemalloc.start()
+        try:
+            for name, stage in stages:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                data = stage(data)
+                _, peak = tracemalloc.get_traced_memory()
+                peak_mb[name] = round((peak - before) / 1e6, 3)
+                if name == "parse":
+                    fields = _count_fields(data)
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "scenario": asdict(scenario),
+        "python": platform.python_version(),
+        "counts": {"tables": scenario.tables, "fields": fields, "views": state["views"], "bytes": state["bytes"]},
+        "stages": {
+            name: {"seconds": round(seconds[name], 6), "peak_mb": peak_mb[name]}
+            for name in STAGES
+        },
+        "total_seconds": round(sum(seconds.values()), 6),
+    }
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def load_baseline(name: str):
+    try:
+        with open(baseline_path(name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(result: dict):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(result["scenario"]["name"]), "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of a result against its baseline, as messages"""
+    regressions = []
+    if result["counts"] != baseline["counts"]:
+        regressions.append(f"output changed: {baseline['counts']} -> {result['counts']}")
+    noise_floor = {
+        metric: max(floor, RELATIVE_NOISE_FLOOR * sum(stage[metric] for stage in baseline["stages"].values()))
+        for metric, floor in NOISE_FLOOR.items()
+    }
+    for stage in STAGES:
+        current, base = result["stages"][stage], baseline["stages"].get(stage)
+        if base is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if (current[metric] > base[metric] * (1 + tolerance) and
+                current[metric] - base[metric] > noise_floor[metric]):
+                regressions.append(
+                    f"{stage} {metric}: {base[metric]} -> {current[metric]} "
+                    f"(+{(current[metric] / base[metric] - 1) * 100 if base[metric] else 100:.0f}%)"
+                )
+    return regressions
+
+
+def _report(result: dict, baseline=None):
+    name = result["scenario"]["name"]
+    counts = result["counts"]
+    print(f"\n{name}: {counts['tables']} tables, {counts['fields']} fields, {counts['views']} views, {counts['bytes']} bytes")
+    print(f"  {'stage':<10} {'seconds':>10} {'peak MB':>10} {'baseline s':>12} {'change':>8}")
+    for stage in STAGES:
+        current = result["stages"][stage]
+        base = baseline["stages"].get(stage) if baseline else None
+        base_seconds = f"{base['seconds']:.4f}" if base else "-"
+        change = f"{(current['seconds'] / base['seconds'] - 1) * 100:+.0f}%" if base and base["seconds"] else "-"
+        print(f"  {stage:<10} {current['seconds']:>10.4f} {current['peak_mb']:>10.2f} {base_seconds:>12} {change:>8}")
+    print(f"  {'total':<10} {result['total_seconds']:>10.4f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark looker_loader on a synthetic warehouse")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run, of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, the best is kept")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baselines")
+    parser.add_argument("--check", action="store_true", help="Exit with an error on a regression against the baselines")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown or memory growth, 0.5 is 50%%")
+    parser.add_argument("--json", help="Write the results to this file")
+    custom = parser.add_argument_group("custom scenario, replaces the named scenarios")
+    custom.add_argument("--tables", type=int)
+    custom.add_argument("--columns", type=int)
+    custom.add_argument("--depth", type=int)
+    custom.add_argument("--repeated", type=float, help="Share of repeated columns")
+    custom.add_argument("--records", type=float, help="Share of record columns")
+    custom.add_argument("--recipes", type=int)
+    custom.add_argument("--seed", type=int)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # invalid value_format_names and similar warnings are expected on synthetic data
+    warnings.simplefilter("ignore")
+
+    overrides = {
+        key: getattr(args, key)
+        for key in ("tables", "columns", "depth", "repeated", "records", "recipes", "seed")
+        if getattr(args, key) is not None
+    }
+    if overrides:
+        scenarios = [replace(Scenario("custom"), **overrides)]
+    else:
+        unknown = [name for name in args.scenarios if name not in SCENARIOS]
+        if unknown:
+            print(f"Unknown scenarios: {', '.join(unknown)}", file=sys.stderr)
+            return 2
+        scenarios = [SCENARIOS[name] for name in (args.scenarios or SCENARIOS)]
+
+    results = []
+    failed = False
+    for scenario in scenarios:
+        result = run_scenario(scenario, repeat=args.repeat)
+        results.append(result)
+        baseline = None if overrides else load_baseline(scenario.name)
+        _report(result, baseline)
+        if args.save_baseline and not overrides:
+            save_baseline(result)
+        elif args.check and baseline is not None:
+            regressions = compare(result, baseline, args.tolerance)
+            for regression in regressions:
+                print(f"  REGRESSION {regression}")
+            failed = failed or bool(regressions)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
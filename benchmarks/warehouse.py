@@ -0,0 +1,108 @@
+"""
+    Synthetic BigQuery warehouse for the benchmarks.
+
+    Tables are generated as tables.get json, the same shape BigQueryDatabase fetches,
+    and recipes as a cookbook dict. Everything is seeded, so a scenario always produces the same warehouse.
+"""
+
+import random
+from dataclasses import dataclass
+
+PRIMITIVE_TYPES = ["STRING", "INTEGER", "FLOAT", "NUMERIC", "BOOLEAN", "DATE", "TIMESTAMP", "DATETIME"]
+NAME_PARTS = ["customer", "order", "amount", "price", "status", "created", "updated", "country", "event", "session"]
+NAME_SUFFIXES = ["_id", "_at", "_date", "_usd", "_count", "_code", "", "_name"]
+
+
+@dataclass
+class Scenario:
+    """The shape of a synthetic warehouse"""
+    name: str
+    tables: int = 20
+    columns: int = 50
+    depth: int = 1
+    repeated: float = 0.1
+    records: float = 0.1
+    recipes: int = 10
+    seed: int = 0
+
+
+# scenarios with a stored baseline in benchmarks/baselines
+SCENARIOS = {
+    "small": Scenario("small", tables=5, columns=20, depth=1, recipes=5),
+    "wide": Scenario("wide", tables=10, columns=400, depth=1, recipes=20),
+    "nested": Scenario("nested", tables=20, columns=60, depth=3, repeated=0.25, records=0.3, recipes=15),
+    "many": Scenario("many", tables=200, columns=30, depth=1, recipes=10),
+}
+
+
+def _column_name(rng: random.Random, i: int) -> str:
+    return f"{rng.choice(NAME_PARTS)}{rng.choice(NAME_SUFFIXES)}_{i}"
+
+
+def _fields(rng: random.Random, scenario: Scenario, count: int, depth: int) -> list[dict]:
+    fields = []
+    for i in range(count):
+        mode = "REPEATED" if rng.random() < scenario.repeated else rng.choice(["NULLABLE", "REQUIRED"])
+        if depth < scenario.depth and rng.random() < scenario.records:
+            field = {
+                "name": _column_name(rng, i),
+                "type": "RECORD",
+                "mode": mode,
+                "fields": _fields(rng, scenario, max(2, count // 5), depth + 1),
+            }
+        else:
+            field = {"name": _column_name(rng, i), "type": rng.choice(PRIMITIVE_TYPES), "mode": mode}
+        if rng.random() < 0.5:
+            field["description"] = f"Synthetic {field['name']}"
+        fields.append(field)
+    return fields
+
+
+def generate_table(rng: random.Random, scenario: Scenario, project_id: str, dataset_id: str, table_id: str) -> dict:
+    """Generate the tables.get json of one table"""
+    fields = _fields(rng, scenario, scenario.columns, depth=1)
+    table = {
+        "tableReference": {"projectId": project_id, "datasetId": dataset_id, "tableId": table_id},
+        "schema": {"fields": fields},
+        "lastModifiedTime": "1700000000000",
+    }
+    clustering = [f["name"] for f in fields if f["type"] != "RECORD" and f["mode"] != "REPEATED"][:2]
+    if clustering:
+        table["clustering"] = {"fields": clustering}
+    return table
+
+
+def generate_warehouse(scenario: Scenario, project_id: str = "bench", dataset_id: str = "warehouse") -> list[dict]:
+    """Generate the tables.get json of every table in the scenario"""
+    rng = random.Random(scenario.seed)
+    return [
+        generate_table(rng, scenario, project_id, dataset_id, f"tbl_{i}")
+        for i in range(scenario.tables)
+    ]
+
+
+def generate_cookbook(scenario: Scenario) -> dict:
+    """Generate a cookbook dict with the number of recipes in the scenario"""
+    rng = random.Random(scenario.seed + 1)
+    recipes = []
+    for i in range(scenario.recipes):
+        kind = i % 5
+        if kind == 0:
+            filters = {"regex_include": rng.choice(["_id_", "_code_", "^customer"])}
+            dimension = {"group_label": "Identifiers", "value_format_name": "id",
+                         "measures": [{"type": "count_distinct"}]}
+        elif kind == 1:
+            filters = {"types": ["number"], "regex_exclude": "_id_"}
+            dimension = {"group_label": "Numbers {{ name }}", "value_format_name": "decimal_1",
+                         "measures": [{"type": "sum", "label": "Sum {{ parent_label }}"}, {"type": "average"}]}
+        elif kind == 2:
+            filters = {"types": ["timestamp", "date", "datetime"]}
+            dimension = {"group_label": "Dates", "timeframes": ["raw", "date", "week", "month", "year"]}
+        elif kind == 3:
+            filters = {"types": ["yesno"]}
+            dimension = {"variants": [{"suffix": "flag", "sql": "IF(${ {{ parent_name }} }, 1, 0)", "type": "number"}]}
+        else:
+            filters = {"depth": [rng.randint(1, 3)]}
+            dimension = {"hidden": True, "description": "Nested {{ name }}"}
+        recipes.append({"name": f"recipe_{i}", "filters": filters, "dimension": dimension})
+    return {"recipes": recipes}
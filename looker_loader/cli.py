@@ -1,24 +1,30 @@
 import argparse
+import json
 import os
 import logging
-import lkml
 import re
-from rich.logging import RichHandler
-from looker_loader.utils import FileHandler
-from looker_loader.models.recipe import CookBook
-from looker_loader.models.config import Config
-from looker_loader.databases.bigquery.database import BigQueryDatabase
-from looker_loader.tools import recipe_mixer
-from looker_loader.models.recipe import LookerMixture
-from looker_loader.generator.lookml import LookmlGenerator
-from looker_loader.tools.lkml_converter import convert_to_lkml
+from typing import TYPE_CHECKING, Callable
+from looker_loader.utils import lookml_file_path
+from looker_loader.tools.file_writer import FileWriter
+from looker_loader.tools.manifest import Manifest, table_version
+from looker_loader.tools.model_cache import ModelCache
+from looker_loader.profiling import profiler, timed
+from looker_loader.tools.watcher import FileWatcher
 import asyncio
-import yaml
-from looker_loader.models.lex import Lex
 
-logging.basicConfig(
-    level=logging.INFO, format="%(message)s", datefmt="[%X]", handlers=[RichHandler()]
-)
+# the models, the google client libraries, jinja2 and lkml are imported by the code using them,
+# so --help and argument errors do not pay for them
+if TYPE_CHECKING:
+    from looker_loader.generator.renderer import RenderPool
+    from looker_loader.tools.recipe_impact import RecipeImpact
+
+
+def _configure_logging():
+    from rich.logging import RichHandler
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(message)s", datefmt="[%X]", handlers=[RichHandler()]
+    )
 
 class Cli:
     HEADER = """
@@ -28,12 +34,23 @@ class Cli:
     def __init__(self):
         self.DEFAULT_LOOKML_OUTPUT_DIR = "output"
         self._args_parser = self._init_argparser()
-        self._file_handler = FileHandler()
         self.args = self._args_parser.parse_args()
+        self.config = None
+        self.tables = []
         self.lexicanum = None
         self.use_lexicanum = False
         self.recipe = None
         self.output_path = None
+        self.manifest = None
+        self.incremental = False
+        self.writer = None
+        self.database = None
+        # the parsed schemas of the last run by table, kept in watch mode to regenerate without fetching
+        self.schema_cache = None
+        # converts tables to LookML, created on first use and kept for the whole run or watch session
+        self.render_pool = None
+        # datasets whose listing failed in this run, their tables on the missing pages must not be pruned
+        self.incompletely_listed = set()
 
 
     def _init_argparser(self):
@@ -80,217 +97,687 @@ class Cli:
             default=None,
             type=str,
         )
+        parser.add_argument(
+            "--workers", "-w",
+            help="Number of processes used to mix and render tables",
+            type=int,
+            default=1,
+        )
+        parser.add_argument(
+            "--strict-validation",
+            help="Parse table schemas with full pydantic validation, slower but useful for debugging",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--save-snapshot",
+            help="Save the fetched table schemas to a snapshot, to be replayed with --from-snapshot",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--from-snapshot",
+            help="Generate LookML from the saved snapshot instead of BigQuery, no credentials or network needed",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--full-refresh",
+            help="Regenerate every table, even if nothing changed since the last run",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--profile",
+            help="Write per-stage and per-table timings and counters of the run as JSON (default: profile.json)",
+            nargs="?",
+            const="profile.json",
+            default=None,
+            type=str,
+        )
+        parser.add_argument(
+            "--dry-run",
+            help="Report the tables a run would regenerate and why, with the fields of every changed recipe, without writing anything",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--watch",
+            help="Keep running and regenerate the tables affected by changes to the config, recipe and lexicanum files",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--watch-interval",
+            help="Seconds between checks for changed files in watch mode",
+            type=float,
+            default=0.5,
+        )
         return parser
 
-    def _write_lookml_file(
-        self,
-        output_dir: str,
-        file_path: str,
-        contents: str,
-    ) -> str:
-        """Write LookML content to a file."""
-        logging.debug(f"Writing LookML file to {file_path}")
-        file_name = os.path.basename(file_path)
-        file_path = os.path.join(output_dir, file_path.split(file_name)[0])
-        os.makedirs(file_path, exist_ok=True)
+    def _lookml_file_path(self, output_dir: str, file_path: str) -> str:
+        """Path a LookML file will be written to"""
+        return lookml_file_path(output_dir, file_path)
 
-        file_path = f"{file_path}/{file_name}"
+    def _cache_path(self) -> str:
+        """The configured cache path, or the default one before the config is loaded"""
+        if self.config is not None:
+            return self.config.loader.cache_path
+        return self._default_cache_path()
 
-        # Write contents
-        self._file_handler.write(file_path, contents)
+    @staticmethod
+    def _default_cache_path() -> str:
+        from looker_loader.models.config import LoaderConfig
 
-        return file_path
+        return LoaderConfig.model_fields["cache_path"].default
 
     def _load_recipe(self, folder: str = None):
-        """Load the recipe from a yaml file"""
-        args = self._args_parser.parse_args()
+        """Load the recipe from a yaml file, or from the cache when the file did not change"""
         if folder is None:
-            folder = args.config
+            folder = self.args.config
         if not os.path.exists(folder):
             raise FileNotFoundError(f"Folder {folder} does not exist")
 
+        from looker_loader.models.recipe import CookBook
+
         logging.info(f"Loading Recipe from {folder}/loader_recipe.yml")
-        data = self._file_handler.read(f"{folder}/loader_recipe.yml", file_type="yaml")
-        self.recipe = CookBook(**data)
+        self.recipe = ModelCache(self._cache_path()).load(f"{folder}/loader_recipe.yml", CookBook)
 
     def _load_config(self, folder: str = None):
-        """Load the config from a yaml file"""
-        args = self._args_parser.parse_args()
+        """Load the config from a yaml file, or from the cache when the file did not change"""
         if folder is None:
-            folder = args.config
+            folder = self.args.config
         if not os.path.exists(folder):
             raise FileNotFoundError(f"Folder {folder} where loader_config.yml is expected does not exist")
 
+        from looker_loader.models.config import Config
+
         logging.info(f"Loading Config from {folder}/loader_config.yml")
-        data = self._file_handler.read(f"{folder}/loader_config.yml", file_type="yaml")
-        self.config = Config(**data['config'])
+        # the cache path is part of the config, so the config itself is always cached in the default one,
+        # also when a watch session reloads it
+        self.config = ModelCache(self._default_cache_path()).load(f"{folder}/loader_config.yml", Config, section="config")
+
+        self.output_path = self.args.output_dir or self.config.loader.output_path or self.DEFAULT_LOOKML_OUTPUT_DIR
+        self.use_lexicanum = self.args.lex or self.config.loader.lexicanum or False
 
-        self.output_path = args.output_dir or self.config.loader.output_path or self.DEFAULT_LOOKML_OUTPUT_DIR
-        self.use_lexicanum = args.lex or self.config.loader.lexicanum or False
 
+    @staticmethod
+    def _table_filter(config) -> Callable[[str], bool]:
+        """The regex_include and regex_exclude of a dataset config, compiled once"""
+        include = re.compile(config.regex_include) if config.regex_include else None
+        exclude = re.compile(config.regex_exclude) if config.regex_exclude else None
 
-    def _load_tables(self):
-        """Load the schemas from the database"""
-        process_list = []
+        def matches(table: str) -> bool:
+            if include is not None and include.search(table) is None:
+                logging.debug(f"Table {table} excluded by regex {config.regex_include}")
+                return False
+            if exclude is not None and exclude.search(table) is not None:
+                logging.debug(f"Table {table} excluded by regex {config.regex_exclude}")
+                return False
+            return True
 
+        return matches
+
+    async def _stream_tables(self):
+        """
+            yield every table to process, as a dict of project_id, dataset_id, table_id and config.
+            Datasets without a table list are listed concurrently, page by page, and their tables
+            are yielded as soon as their page arrives, so fetching starts before listing ends.
+            Datasets whose listing fails are collected in self.incompletely_listed.
+        """
         for d in self.config.bigquery:
             if not d.project_id or not d.dataset_id:
                 raise ValueError(
                     f"Project ID and Dataset ID are required for BigQuery configuration: {d}"
                 )
 
-            if not d.tables:
-                logging.info("Finding all tables in dataset %s", d.dataset_id)
-                tables = self.database.get_tables_in_dataset(d.project_id, d.dataset_id)
-            else:
-                tables = d.tables
-
-            for table in tables:
-                if d.config.regex_include:
-                    if re.search(
-                        d.config.regex_include,
-                        table,
-                    ) is None:
-                        logging.debug(
-                            f"Table {table} excluded by regex {d.config.regex_include}")
-                        continue
-                if d.config.regex_exclude:
-                    if re.search(
-                        d.config.regex_exclude,
-                        table,
-                    ) is not None:
-                        logging.debug(
-                            f"Table {table} excluded by regex {d.config.regex_exclude}")
-                        continue
-
-                process_list.append(
-                    {
-                        "project_id": d.project_id,
-                        "dataset_id": d.dataset_id,
-                        "table_id": table,
-                        "config": d.config
-                    }
-                )
+        listed = asyncio.Queue()
+        self.incompletely_listed = set()
 
-        self.tables = process_list
+        async def list_dataset(d, matches):
+            try:
+                logging.info("Finding all tables in dataset %s", d.dataset_id)
+                with profiler.stage("list_tables"):
+                    async for page in self.database.stream_tables_in_dataset(d.project_id, d.dataset_id):
+                        for table in page:
+                            if matches(table):
+                                listed.put_nowait((d, table))
+            except Exception:
+                # logged by the database, the tables listed so far are still processed
+                self.incompletely_listed.add(f"{d.project_id}.{d.dataset_id}")
+            finally:
+                listed.put_nowait(None)
+
+        listing = [
+            asyncio.create_task(list_dataset(d, self._table_filter(d.config)))
+            for d in self.config.bigquery
+            if not d.tables
+        ]
+        try:
+            for d in self.config.bigquery:
+                if d.tables:
+                    matches = self._table_filter(d.config)
+                    for table in d.tables:
+                        if matches(table):
+                            yield self._table_job(d, table)
+
+            remaining = len(listing)
+            while remaining:
+                item = await listed.get()
+                if item is None:
+                    remaining -= 1
+                    continue
+                yield self._table_job(*item)
+        finally:
+            for task in listing:
+                task.cancel()
+
+    @staticmethod
+    def _table_job(d, table: str) -> dict:
+        return {
+            "project_id": d.project_id,
+            "dataset_id": d.dataset_id,
+            "table_id": table,
+            "config": d.config
+        }
 
     def _load_lexicanum(self):
-        """Load the lexicanum from a yaml file"""
-        try:
-            with open('lexicanum.yml', 'r') as file:
-                lex_fields = yaml.safe_load(file)
-        except FileNotFoundError:
-            logging.warning("lexicanum.yml file not found. Creating..")
-            lex_fields = {}
+        """Open the lexicanum, it is read on first use and new field names are collected while tables stream in"""
+        from looker_loader.tools.lexicanum import LexicanumStore
+
         logging.info("Lexicanum is enabled. Collecting lexical fields from schemas...")
+        self.lexicanum = LexicanumStore('lexicanum.yml', cache_path=self.config.loader.cache_path)
+
+    def _collect_lexical_fields(self, schema):
+        """Add the field names of a table that are not in the lexicanum yet"""
 
-        def recurse_fields(fields, lex_fields):
+        def recurse_fields(fields):
             """Recursively collect fields from nested structures"""
             if isinstance(fields, list):  # Ensure 'fields' is a list
                 for field in fields:
-                    if field.name not in lex_fields:
-                        lex_fields[field.name] = {'label': None}
+                    self.lexicanum.add(field.name)
                     if field.fields:
-                        recurse_fields(field.fields, lex_fields)
-
-        for m in self.schemas:
-            schema = m.get("schema")
-            for field in schema.fields:
-                if field.name not in lex_fields:
-                    lex_fields[field.name] = {'label': None}  # Or extract label if needed
-
-                # Recurse if the field has nested fields
-                if hasattr(field, 'fields') and field.fields:
-                    recurse_fields(field.fields, lex_fields)
+                        recurse_fields(field.fields)
 
-        logging.debug("Lexical fields collected from mixtures, writing to lexicanum.yml")
-        # Write to a YAML file
-        with open('lexicanum.yml', 'w') as file:
-            yaml.dump(lex_fields, file, sort_keys=True, allow_unicode=True)
+        recurse_fields(schema.fields)
 
-        self.lexicanum = Lex(lex_fields)
+    def _save_lexicanum(self):
+        """Write the field names collected in this run to the lexicanum, if there are new ones"""
+        self.lexicanum.save()
 
-    async def get_schemas(self):
+    async def stream_schemas(self):
         """
-            asyncronously fetch the schemas of the tables
-            and parse them into a common database schema
-            and store them in self.schemas
+            asyncronously fetch the schemas of the tables and parse them into a common database schema,
+            yielding every table as soon as its schema arrives.
+            At most loader.max_in_flight fetches are pending at any time.
         """
-        tasks = [
-            self.database._async_fetch_table_schema(
-            project_id=table.get("project_id"),
-            dataset_id=table.get("dataset_id"),
-            table_id=table.get("table_id"),
-            config=table.get("config")
-            )
-            for table in self.tables
-            ]
-        
-        # Run all tasks concurrently and gather the results
-        results = await asyncio.gather(*tasks)
-        from rich import print
-        schemas = []
-        for r in results:
+        missing = []
+        async for table, r in self._stream_fetch_results():
+            if not r[0]:
+                missing.append(self._table_key(table))
+                continue
             try:
-                schemas.append({"schema":self.database._parse_schema(r[0]), "config": r[1]})
+                with profiler.table(self._table_key(table)):
+                    schema = self.database._parse_schema(r[0])
+                yield {
+                    "schema": schema,
+                    "config": r[1],
+                    "version": table_version(r[0]),
+                }
             except AttributeError as e:
-                logging.error(f"Error processing schema for table {r[0].get('table_id')}: {e}")
+                logging.error(f"Error processing schema for table {table.get('table_id')}: {e}")
+
+        if missing:
+            logging.error(f"Could not fetch the schema of {len(missing)} tables: {', '.join(missing)}")
 
-        self.schemas = schemas
+    @staticmethod
+    def _table_key(table: dict) -> str:
+        """The full name of a table in self.tables, as in the sql_table_name of its schema"""
+        return f'{table.get("project_id")}.{table.get("dataset_id")}.{table.get("table_id")}'
+
+    async def _stream_fetch_results(self):
+        """
+            yield (table, (table json, config)) for every table to process, in completion order.
+            Tables are fetched while they are still being listed, and collected in self.tables.
+        """
+        if self.config.loader.schema_source == "information_schema":
+            async for result in self._stream_information_schema():
+                yield result
+            return
+
+        async def fetch(table):
+            # every fetch runs in its own task, so the table only applies to this fetch
+            with profiler.table(self._table_key(table)), profiler.stage("fetch"):
+                return table, await self.database._async_fetch_table_schema(
+                    project_id=table.get("project_id"),
+                    dataset_id=table.get("dataset_id"),
+                    table_id=table.get("table_id"),
+                    config=table.get("config"),
+                )
+
+        self.tables = []
+        tables = self._stream_tables()
+        next_table = None
+        exhausted = False
+        pending = set()
+        try:
+            while True:
+                # keep a bounded number of fetches in flight, the database limits the requests on the wire
+                while not exhausted and len(pending) < self.config.loader.max_in_flight:
+                    if next_table is None:
+                        next_table = asyncio.ensure_future(anext(tables, None))
+                    if not next_table.done():
+                        break
+                    table = next_table.result()
+                    next_table = None
+                    if table is None:
+                        exhausted = True
+                        break
+                    self.tables.append(table)
+                    pending.add(asyncio.create_task(fetch(table)))
+                if exhausted and not pending:
+                    break
+
+                # wait for a fetch to complete, or for the next listed table while there is room for it
+                waiting = set(pending)
+                if next_table is not None and len(pending) < self.config.loader.max_in_flight:
+                    waiting.add(next_table)
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task in pending:
+                        pending.discard(task)
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if next_table is not None:
+                next_table.cancel()
+                await asyncio.gather(next_table, return_exceptions=True)
+            await tables.aclose()
+            if not self.args.watch:
+                # watch mode keeps the pooled connections open for the next run
+                await self.database.aclose()
+
+    async def _stream_information_schema(self):
+        """
+            fetch the schemas of the tables with one INFORMATION_SCHEMA query per dataset,
+            yielding the tables of a dataset as soon as its query returns
+        """
+        self.tables = [table async for table in self._stream_tables()]
+        datasets = {}
+        for table in self.tables:
+            datasets.setdefault((table.get("project_id"), table.get("dataset_id")), []).append(table)
+
+        async def fetch(project_id, dataset_id, tables):
+            with profiler.stage("fetch_dataset"):
+                schemas = await self.database._async_fetch_dataset_schemas(
+                    project_id, dataset_id, [table.get("table_id") for table in tables]
+                )
+            return tables, schemas
+
+        tasks = [
+            asyncio.create_task(fetch(project_id, dataset_id, tables))
+            for (project_id, dataset_id), tables in datasets.items()
+        ]
+        for task in asyncio.as_completed(tasks):
+            tables, schemas = await task
+            for table in tables:
+                yield table, (schemas.get(table.get("table_id"), {}), table.get("config"))
 
     def _initialize_mixer(self):
         """Initialize the LookerMixture objects for each schema"""
-        self.mixer = recipe_mixer.RecipeMixer(self.recipe, self.lexicanum)
+        from looker_loader.tools import recipe_mixer
+
+        self.mixer = recipe_mixer.RecipeMixer(
+            self.recipe,
+            self.lexicanum,
+            cache_size=self.config.loader.mixture_cache_size,
+            batch_min_fields=self.config.loader.batch_match_min_fields,
+        )
+
+    def _load_manifest(self):
+        """Load the manifest of the previous run, used to skip unchanged tables and to prune dropped ones"""
+        self.manifest = Manifest(os.path.join(self.config.loader.cache_path, "manifest.json"))
+        self.manifest.load()
+        self.incremental = bool(self.config.loader.incremental and not self.args.full_refresh)
+
+    def _prune_dropped_tables(self):
+        """
+            Remove the files of tables dropped from a dataset since the last run.
+            Datasets without any table in this run are left alone, an empty listing may be an error,
+            and so are datasets whose listing failed part way.
+        """
+        keys = {self._table_key(table) for table in self.tables}
+        datasets = {key.rsplit(".", 1)[0] for key in keys} - self.incompletely_listed
+        self.writer.remove(self.manifest.prune(keys, datasets))
+
+    def _lex_entries(self, schema) -> dict:
+        """The lexicanum entries that apply to the fields of a table"""
+        if not self.lexicanum:
+            return None
+
+        entries = {}
+
+        def recurse_fields(fields):
+            for field in fields or []:
+                entry = self.lexicanum.get(field.name)
+                if entry is not None:
+                    entry = entry.model_dump(mode="json", exclude_none=True)
+                    if entry:
+                        entries[field.name] = entry
+                recurse_fields(field.fields)
+
+        recurse_fields(schema.fields)
+        return entries
+
+    def _write_profile(self, path: str):
+        """Write the profile of the run as JSON"""
+        caches = {}
+        if self.args.workers <= 1:
+            # with workers these caches live in the worker processes, their hit rates come from the counters
+            from looker_loader.models.recipe import compile_template
+
+            caches["mixture_cache"] = self.mixer.cache.stats()
+            caches["template_cache"] = compile_template.cache_info()._asdict()
+        with open(path, "w") as f:
+            json.dump(profiler.report(caches=caches), f, indent=2)
+        logging.info(f"Profile written to {path}")
+
+    def _init_database(self):
+        """Create the database, from the snapshot or with initialized credentials"""
+        from looker_loader.databases.bigquery.database import BigQueryDatabase
+        from looker_loader.databases.bigquery.scheduler import RequestScheduler
+        from looker_loader.databases.bigquery.snapshot import SnapshotStore
+
+        snapshot = None
+        if self.args.save_snapshot or self.args.from_snapshot:
+            snapshot = SnapshotStore(os.path.join(self.config.loader.cache_path, "snapshots"))
+        self.database = BigQueryDatabase(
+            max_connections=self.config.loader.max_connections,
+            max_concurrency=self.config.loader.max_concurrency,
+            scheduler=RequestScheduler(
+                max_retries=self.config.loader.max_retries,
+                requests_per_second=self.config.loader.requests_per_second,
+                retry_budget=self.config.loader.retry_budget,
+            ),
+            snapshot=snapshot,
+            replay=self.args.from_snapshot,
+            strict_validation=self.args.strict_validation,
+            token_refresh_margin=self.config.loader.token_refresh_margin,
+        )
+        if self.args.from_snapshot:
+            logging.info(f"Replaying table schemas from snapshot in {snapshot.path}")
+        else:
+            logging.info("Initializing database connection...")
+            logging.info(f"Impersonate Service Account: {self.config.loader.impersonate_service_account}")
+            self.database.init(self.config.loader.impersonate_service_account)
 
     def run(self):
         """Run the CLI"""
-        self.database = BigQueryDatabase()
+        if self.args.profile:
+            profiler.enable()
         self._load_config()
-        logging.info("Initializing database connection...")
-        logging.info(f"Impersonate Service Account: {self.config.loader.impersonate_service_account}")
-        self.database.init(self.config.loader.impersonate_service_account)
+        self._init_database()
+
+        from looker_loader.generator.lookml import LookmlGenerator
 
         self.lookml = LookmlGenerator(cli_args=self.args)
 
         self._load_recipe()
-        self._load_tables()
-
-        # retrieve the schemas of the tables
-        asyncio.run(self.get_schemas())
 
         if self.use_lexicanum:
             self._load_lexicanum()
 
         self._initialize_mixer()
+        self._load_manifest()
 
-        mixtures = []
-        for schema_object in self.schemas:
-            schema = schema_object.get("schema")
-            config = schema_object.get("config")
+        if self.args.watch:
+            self.schema_cache = {}
+        asyncio.run(self._run())
 
-            mixture = self.mixer.mixturize(schema, config=config)
-            mixtures.append({"mixture":mixture, "config": config, "table_group": schema.table_group})
+    async def _run(self):
+        try:
+            await self._generate_and_save()
+            if self.args.watch and not self.args.dry_run:
+                await self.watch()
+        finally:
+            if self.render_pool is not None:
+                self.render_pool.shutdown()
+                self.render_pool = None
+            if self.args.watch:
+                await self.database.aclose()
+
+    async def _generate_and_save(self, schemas: list = None):
+        """
+            Generate the tables streamed from the database, or the given parsed schemas,
+            and save the snapshot, lexicanum and manifest of the run.
+        """
+        # fetch, parse, mix, render and write every table as soon as its schema arrives
+        self.writer = FileWriter(max_workers=self.config.loader.max_write_workers)
+        try:
+            generated, unchanged = await self.generate(schemas)
+            if self.args.dry_run:
+                logging.info(f"Dry run, {generated} tables would be regenerated, {unchanged} are unchanged")
+                return
+            if schemas is None:
+                self._prune_dropped_tables()
+        finally:
+            self.writer.close()
+
+        if self.args.save_snapshot and schemas is None:
+            self.database.save_snapshot()
+        if self.use_lexicanum:
+            self._save_lexicanum()
+        self.manifest.save()
+        if self.args.workers <= 1:
+            logging.debug(f"Mixture cache: {self.mixer.cache.stats()}")
+        logging.info(
+            f"LookML files generated successfully ({generated} generated, {unchanged} unchanged; {self.writer.summary()})"
+        )
+        if self.args.profile:
+            profiler.count("tables_generated", generated)
+            profiler.count("tables_unchanged", unchanged)
+            profiler.count("files_removed", self.writer.removed)
+            self._write_profile(self.args.profile)
 
-        for m in mixtures:
-            mixture = m.get("mixture")
-            config = m.get("config")
-            table_group = m.get("table_group")
+    async def watch(self):
+        """
+            Regenerate on every change to the config, recipe or lexicanum files, until interrupted.
+            The database connections, the compiled recipes, the lexicanum and the parsed schemas stay warm
+            between runs, so a recipe or lexicanum edit only re-renders the tables it affects, without fetching.
+            A config edit refetches every table, connection settings apply after a restart.
+        """
+        config_file = f"{self.args.config}/loader_config.yml"
+        recipe_file = f"{self.args.config}/loader_recipe.yml"
+        lexicanum_file = "lexicanum.yml"
+        watcher = FileWatcher([config_file, recipe_file, lexicanum_file])
+        # from now on only what changed is regenerated, whatever the first run did
+        self.incremental = True
+        logging.info(f"Watching {', '.join(watcher.paths)} for changes, press Ctrl+C to stop")
+
+        while True:
+            await asyncio.sleep(self.args.watch_interval)
+            changed = watcher.changed()
+            if not changed:
+                continue
+            logging.info(f"Changed: {', '.join(changed)}")
+            try:
+                if config_file in changed:
+                    await self._reload_config()
+                else:
+                    await self._reload(
+                        recipe_changed=recipe_file in changed,
+                        lexicanum_changed=lexicanum_file in changed and self.use_lexicanum,
+                    )
+            except Exception as e:
+                # keep watching, the next edit may fix it
+                logging.error(f"Could not regenerate: {e}")
+            if self.use_lexicanum:
+                # field names appended to the lexicanum by the run itself are not an edit
+                watcher.refresh(lexicanum_file)
+
+    async def _reload_config(self):
+        """Reload the config and everything depending on it, and regenerate every table with refetched schemas"""
+        self._load_config()
+        self._load_recipe()
+        if self.use_lexicanum:
+            self._load_lexicanum()
+        self._initialize_mixer()
+        self.schema_cache = {}
+        await self._generate_and_save()
 
-            views, explore = self.lookml.generate(
-                model=mixture,
-                config=config,
-            )
-            self._write_lookml_file(
-                output_dir=f'{self.output_path}/{table_group}',
-                file_path=f'{config.prefix_files}{mixture.name}{config.suffix_files}.view.lkml',
-                contents=convert_to_lkml(views, explore),
-            )
+    async def _reload(self, recipe_changed: bool, lexicanum_changed: bool):
+        """
+            Regenerate the cached schemas with the changed recipe or lexicanum.
+            Only the tables matched by a changed recipe, or whose lexicanum entries changed, get a new fingerprint.
+        """
+        if not recipe_changed and not lexicanum_changed:
+            return
+        if recipe_changed:
+            self._load_recipe()
+        if lexicanum_changed:
+            self._load_lexicanum()
+        self._initialize_mixer()
+        await self._generate_and_save(list(self.schema_cache.values()))
+
+    def _report_impact(self, key: str, version: dict, file_path: str, matches: dict, previous, impact: "RecipeImpact"):
+        """Log why a dry run would regenerate a table"""
+        entry = self.manifest.tables.get(key)
+        if entry is None:
+            reason = "new table"
+        elif not self.incremental:
+            reason = "full refresh"
+        elif entry.get("etag") != version.get("etag") or entry.get("last_modified") != version.get("last_modified"):
+            reason = "schema changed"
+        elif entry.get("file") != file_path or not os.path.exists(file_path):
+            reason = f"file missing or renamed to {file_path}"
+        else:
+            affected = impact.affected_by(matches, previous)
+            if affected is None:
+                reason = "recipes changed or reordered"
+            elif affected:
+                reason = "recipes " + ", ".join(
+                    f"{name} ({after} fields)" if before == after else f"{name} ({before} -> {after} fields)"
+                    for name, (before, after) in affected.items()
+                )
+            else:
+                reason = "dataset config or lexicanum entries changed"
+        logging.info(f"{key}: {reason}")
+
+    def _render_pool(self) -> "RenderPool":
+        """The render pool, rendering with the current mixer, its workers stay warm between the runs of a watch session"""
+        from looker_loader.generator.renderer import RenderPool
+
+        if self.render_pool is None:
+            self.render_pool = RenderPool(self.mixer, self.lookml, workers=self.args.workers)
+        else:
+            self.render_pool.update(self.mixer)
+        return self.render_pool
+
+    @staticmethod
+    async def _iterate(schemas: list):
+        for schema_object in schemas:
+            yield schema_object
+
+    @timed("generate_tables")
+    async def generate(self, schemas: list = None) -> tuple[int, int]:
+        """
+            Stream the tables through fetch -> parse -> mix -> render -> write, or the given parsed schemas through the last three.
+            Rendering runs in an executor and writing on the thread pool of self.writer, with at most
+            loader.max_in_flight tables waiting on them, so memory stays bounded no matter how many tables there are.
+            Returns the number of generated and unchanged tables.
+        """
+        from looker_loader.tools.recipe_impact import RecipeImpact
+
+        impact = RecipeImpact(self.mixer.index, self.recipe, previous=self.manifest.cookbook)
+        if impact.changed:
+            logging.info(f"Recipes changed since the last run: {', '.join(sorted(impact.changed))}")
+        loop = asyncio.get_running_loop()
+        executor, render = None, None
+        if not self.args.dry_run:
+            pool = self._render_pool()
+            executor, render = pool.executor, pool.render
+
+        generated = 0
+        unchanged = 0
+        rendering = set()
+
+        async def render_table(job, key, version, fingerprint, matches):
+            contents, samples = await loop.run_in_executor(executor, render, job)
+            profiler.merge(samples)
+            written = await self.writer.write(job.get("output_dir"), job.get("file_path"), contents, table=key)
+            previous = self.manifest.file(key)
+            if previous is not None and previous != written:
+                # the file of the table was renamed, by a new prefix or suffix
+                self.writer.remove([previous])
+            self.manifest.update(key, version, fingerprint, written, matches, impact.id)
 
-        logging.info("LookML files generated successfully")
+        try:
+            source = self.stream_schemas() if schemas is None else self._iterate(schemas)
+            async for schema_object in source:
+                schema = schema_object.get("schema")
+                config = schema_object.get("config")
+                version = schema_object.get("version")
+                if self.schema_cache is not None:
+                    self.schema_cache[schema.sql_table_name] = schema_object
+
+                if self.use_lexicanum:
+                    self._collect_lexical_fields(schema)
+
+                key = schema.sql_table_name
+                output_dir = f'{self.output_path}/{schema.table_group}'
+                file_path = f'{config.prefix_files}{schema.name}{config.suffix_files}.view.lkml'
+                lookml_path = self._lookml_file_path(output_dir, file_path)
+                # the recipes matching the table, only changed recipes are matched again when its schema did not change
+                previous = self.manifest.matches(key, version, impact.previous_id)
+                matches = impact.matches(schema, previous)
+                fingerprint = Manifest.fingerprint(impact.recipe_hash(matches), config, self._lex_entries(schema))
+                if self.incremental and self.manifest.is_unchanged(key, version, fingerprint, lookml_path):
+                    logging.debug(f"Table {key} is unchanged, skipping")
+                    if not self.args.dry_run:
+                        self.manifest.update(key, version, fingerprint, lookml_path, matches, impact.id)
+                    unchanged += 1
+                    continue
+                if self.args.dry_run:
+                    self._report_impact(key, version, lookml_path, matches, previous, impact)
+                    generated += 1
+                    continue
+
+                job = {
+                    "schema": schema,
+                    "config": config,
+                    "output_dir": output_dir,
+                    "file_path": file_path,
+                }
+                rendering.add(asyncio.create_task(render_table(job, key, version, fingerprint, matches)))
+                generated += 1
+
+                if len(rendering) >= self.config.loader.max_in_flight:
+                    done, rendering = await asyncio.wait(rendering, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+
+            if rendering:
+                await asyncio.gather(*rendering)
+        finally:
+            # after a failure, the tables still waiting on the executor are not rendered
+            for task in rendering:
+                task.cancel()
+
+        if not self.args.dry_run:
+            self.manifest.cookbook = impact.digest
+
+        return generated, unchanged
 
 def main():
     cli = Cli()
-    cli.run()
+    _configure_logging()
+    try:
+        cli.run()
+    except KeyboardInterrupt:
+        if not cli.args.watch:
+            raise
+        logging.info("Stopped watching")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,107 @@
+import asyncio
+import datetime
+import logging
+import threading
+from typing import Callable, Optional
+from google.auth.credentials import Credentials
+
+
+def _utcnow() -> datetime.datetime:
+    # google-auth keeps expiries as naive UTC datetimes
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class TokenProvider:
+    """
+        Access tokens of google credentials, kept fresh for runs longer than a token lifetime.
+
+        A token is refreshed refresh_margin seconds ahead of its expiry, instead of failing requests once it expired.
+        Refreshing is a blocking request, so async callers refresh on a thread and every request waiting on
+        a refresh shares the single one in flight. Threads, like the bigquery clients, refresh under a lock.
+    """
+
+    def __init__(
+        self,
+        credentials,
+        refresh_margin: float = 300,
+        clock: Callable[[], datetime.datetime] = _utcnow,
+    ):
+        self.credentials = credentials
+        self.refresh_margin = datetime.timedelta(seconds=refresh_margin)
+        self.clock = clock
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._refreshing: Optional[asyncio.Future] = None
+        self._stale = None
+
+    def needs_refresh(self) -> bool:
+        """Whether the token is missing, rejected, or expires within the margin"""
+        token = self.credentials.token
+        if token is None or token == self._stale:
+            return True
+        expiry = self.credentials.expiry
+        return expiry is not None and self.clock() >= expiry - self.refresh_margin
+
+    def refresh(self, stale: Optional[str] = None):
+        """
+            Refresh the token if it needs it, blocking.
+            stale is a token a request was rejected with, refreshed unless another caller already replaced it.
+        """
+        with self._lock:
+            if stale is not None and stale == self.credentials.token:
+                self._stale = stale
+            if not self.needs_refresh():
+                return
+            from google.auth.transport.requests import Request
+
+            logging.debug("Refreshing the access token")
+            self.credentials.refresh(Request())
+            self.refreshes += 1
+            self._stale = None
+
+    def token(self) -> str:
+        """A fresh token, refreshing it on this thread if needed"""
+        if self.needs_refresh():
+            self.refresh()
+        return self.credentials.token
+
+    async def atoken(self, stale: Optional[str] = None) -> str:
+        """A fresh token, refreshing it on a thread if needed, concurrent callers share the refresh in flight"""
+        if stale is not None and stale == self.credentials.token:
+            self._stale = stale
+        if not self.needs_refresh():
+            return self.credentials.token
+
+        loop = asyncio.get_running_loop()
+        if self._refreshing is None or self._refreshing.done() or self._refreshing.get_loop() is not loop:
+            self._refreshing = asyncio.ensure_future(asyncio.to_thread(self.refresh))
+        # shielded, a cancelled request does not cancel the refresh the others wait on
+        await asyncio.shield(self._refreshing)
+        return self.credentials.token
+
+    async def headers(self, stale: Optional[str] = None) -> dict:
+        """Authorization headers with a fresh token"""
+        return {"Authorization": f"Bearer {await self.atoken(stale)}"}
+
+    def client_credentials(self) -> Credentials:
+        """Credentials for google clients, taking their tokens from this provider"""
+        return ProvidedCredentials(self)
+
+
+class ProvidedCredentials(Credentials):
+    """google-auth credentials applying the tokens of a TokenProvider, so clients share its refreshes"""
+
+    def __init__(self, provider: TokenProvider):
+        super().__init__()
+        self._provider = provider
+
+    def refresh(self, request):
+        # called after a request was rejected with the current token
+        self._provider.refresh(stale=self.token)
+        self.token = self._provider.credentials.token
+        self.expiry = self._provider.credentials.expiry
+
+    def before_request(self, request, method, url, headers):
+        self.token = self._provider.token()
+        self.expiry = self._provider.credentials.expiry
+        self.apply(headers)
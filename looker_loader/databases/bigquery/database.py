@@ -1,25 +1,112 @@
-from typing import Union
-import google.auth
-from google.auth.transport.requests import Request
-import requests
-import google.api_core.exceptions
+from typing import TYPE_CHECKING, Union
 from looker_loader.models.database import DatabaseTable
 from looker_loader.databases.bigquery.enums import BigqueryMode, BigqueryType, BigqueryUrl
+from looker_loader.databases.bigquery.scheduler import RequestScheduler
+from looker_loader.databases.bigquery.information_schema import COLUMNS_QUERY, rows_to_table_schemas
+from looker_loader.databases.bigquery.snapshot import SnapshotStore
+from looker_loader.databases.bigquery.normalizer import normalize_table
+from looker_loader.profiling import profiler, timed
 import httpx
 import logging
-from google.auth.impersonated_credentials import Credentials as ImpersonatedCredentials
-from google.auth.transport.requests import Request
-from google.auth import default
-from google.cloud import bigquery # Import bigquery client here
+import asyncio
+
+# the google client libraries take most of the startup time, they are imported by the code paths using them
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+try:
+    import h2  # noqa: F401  # httpx only negotiates HTTP/2 when h2 is installed
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 class BigQueryDatabase:
-    def __init__(self):
-        """Initialize the BigQueryDatabase class."""
+    # tables.list returns at most 1000 tables per page
+    LIST_PAGE_SIZE = 1000
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_concurrency: int = 20,
+        scheduler: RequestScheduler = None,
+        snapshot: SnapshotStore = None,
+        replay: bool = False,
+        strict_validation: bool = False,
+        token_refresh_margin: float = 300,
+    ):
+        """Initialize the BigQueryDatabase class.
+
+        Args:
+            snapshot: store the fetched table json is saved to, or replayed from
+            replay: read tables from the snapshot instead of BigQuery, no credentials needed
+            strict_validation: parse schemas through full pydantic validation instead of the single pass normalizer
+            token_refresh_margin: seconds ahead of its expiry the access token is refreshed
+        """
         self.database_type = "bigquery"
         self.credentials = None # Add this line to store credentials
+        self.tokens = None
+        self.token_refresh_margin = token_refresh_margin
+        self.headers = {"Content-Type": "application/json"}
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.scheduler = scheduler or RequestScheduler()
+        if replay and snapshot is None:
+            raise ValueError("Replaying requires a snapshot")
+        self.snapshot = snapshot
+        self.replay = replay
+        self.strict_validation = strict_validation
+        self._client = None
+        self._semaphore = None
+        self._bigquery_clients = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared pooled http client, creating it on first use."""
+        if self._client is None:
+            logging.getLogger("httpx").setLevel(logging.WARNING)
+            if not HTTP2_AVAILABLE:
+                logging.debug("h2 is not installed, falling back to HTTP/1.1 keep-alive connections")
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=10,
+            )
+        return self._client
+
+    def _get_bigquery_client(self, project_id: str) -> "bigquery.Client":
+        """Return the bigquery client of a project, created once and reused by every dataset"""
+        client = self._bigquery_clients.get(project_id)
+        if client is None:
+            from google.cloud import bigquery
+
+            # the clients take their tokens from the provider, refreshed ahead of expiry like the REST requests
+            credentials = self.tokens.client_credentials() if self.tokens is not None else self.credentials
+            client = bigquery.Client(credentials=credentials, project=project_id)
+            self._bigquery_clients[project_id] = client
+        return client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the limiter bounding the number of requests in flight."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def aclose(self):
+        """Close the shared http client. A new one is created on next use."""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
 
     def init(self, impersonate_service_account: str = None):
         """Authenticate the user with Google Cloud using default credentials."""
+        from google.auth import default
+        from google.auth.impersonated_credentials import Credentials as ImpersonatedCredentials
+        from google.auth.transport.requests import Request
+        from looker_loader.databases.bigquery.credentials import TokenProvider
+
         if impersonate_service_account:
             logging.debug(f"Impersonating service account: {impersonate_service_account}")
             source_credentials, _ = default(
@@ -45,68 +132,155 @@ class BigQueryDatabase:
             logging.debug("Using default credentials without impersonation.")
             self.credentials, _ = default() # Store credentials in self.credentials
 
+        self.tokens = TokenProvider(self.credentials, refresh_margin=self.token_refresh_margin)
         try:
-            self.credentials.refresh(Request())
+            self.tokens.refresh()
         except Exception as e:
             logging.error(f"Error refreshing credentials: {e}")
-        self.headers = {
-            "Authorization": f"Bearer {self.credentials.token}",
-            "Content-Type": "application/json",
-        }
+
+    async def _headers(self, stale: str = None) -> dict:
+        """Request headers with a fresh access token"""
+        if self.tokens is None:
+            return self.headers
+        return {**self.headers, **await self.tokens.headers(stale)}
+
+    def save_snapshot(self):
+        """Write the table json fetched in this run to the snapshot"""
+        if self.snapshot is not None and not self.replay:
+            self.snapshot.flush()
 
     async def _async_fetch_table_schema(self, project_id: str, dataset_id: str, table_id: str, config=None) -> tuple[dict, dict]:
         """Fetch schema data for a table"""
-        logging.getLogger("httpx").setLevel(logging.WARNING)
+        if self.replay:
+            data = self.snapshot.read(project_id, dataset_id, table_id)
+            if data is None:
+                logging.error(f"Table {project_id}.{dataset_id}.{table_id} is not in the snapshot")
+                return {}, config
+            return data, config
+
         url = BigqueryUrl.BIGQUERY.value.format(
             project_id=project_id, dataset_id=dataset_id, table_id=table_id
         )
-        async with httpx.AsyncClient() as client:
-            data = await client.get(url, headers=self.headers, timeout=10)
+        client = self._get_client()
+
+        async def send():
+            # only hold a concurrency slot while the request is in flight, not while backing off
+            headers = await self._headers()
+            async with self._get_semaphore():
+                with profiler.stage("http_request"):
+                    response = await client.get(url, headers=headers)
+                    if response.status_code == 401 and self.tokens is not None:
+                        # the token was rejected before its expiry, retry once with a refreshed one
+                        profiler.count("token_rejections")
+                        stale = headers["Authorization"].removeprefix("Bearer ")
+                        response = await client.get(url, headers=await self._headers(stale))
+                    return response
+
+        try:
+            data = await self.scheduler.request(
+                send, project_id=project_id, description=f"{project_id}.{dataset_id}.{table_id}"
+            )
+        except httpx.HTTPError as e:
+            logging.error(f"Error fetching table schema: {project_id}.{dataset_id}.{table_id} - {e}")
+            return {}, config
         if data.status_code != 200:
             logging.error(f"Error fetching table schema: {project_id}.{dataset_id}.{table_id} - {data.text}")
             return {}, config
-        return data.json(), config
+        table_json = data.json()
+        if self.snapshot is not None:
+            self.snapshot.add(project_id, dataset_id, table_id, table_json)
+        return table_json, config
 
+    def fetch_dataset_schemas(self, project_id: str, dataset_id: str, table_ids: list[str] = None) -> dict[str, dict]:
+        """
+            Fetch the schemas of all tables in a dataset with a single INFORMATION_SCHEMA query.
+            Returns a dict of table_id to table json in the same shape as tables.get
+        """
+        if self.replay:
+            available = self.snapshot.tables(project_id, dataset_id)
+            return {
+                table_id: self.snapshot.read(project_id, dataset_id, table_id)
+                for table_id in set(table_ids or available).intersection(available)
+            }
+
+        if not self.credentials:
+            logging.error("Credentials not initialized. Call .init() first.")
+            return {}
+
+        from google.api_core.exceptions import GoogleAPIError
+        from google.cloud import bigquery
+
+        client = self._get_bigquery_client(project_id)
+
+        where = ""
+        query_parameters = []
+        if table_ids:
+            where = "WHERE c.table_name IN UNNEST(@table_ids)"
+            query_parameters.append(bigquery.ArrayQueryParameter("table_ids", "STRING", list(table_ids)))
+
+        query = COLUMNS_QUERY.format(project_id=project_id, dataset_id=dataset_id, where=where)
+        try:
+            rows = client.query(
+                query, job_config=bigquery.QueryJobConfig(query_parameters=query_parameters)
+            ).result()
+            schemas = rows_to_table_schemas(project_id, dataset_id, (dict(row.items()) for row in rows))
+        except GoogleAPIError as e:
+            logging.error(f"Error querying INFORMATION_SCHEMA of {project_id}.{dataset_id}: {e}")
+            return {}
+
+        if self.snapshot is not None:
+            for table_id, table_json in schemas.items():
+                self.snapshot.add(project_id, dataset_id, table_id, table_json)
+        return schemas
+
+    async def _async_fetch_dataset_schemas(self, project_id: str, dataset_id: str, table_ids: list[str] = None) -> dict[str, dict]:
+        """Fetch the schemas of a dataset without blocking the event loop"""
+        return await asyncio.to_thread(self.fetch_dataset_schemas, project_id, dataset_id, table_ids)
+
+    @timed("parse_schema")
     def _parse_schema(self, json) -> DatabaseTable:
         """Parse the schema of a BigQuery table into a Pydantic model."""
-        table_ref = json.get("tableReference")
-        fields = json.get("schema").get("fields")
-        clustering_fields = json.get("clustering", {}).get("fields", [])
-        add_clustering_to_fields = []
-        for field in fields:
-            if field.get("name") in clustering_fields:
-                logging.debug(f"Field {field.get('name')} is clustered.")
-                field["is_clustered"] = True
-            add_clustering_to_fields.append(field)
-        return DatabaseTable(
-            name=table_ref.get("tableId"),
-            table_group=table_ref.get("datasetId"),
-            table_project=table_ref.get("projectId"),
-            fields=add_clustering_to_fields,
-            sql_table_name=f'{table_ref.get("projectId")}.{table_ref.get("datasetId")}.{table_ref.get("tableId")}',
+        return normalize_table(json, strict=self.strict_validation)
+
+    def _list_table_pages(self, project_id: str, dataset_id: str):
+        """Iterator over the pages of table ids in a dataset, every page is a request"""
+        if self.replay:
+            return iter([self.snapshot.tables(project_id, dataset_id)])
+
+        from google.cloud import bigquery
+
+        client = self._get_bigquery_client(project_id)
+        tables = client.list_tables(
+            bigquery.DatasetReference(project_id, dataset_id), page_size=self.LIST_PAGE_SIZE
         )
+        return ([table.table_id for table in page] for page in tables.pages)
 
-    def get_tables_in_dataset(self, project_id: str, dataset_id: str) -> list[str]:
-        """Get all tables in a BigQuery dataset."""
-        # Ensure credentials are set before attempting to use them
-        if not self.credentials:
+    async def stream_tables_in_dataset(self, project_id: str, dataset_id: str):
+        """
+            Yield the table ids of a BigQuery dataset one page at a time, as soon as every page arrives.
+            Pages are requested on a thread, so datasets are listed concurrently without blocking the event loop.
+            A failure is logged and raised, the pages yielded before it do not list the whole dataset.
+        """
+        if not self.replay and not self.credentials:
             logging.error("Credentials not initialized. Call .init() first.")
-            return []
+            return
 
-        # Pass the credentials explicitly to the BigQuery client
-        client = bigquery.Client(credentials=self.credentials, project=project_id) # MODIFIED LINE
-        
         try:
-            # list_tables expects a DatasetReference, not a string
-            dataset_ref = client.dataset(dataset_id, project=project_id) # MODIFIED LINE
-            tables = client.list_tables(dataset_ref) # MODIFIED LINE
-            table_list = []
-            for table in tables:
-                table_list.append(table.table_id)
-            return table_list
-        except google.api_core.exceptions.NotFound as e:
+            pages = await asyncio.to_thread(self._list_table_pages, project_id, dataset_id)
+            while True:
+                page = await asyncio.to_thread(next, pages, None)
+                if page is None:
+                    return
+                yield page
+        except Exception as e: # NotFound, or other potential errors, like Forbidden
+            self._log_listing_error(project_id, dataset_id, e)
+            raise
+
+    @staticmethod
+    def _log_listing_error(project_id: str, dataset_id: str, e: Exception):
+        from google.api_core.exceptions import NotFound
+
+        if isinstance(e, NotFound):
             logging.error(f"Dataset {project_id}.{dataset_id} not found: {e}")
-            return []
-        except Exception as e: # Catch other potential errors, like Forbidden
-            logging.error(f"Error listing tables in dataset {project_id}.{dataset_id}: {e}")
-            return []
\ No newline at end of file
+        else:
+            logging.error(f"Error listing tables in dataset {project_id}.{dataset_id}: {e}")
\ No newline at end of file
@@ -0,0 +1,174 @@
+from typing import Iterable, Optional
+import re
+
+# Query returning every column of every table in a dataset, with the descriptions of nested fields
+# and the clustering order. Nested structure and order is parsed from the data_type of the column.
+COLUMNS_QUERY = """
+SELECT
+  c.table_name,
+  c.column_name,
+  c.ordinal_position,
+  c.is_nullable,
+  c.data_type,
+  c.clustering_ordinal_position,
+  p.field_path,
+  p.description,
+  CAST(t.last_modified_time AS STRING) AS last_modified_time
+FROM `{project_id}.{dataset_id}.INFORMATION_SCHEMA.COLUMNS` AS c
+JOIN `{project_id}.{dataset_id}.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS` AS p
+  USING (table_name, column_name)
+LEFT JOIN `{project_id}.{dataset_id}.__TABLES__` AS t
+  ON t.table_id = c.table_name
+{where}
+ORDER BY c.table_name, c.ordinal_position, p.field_path
+"""
+
+# standard sql type names mapped to the legacy names returned by the tables.get api
+LEGACY_TYPE_NAMES = {
+    "INT64": "INTEGER",
+    "FLOAT64": "FLOAT",
+    "BOOL": "BOOLEAN",
+    "STRUCT": "RECORD",
+}
+
+_TOKEN = re.compile(r"\s*(`[^`]*`|[A-Za-z_][A-Za-z0-9_]*|[<>(),]|'[^']*'|\S)")
+
+
+def _tokenize(data_type: str) -> list[str]:
+    return [t for t in _TOKEN.findall(data_type) if t.strip()]
+
+
+class _TypeParser:
+    """Parse a standard sql data_type like ARRAY<STRUCT<a STRING, b INT64>> into tables.get fields"""
+
+    def __init__(self, data_type: str):
+        self.tokens = _tokenize(data_type)
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, token: str):
+        if self.take() != token:
+            raise ValueError(f"Expected {token} at position {self.pos} in {' '.join(self.tokens)}")
+
+    def skip_parens(self):
+        """Skip parameters like STRING(10) or NUMERIC(10, 2)"""
+        depth = 0
+        while self.peek() is not None:
+            token = self.take()
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def skip_modifiers(self) -> bool:
+        """Skip NOT NULL, COLLATE and OPTIONS, returns True if the field is NOT NULL"""
+        required = False
+        while self.peek() is not None and self.peek().upper() in ("NOT", "COLLATE", "OPTIONS"):
+            token = self.take().upper()
+            if token == "NOT":
+                self.take()  # NULL
+                required = True
+            elif token == "COLLATE":
+                self.take()
+            else:
+                self.skip_parens()
+        return required
+
+    def parse_type(self) -> dict:
+        """Parse a type, returns a dict with type, mode and fields"""
+        name = self.take().upper()
+        if name == "ARRAY":
+            self.expect("<")
+            element = self.parse_type()
+            self.expect(">")
+            element["mode"] = "REPEATED"
+            return element
+        if name == "STRUCT":
+            self.expect("<")
+            fields = []
+            while True:
+                field_name = self.take().strip("`")
+                field = self.parse_type()
+                if self.skip_modifiers() and field.get("mode") != "REPEATED":
+                    field["mode"] = "REQUIRED"
+                fields.append({"name": field_name, **field})
+                if self.peek() == ",":
+                    self.take()
+                    continue
+                break
+            self.expect(">")
+            return {"type": "RECORD", "mode": "NULLABLE", "fields": fields}
+        if name == "RANGE" and self.peek() == "<":
+            self.take()
+            self.parse_type()
+            self.expect(">")
+        if self.peek() == "(":
+            self.skip_parens()
+        return {"type": LEGACY_TYPE_NAMES.get(name, name), "mode": "NULLABLE"}
+
+
+def parse_data_type(data_type: str) -> dict:
+    """Parse the data_type of an INFORMATION_SCHEMA column into a tables.get field (without name)"""
+    return _TypeParser(data_type).parse_type()
+
+
+def _apply_descriptions(field: dict, path: str, descriptions: dict):
+    """Attach the descriptions from COLUMN_FIELD_PATHS to a field and its children"""
+    if descriptions.get(path) is not None:
+        field["description"] = descriptions[path]
+    for child in field.get("fields", []):
+        _apply_descriptions(child, f"{path}.{child['name']}", descriptions)
+
+
+def rows_to_table_schemas(project_id: str, dataset_id: str, rows: Iterable[dict]) -> dict[str, dict]:
+    """
+        Rebuild tables.get style table json from the rows of COLUMNS_QUERY,
+        returns a dict of table_id to table json, ready for _parse_schema.
+    """
+    tables = {}
+    for row in rows:
+        table_id = row["table_name"]
+        table = tables.setdefault(table_id, {
+            "columns": {},
+            "descriptions": {},
+            "last_modified_time": row.get("last_modified_time"),
+        })
+        table["descriptions"][row["field_path"]] = row.get("description")
+        if row["column_name"] not in table["columns"]:
+            table["columns"][row["column_name"]] = row
+
+    schemas = {}
+    for table_id, table in tables.items():
+        fields = []
+        clustering = []
+        columns = sorted(table["columns"].values(), key=lambda r: r["ordinal_position"])
+        for column in columns:
+            field = {"name": column["column_name"], **parse_data_type(column["data_type"])}
+            if column.get("is_nullable") == "NO" and field["mode"] != "REPEATED":
+                field["mode"] = "REQUIRED"
+            _apply_descriptions(field, column["column_name"], table["descriptions"])
+            fields.append(field)
+            if column.get("clustering_ordinal_position") is not None:
+                clustering.append(column)
+
+        schema = {
+            "tableReference": {"projectId": project_id, "datasetId": dataset_id, "tableId": table_id},
+            "schema": {"fields": fields},
+        }
+        if table["last_modified_time"] is not None:
+            schema["lastModifiedTime"] = str(table["last_modified_time"])
+        if clustering:
+            clustering.sort(key=lambda r: r["clustering_ordinal_position"])
+            schema["clustering"] = {"fields": [c["column_name"] for c in clustering]}
+        schemas[table_id] = schema
+
+    return schemas
@@ -0,0 +1,110 @@
+"""
+    Single pass normalizer from tables.get json to a DatabaseTable.
+
+    Produces the same models as validating DatabaseTable and its DatabaseField before-validators,
+    but walks the json once and builds the models with model_construct, without revalidating children.
+"""
+
+from looker_loader.enums import LookerBigQueryDataType
+from looker_loader.models.database import DatabaseField, DatabaseTable
+
+BASE_SQL = "${TABLE}"
+
+
+def _flatten(fields: list[dict], prefix: str = "") -> list[tuple[str, dict]]:
+    """Flatten non-repeated structs into dotted names, repeated fields and primitives are kept"""
+    flattened = []
+    for field in fields:
+        name = f"{prefix}{field.get('name')}"
+        if (field.get("mode") != "REPEATED" and
+            field.get("type") == "RECORD" and
+            field.get("fields") is not None):
+            flattened.extend(_flatten(field.get("fields"), prefix=f"{name}."))
+        else:
+            flattened.append((name, field))
+    return flattened
+
+
+def _looker_type(db_type: str) -> tuple[str, str]:
+    """Map a BigQuery type to its Looker type, returns (type, db_type)"""
+    db_type = db_type.upper()
+    looker_type = LookerBigQueryDataType.get(db_type)
+    if looker_type is None:
+        raise ValueError(f"Invalid type: {db_type}")
+    return looker_type, db_type
+
+
+def _build_field(values: dict, fields=None) -> DatabaseField:
+    """Build a DatabaseField from the normalized values of a field"""
+    looker_type, db_type = _looker_type(values.get("type"))
+    parent_mode = values.get("parent_mode")
+    parent_db_type = values.get("parent_db_type")
+    name = values.get("name")
+    return DatabaseField.model_construct(
+        name=name,
+        type=looker_type,
+        db_type=db_type,
+        order=values.get("order"),
+        mode=values.get("mode"),
+        is_clustered=values.get("is_clustered", False),
+        description=values.get("description"),
+        parent_name=values.get("parent_name"),
+        parent_mode=parent_mode,
+        parent_type=values.get("parent_type"),
+        parent_db_type=parent_db_type,
+        is_nested=values.get("is_nested", False),
+        depth=values.get("depth", 0),
+        sql=BASE_SQL if parent_mode == "REPEATED" and parent_db_type == "ARRAY" else f"{BASE_SQL}.{name}",
+        fields=fields,
+        table_name=values.get("table_name"),
+        sub_table_name=values.get("sub_table_name"),
+    )
+
+
+def normalize_table(json: dict, strict: bool = False) -> DatabaseTable:
+    """
+        Normalize a tables.get response into a DatabaseTable.
+        With strict=True the models are built through full pydantic validation instead, for debugging.
+    """
+    table_ref = json.get("tableReference")
+    table_name = table_ref.get("tableId")
+    clustering_fields = set(json.get("clustering", {}).get("fields", []))
+    raw_fields = json.get("schema").get("fields")
+
+    table = {
+        "name": table_name,
+        "table_group": table_ref.get("datasetId"),
+        "table_project": table_ref.get("projectId"),
+        "sql_table_name": f'{table_ref.get("projectId")}.{table_ref.get("datasetId")}.{table_ref.get("tableId")}',
+    }
+
+    normalized = []
+    for order, (name, field) in enumerate(_flatten(raw_fields)):
+        values = {k: v for k, v in field.items() if k != "fields"}
+        values["name"] = name
+        if field.get("name") in clustering_fields and name == field.get("name"):
+            values["is_clustered"] = True
+        values["order"] = order
+        values["table_name"] = table_name
+        values["sub_table_name"] = table_name
+        normalized.append(values)
+
+    if strict:
+        return DatabaseTable(fields=normalized, **table)
+
+    fields = []
+    for values in normalized:
+        children = None
+        if values.get("mode") == "REPEATED":
+            # arrays get a single child holding one value of the array, like repeated structs
+            child = dict(values)
+            child["mode"] = "NULLABLE"
+            child["parent_db_type"] = "ARRAY"
+            child["parent_mode"] = "REPEATED"
+            child["description"] = f"A single value from {values.get('description', '')}"
+            child["depth"] = values.get("depth", 0) + 1
+            child["sub_table_name"] = f"{values.get('table_name')}__{values.get('name')}"
+            children = [_build_field(child)]
+        fields.append(_build_field(values, fields=children))
+
+    return DatabaseTable.model_construct(fields=fields, type=None, labels=None, **table)
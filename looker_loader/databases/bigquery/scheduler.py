@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional
+import httpx
+from looker_loader.profiling import profiler
+
+
+class TokenBucket:
+    """A token bucket limiting the request rate against a single project."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock=time.monotonic, sleep=asyncio.sleep):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        while True:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await self._sleep((1 - self._tokens) / self.rate)
+
+
+class RetryBudget:
+    """A run-level budget of retries, shared by every request in the run."""
+
+    def __init__(self, retries: int):
+        self.remaining = retries
+
+    def spend(self) -> bool:
+        """Take one retry from the budget, returns False when it is exhausted."""
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an http date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """
+        Schedules requests against the BigQuery REST api.
+        Requests are rate limited per project, and retried with exponential
+        backoff and jitter on rate limits, server errors and transport errors
+        as long as the run-level retry budget allows it.
+    """
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        requests_per_second: Optional[float] = None,
+        retry_budget: int = 500,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        sleep=asyncio.sleep,
+    ):
+        self.max_retries = max_retries
+        self.requests_per_second = requests_per_second
+        self.budget = RetryBudget(retry_budget)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._buckets = {}
+
+    def _bucket(self, project_id: str) -> Optional[TokenBucket]:
+        """Get the token bucket of a project"""
+        if not self.requests_per_second:
+            return None
+        if project_id not in self._buckets:
+            self._buckets[project_id] = TokenBucket(self.requests_per_second, sleep=self._sleep)
+        return self._buckets[project_id]
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before the next attempt, full jitter unless the server told us"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def request(
+        self,
+        send: Callable[[], Awaitable[httpx.Response]],
+        project_id: str,
+        description: str = "",
+    ) -> httpx.Response:
+        """
+            Run send() until it succeeds or retries are exhausted.
+            Returns the last response, or raises the last transport error.
+        """
+        bucket = self._bucket(project_id)
+        attempt = 0
+        while True:
+            if bucket is not None:
+                await bucket.acquire()
+
+            retry_after = None
+            profiler.count("http_requests")
+            if attempt:
+                profiler.count("http_retries")
+            try:
+                response = await send()
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries or not self.budget.spend():
+                    raise
+                logging.debug(f"Transport error for {description}, retrying: {e}")
+            else:
+                if response.status_code not in self.RETRY_STATUS_CODES:
+                    return response
+                if attempt >= self.max_retries:
+                    return response
+                if not self.budget.spend():
+                    logging.warning(f"Retry budget exhausted, not retrying {description}")
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                logging.debug(f"Got {response.status_code} for {description}, retrying")
+
+            await self._sleep(self._backoff(attempt, retry_after))
+            attempt += 1
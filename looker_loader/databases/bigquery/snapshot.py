@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import struct
+import zlib
+from typing import Optional
+
+MAGIC = b"LLSNAP01"
+FOOTER = struct.Struct(">QQ")
+
+
+class SnapshotStore:
+    """
+        On-disk store of the raw table json fetched from BigQuery, used to replay runs offline.
+
+        There is one file per dataset. Every table is compressed on its own and the file ends with
+        a compressed index of table_id to [offset, length], followed by a footer pointing to the index,
+        so a single table can be read without decompressing the whole dataset.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._indexes = {}
+        self._pending = {}
+
+    def _file_path(self, project_id: str, dataset_id: str) -> str:
+        return os.path.join(self.path, f"{project_id}.{dataset_id}.snapshot")
+
+    def _index(self, project_id: str, dataset_id: str) -> dict:
+        """Read the index of a dataset file, empty if there is no snapshot of the dataset"""
+        key = (project_id, dataset_id)
+        if key not in self._indexes:
+            file_path = self._file_path(project_id, dataset_id)
+            try:
+                with open(file_path, "rb") as f:
+                    f.seek(-(FOOTER.size + len(MAGIC)), os.SEEK_END)
+                    offset, length = FOOTER.unpack(f.read(FOOTER.size))
+                    if f.read(len(MAGIC)) != MAGIC:
+                        raise ValueError(f"{file_path} is not a snapshot file")
+                    f.seek(offset)
+                    self._indexes[key] = json.loads(zlib.decompress(f.read(length)))
+            except FileNotFoundError:
+                self._indexes[key] = {}
+        return self._indexes[key]
+
+    def _read_raw(self, project_id: str, dataset_id: str, table_id: str) -> Optional[bytes]:
+        """Read the compressed json of a table"""
+        entry = self._index(project_id, dataset_id).get(table_id)
+        if entry is None:
+            return None
+        with open(self._file_path(project_id, dataset_id), "rb") as f:
+            f.seek(entry[0])
+            return f.read(entry[1])
+
+    def tables(self, project_id: str, dataset_id: str) -> list[str]:
+        """List the tables of a dataset in the snapshot"""
+        return sorted(self._index(project_id, dataset_id))
+
+    def read(self, project_id: str, dataset_id: str, table_id: str) -> Optional[dict]:
+        """Read the json of a table, None if the table is not in the snapshot"""
+        pending = self._pending.get((project_id, dataset_id), {})
+        if table_id in pending:
+            return json.loads(zlib.decompress(pending[table_id]))
+        raw = self._read_raw(project_id, dataset_id, table_id)
+        if raw is None:
+            return None
+        return json.loads(zlib.decompress(raw))
+
+    def add(self, project_id: str, dataset_id: str, table_id: str, table_json: dict):
+        """Add the json of a table, it is written to disk on flush()"""
+        self._pending.setdefault((project_id, dataset_id), {})[table_id] = zlib.compress(
+            json.dumps(table_json, sort_keys=True).encode("utf-8")
+        )
+
+    def flush(self):
+        """Write the added tables to disk, keeping tables already in the snapshot"""
+        os.makedirs(self.path, exist_ok=True)
+        for (project_id, dataset_id), pending in self._pending.items():
+            blobs = {
+                table_id: self._read_raw(project_id, dataset_id, table_id)
+                for table_id in self._index(project_id, dataset_id)
+                if table_id not in pending
+            }
+            blobs.update(pending)
+
+            file_path = self._file_path(project_id, dataset_id)
+            tmp_path = f"{file_path}.tmp"
+            index = {}
+            with open(tmp_path, "wb") as f:
+                for table_id in sorted(blobs):
+                    index[table_id] = [f.tell(), len(blobs[table_id])]
+                    f.write(blobs[table_id])
+                offset = f.tell()
+                raw_index = zlib.compress(json.dumps(index, sort_keys=True).encode("utf-8"))
+                f.write(raw_index)
+                f.write(FOOTER.pack(offset, len(raw_index)))
+                f.write(MAGIC)
+            os.replace(tmp_path, file_path)
+            self._indexes[(project_id, dataset_id)] = index
+            logging.info(f"Saved snapshot of {len(index)} tables in {project_id}.{dataset_id} to {file_path}")
+        self._pending = {}
@@ -3,6 +3,8 @@
 import os
 from typing import Dict
 from looker_loader.models.looker import LookerView, ValidatedLookerDimension, LookerMeasure
+from looker_loader.models.mixture import MixtureField
+from looker_loader.profiling import timed
 import logging
 
 
@@ -15,6 +17,8 @@ class LookmlGenerator:
 
     def _dump_model(self, object, config):
         """ Handle dumping, with configurable options """
+        if isinstance(object, MixtureField):
+            return object.dump(include_descriptions=config.include_descriptions)
         if not config.include_descriptions:
             return object.model_dump(exclude={'description'})
         return object.model_dump()
@@ -39,8 +43,11 @@ class LookmlGenerator:
             if field.fields is not None:
                 self._generate_views(field, config, views, parent=view_name)
             if field.measures is not None:
-                for measure in field.measures:
-                    view_measures.append(self._dump_model(measure, config))
+                if isinstance(field, MixtureField):
+                    view_measures.extend(field.dump_measures(include_descriptions=config.include_descriptions))
+                else:
+                    for measure in field.measures:
+                        view_measures.append(self._dump_model(measure, config))
         view = LookerView(**{
             "name": view_name,
             "sql_table_name": model.sql_table_name,
@@ -96,6 +103,7 @@ class LookmlGenerator:
 
             return explore
 
+    @timed("generate")
     def generate(self, model, config) -> Dict:
         """Generate LookML for a model."""
         view_groups = self._generate_views(model, config)
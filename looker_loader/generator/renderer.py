@@ -0,0 +1,140 @@
+"""Mixing and rendering of tables into LookML, in process or on a process pool."""
+
+import functools
+import logging
+import os
+import pickle
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+from looker_loader.generator.lookml import LookmlGenerator
+from looker_loader.tools.lkml_converter import convert_to_lkml
+from looker_loader.profiling import profiler
+from looker_loader.tools.recipe_mixer import RecipeMixer
+
+
+class TableRenderer:
+    """Runs mixturize -> generate -> convert_to_lkml for a single table"""
+
+    def __init__(self, mixer: RecipeMixer, lookml: LookmlGenerator):
+        self.mixer = mixer
+        self.lookml = lookml
+
+    def convert(self, job: dict) -> str:
+        """Convert a job, a dict of schema and config, to LookML"""
+        config = job.get("config")
+        schema = job.get("schema")
+        with profiler.table(schema.sql_table_name):
+            mixture = self.mixer.mixturize(schema, config=config)
+            views, explore = self.lookml.generate(
+                model=mixture,
+                config=config,
+            )
+            return convert_to_lkml(views, explore)
+
+    def convert_profiled(self, job: dict) -> tuple[str, Optional[dict]]:
+        """Convert a job in this process, the profile samples are recorded directly"""
+        return self.convert(job), None
+
+
+# the renderer of a worker process and the generation of the mixer it was built with, see RenderPool
+_worker_renderer = None
+_worker_generation = 0
+
+
+def _worker_state(mixer: RecipeMixer, lookml: LookmlGenerator) -> tuple:
+    """What a worker builds its renderer from"""
+    return (mixer.cookbook, mixer.lexicanum, mixer.cache.maxsize, mixer.batch_min_fields, lookml._cli_args)
+
+
+def _build_worker_renderer(state: tuple, generation: int):
+    global _worker_renderer, _worker_generation
+    cookbook, lexicanum, cache_size, batch_min_fields, cli_args = state
+    _worker_renderer = TableRenderer(
+        RecipeMixer(cookbook, lexicanum, cache_size=cache_size, batch_min_fields=batch_min_fields),
+        LookmlGenerator(cli_args=cli_args),
+    )
+    _worker_generation = generation
+
+
+def _init_worker(state: tuple, profile: bool = False):
+    if profile:
+        profiler.enable()
+    _build_worker_renderer(state, 0)
+
+
+def _convert_in_worker(job: dict, generation: int = 0, state_path: Optional[str] = None) -> tuple[str, Optional[dict]]:
+    """
+        Convert a job in a worker, returns the LookML and the profile samples to merge.
+        A job of a newer generation carries the path its state was pickled to, the worker rebuilds its renderer
+        from it once.
+    """
+    if generation != _worker_generation:
+        with open(state_path, "rb") as f:
+            _build_worker_renderer(pickle.load(f), generation)
+    return _worker_renderer.convert(job), profiler.drain()
+
+
+class RenderPool:
+    """
+        The executor converting tables to LookML off the event loop, kept for a whole run or watch session.
+        A single thread converting with the given mixer, or a process pool of workers building their own.
+        update() swaps the mixer without restarting the workers, they rebuild theirs on their next job.
+        Writing is left to the caller.
+    """
+
+    def __init__(self, mixer: RecipeMixer, lookml: LookmlGenerator, workers: int = 1):
+        self.mixer = mixer
+        self.lookml = lookml
+        self.workers = workers
+        self._generation = 0
+        self._state_path = None
+        if workers <= 1:
+            self.executor: Executor = ThreadPoolExecutor(max_workers=1)
+            self._renderer = TableRenderer(mixer, lookml)
+            return
+
+        logging.info(f"Rendering tables on {workers} processes")
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(_worker_state(mixer, lookml), profiler.enabled),
+        )
+
+    def update(self, mixer: RecipeMixer):
+        """Convert the next jobs with a new mixer"""
+        if mixer is self.mixer:
+            return
+        self.mixer = mixer
+        if self.workers <= 1:
+            self._renderer = TableRenderer(mixer, self.lookml)
+            return
+        # the state is written once per generation, jobs only carry its path, every worker reads it once
+        fd, state_path = tempfile.mkstemp(prefix="looker_loader_render_", suffix=".pickle")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(_worker_state(mixer, self.lookml), f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remove_state()
+        self._generation += 1
+        self._state_path = state_path
+
+    def _remove_state(self):
+        if self._state_path is not None:
+            try:
+                os.remove(self._state_path)
+            except OSError:
+                pass
+            self._state_path = None
+
+    @property
+    def render(self) -> Callable[[dict], tuple[str, Optional[dict]]]:
+        """
+            The function converting a job on the executor, returns the LookML
+            and the profile samples of a worker, to merge into the profiler.
+        """
+        if self.workers <= 1:
+            return self._renderer.convert_profiled
+        return functools.partial(_convert_in_worker, generation=self._generation, state_path=self._state_path)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self._remove_state()
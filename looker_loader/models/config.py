@@ -1,8 +1,9 @@
-from typing import List, Optional, Union
-from pydantic import BaseModel, Field, model_validator, field_validator, ValidationError
+from typing import List, Literal, Optional, Union
+from pydantic import BaseModel, Field, model_validator, field_validator, ValidationError, ConfigDict
 
 class DatasetConfig(BaseModel):
     """Dataset configuration model for Looker Loader"""
+    model_config = ConfigDict(defer_build=True)
     prefix_views: Optional[str] = Field(
         default="",
         description="Prefix to be added to all table names in the dataset"
@@ -58,6 +59,7 @@ class DatasetConfig(BaseModel):
 
 class LoaderConfig(BaseModel):
     """Loader configuration model for Looker Loader"""
+    model_config = ConfigDict(defer_build=True)
     lexicanum: Optional[bool] = Field(
         default=False,
         description="Whether to use lexicanum for loading Looker data"
@@ -70,9 +72,62 @@ class LoaderConfig(BaseModel):
         default=None,
         description="Service account to impersonate for BigQuery operations"
     )
+    max_connections: Optional[int] = Field(
+        default=20,
+        description="Maximum number of pooled HTTP connections used to fetch table schemas"
+    )
+    max_concurrency: Optional[int] = Field(
+        default=20,
+        description="Maximum number of table schema requests in flight at the same time"
+    )
+    max_in_flight: Optional[int] = Field(
+        default=64,
+        description="Maximum number of tables being fetched, or waiting to be rendered, at the same time"
+    )
+    max_retries: Optional[int] = Field(
+        default=5,
+        description="Maximum number of retries for a single BigQuery request"
+    )
+    requests_per_second: Optional[float] = Field(
+        default=50,
+        description="Maximum number of BigQuery requests per second against a single project"
+    )
+    retry_budget: Optional[int] = Field(
+        default=500,
+        description="Maximum number of retries across the whole run"
+    )
+    token_refresh_margin: Optional[float] = Field(
+        default=300,
+        description="Seconds ahead of its expiry the access token is refreshed, so long runs never send an expired token"
+    )
+    schema_source: Optional[Literal["tables_api", "information_schema"]] = Field(
+        default="tables_api",
+        description="Fetch schemas with one tables.get request per table, or one INFORMATION_SCHEMA query per dataset"
+    )
+    mixture_cache_size: Optional[int] = Field(
+        default=4096,
+        description="Number of combined recipes to cache, fields with the same attributes reuse the cached result"
+    )
+    batch_match_min_fields: Optional[int] = Field(
+        default=None,
+        description="Match tables with at least this many fields, nested included, against every recipe in one batch"
+    )
+    incremental: Optional[bool] = Field(
+        default=True,
+        description="Whether to skip tables whose schema, recipe, lexicanum entries and config are unchanged since the last run"
+    )
+    cache_path: Optional[str] = Field(
+        default="./.looker_loader",
+        description="Path where the loader keeps state between runs, like the manifest of generated files"
+    )
+    max_write_workers: Optional[int] = Field(
+        default=8,
+        description="Number of threads writing the generated files"
+    )
 
 class BigQuery(BaseModel):
     """BigQuery model for Looker Loader"""
+    model_config = ConfigDict(defer_build=True)
     project_id: str
     dataset_id: str
     config: DatasetConfig = Field(default_factory=DatasetConfig, description="Dataset Configuration")
@@ -80,6 +135,7 @@ class BigQuery(BaseModel):
 
 class Config(BaseModel):
     """Config model for Looker Loader"""
+    model_config = ConfigDict(defer_build=True)
     bigquery: List[BigQuery]
     loader: Optional[LoaderConfig] = Field(
         default_factory=LoaderConfig,
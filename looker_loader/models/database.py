@@ -102,6 +102,7 @@ class DatabaseField(BaseModel):
 
     class Config:
         from_attributes = True
+        defer_build = True
 
 
 class DatabaseTable(BaseModel):
@@ -116,6 +117,7 @@ class DatabaseTable(BaseModel):
 
     class Config:
         from_attributes = True
+        defer_build = True
 
     @model_validator(mode="before")
     def flatten_non_repeated_structs(cls, values: Dict[str, Any]) -> Dict[str, Any]:
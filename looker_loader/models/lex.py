@@ -1,10 +1,18 @@
 
 from typing import Dict, Optional
-from pydantic import BaseModel, Field, model_validator, field_validator, ValidationError, RootModel
+from pydantic import BaseModel, Field, model_validator, field_validator, ValidationError, RootModel, ConfigDict
 from looker_loader.models.looker import (
     LookerDimension,
 )
 
 class Lex(RootModel):
+    model_config = ConfigDict(defer_build=True)
     root: Dict[str, LookerDimension]
 
+    def get(self, name: str) -> Optional[LookerDimension]:
+        """The entry of a field name, or None. Same lookup as the LexicanumStore"""
+        return self.root.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.root
+
@@ -1,5 +1,5 @@
 from typing import List, Optional, Union, Literal
-from pydantic import BaseModel, Field, model_validator, field_validator, ValidationError
+from pydantic import BaseModel, Field, model_validator, field_validator, ValidationError, ConfigDict
 import warnings
 from looker_loader.enums import LookerType,LookerDataType, LookerDateTimeframes, LookerTimeTimeframes
 
@@ -13,6 +13,7 @@ from looker_loader.enums import (
 #  metaclass
 class LookerViewElement(BaseModel):
     """Looker data for a view element."""
+    model_config = ConfigDict(defer_build=True)
     name: str = Field(default=None)
     type: Optional[Literal[
         "bin",
@@ -54,6 +55,7 @@ class LookerViewElement(BaseModel):
         return value
 
 class LookerMeasureFilter(BaseModel):
+    model_config = ConfigDict(defer_build=True)
     filter_dimension: str
     filter_expression: str
 
@@ -244,6 +246,7 @@ class ValidatedLookerMeasure(LookerMeasure):
 
 class LookerView(BaseModel):
     """Looker data for a view."""
+    model_config = ConfigDict(defer_build=True)
 
     name: str
     label: Optional[str] = None
@@ -0,0 +1,104 @@
+"""
+    Lightweight records carrying a mixed table from the RecipeMixer to the LookmlGenerator.
+
+    The recipe models are validated when the cookbook is loaded and the output models when the view
+    is built, so the fields in between are plain slotted records holding only the attributes that
+    end up in the view, instead of pydantic models dumped and validated again at every step.
+"""
+
+from typing import List, Optional
+from looker_loader.models.looker import ValidatedLookerDimension, ValidatedLookerMeasure
+from looker_loader.models.recipe import push_down_parents, render_dimension, render_measure
+
+DIMENSION_ATTRIBUTES = frozenset(ValidatedLookerDimension.model_fields)
+MEASURE_ATTRIBUTES = frozenset(ValidatedLookerMeasure.model_fields)
+
+
+def _compact(values: dict, attributes: frozenset) -> dict:
+    """Keep the set values of the attributes the output model reads"""
+    return {k: v for k, v in values.items() if v is not None and k in attributes}
+
+
+def _build_measure(values: dict) -> dict:
+    """Render a measure like LookerMixtureMeasure does"""
+    measure = _compact(render_measure(values), MEASURE_ATTRIBUTES)
+    # the output measure only removes dots from its sql
+    measure["name"] = measure["name"].replace(".", "__")
+    return measure
+
+
+def _dump(attributes: dict, include_descriptions: bool) -> dict:
+    if not include_descriptions:
+        return {k: v for k, v in attributes.items() if k != "description"}
+    return dict(attributes)
+
+
+class MixtureField:
+    """A dimension with its measures, variants and nested fields after the recipes are applied"""
+    __slots__ = ("name", "sql_table_name", "attributes", "measures", "variants", "fields")
+
+    def __init__(
+        self,
+        name: str,
+        attributes: dict,
+        measures: Optional[List[dict]] = None,
+        variants: Optional[List["MixtureField"]] = None,
+        fields: Optional[List["MixtureField"]] = None,
+        sql_table_name: Optional[str] = None,
+    ):
+        self.name = name
+        self.sql_table_name = sql_table_name
+        self.attributes = attributes
+        self.measures = measures
+        self.variants = variants
+        self.fields = fields
+
+    @classmethod
+    def build(cls, values: dict) -> "MixtureField":
+        """
+            Build a field from combined recipe values, rendering it like LookerMixtureDimension does.
+            The values dict is consumed, its measures, variants and fields may be shared
+            with cached mixtures and recipes, so copies of them are rendered.
+        """
+        for key in ("measures", "variants", "fields"):
+            if values.get(key) is not None:
+                values[key] = [dict(child) for child in values[key]]
+        render_dimension(values)
+        push_down_parents(values)
+
+        measures = values.get("measures")
+        if measures is not None:
+            measures = [_build_measure(measure) for measure in measures]
+        variants = values.get("variants")
+        if variants is not None:
+            variants = [cls.build(variant) for variant in variants]
+        fields = values.get("fields")
+        if fields is not None:
+            fields = [cls.build(field) for field in fields]
+
+        return cls(
+            name=values.get("name"),
+            attributes=_compact(values, DIMENSION_ATTRIBUTES),
+            measures=measures,
+            variants=variants,
+            fields=fields,
+            sql_table_name=values.get("sql_table_name"),
+        )
+
+    def dump(self, include_descriptions: bool = True) -> dict:
+        """A new dict of the dimension attributes, for the output models"""
+        return _dump(self.attributes, include_descriptions)
+
+    def dump_measures(self, include_descriptions: bool = True) -> List[dict]:
+        """New dicts of the measure attributes, for the output models"""
+        return [_dump(measure, include_descriptions) for measure in self.measures or []]
+
+
+class Mixture:
+    """A table with its mixed fields, variants are flattened into the fields"""
+    __slots__ = ("name", "sql_table_name", "fields")
+
+    def __init__(self, name: str, sql_table_name: Optional[str], fields: List[MixtureField]):
+        self.name = name
+        self.sql_table_name = sql_table_name
+        self.fields = fields
@@ -1,27 +1,51 @@
 from typing import List, Optional
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, model_validator, ConfigDict
 from looker_loader.models.looker import (
     LookerMeasure,
     LookerDimension,
 )
 from looker_loader.enums import LookerType
-from jinja2 import Environment
+from looker_loader.profiling import timed
+from functools import lru_cache
 import re
 import logging
 # Models for loading recipes, and for generating looker data from the combination of 
 # the database and the recipes
 
-def ji2(search, values, value=None):
-    """Jinja2 render function"""
-    jinja_env = Environment()
+def regex_replace(s, pattern, repl=''):
+    """Jinja2 filter replacing every match of a regex"""
+    return re.sub(pattern, repl, s)
+
+@lru_cache(maxsize=None)
+def jinja_env():
+    """One environment for every render, created on first render so jinja2 is not imported at startup"""
+    from jinja2 import Environment
+
+    env = Environment()
+    env.filters['regex_replace'] = regex_replace
+    return env
+
+JINJA_MARKERS = ("{{", "{%", "{#")
+LOOKER_REFERENCE = re.compile(r'\$\s*\{\s*([^\}]+?)\s*\}')
 
-    # Define your custom filter
-    def regex_replace(s, pattern, repl=''):
-        return re.sub(pattern, repl, s)
 
-    # Register it
-    jinja_env.filters['regex_replace'] = regex_replace
+@lru_cache(maxsize=2048)
+def compile_template(source: str):
+    """Compile a preprocessed template source, cached"""
+    return jinja_env().from_string(source)
 
+
+def render_template(source: str, values: dict) -> str:
+    """Render a preprocessed template source, skipping Jinja2 for plain strings"""
+    if "\r" not in source and not any(marker in source for marker in JINJA_MARKERS):
+        # same output as Jinja2, which drops a single trailing newline
+        return source[:-1] if source.endswith("\n") else source
+    return compile_template(source).render(values)
+
+
+@timed("ji2")
+def ji2(search, values, value=None):
+    """Jinja2 render function"""
     if value is not None:
         target = value
     else:
@@ -30,9 +54,9 @@ def ji2(search, values, value=None):
         return target
     else:
         pre = preprocess_jinja(target)
-        jinjaed = jinja_env.from_string(pre).render(values)
+        jinjaed = render_template(pre, values)
         post = postprocess_jinja(jinjaed)
-        logging.debug(f"Jinja2 Rendered {search}: {post}")
+        logging.debug("Jinja2 Rendered %s: %s", search, post)
         return post
 
 def preprocess_jinja(input_str):
@@ -44,9 +68,111 @@ def preprocess_jinja(input_str):
 def postprocess_jinja(input_str):
     """ if string contains ${ value } convert it to ${value} *any amount of whitespace allowed*"""
     if input_str is not None:
-        input_str = re.sub(r'\$\s*\{\s*([^\}]+?)\s*\}', r'${\1}', input_str)
+        input_str = LOOKER_REFERENCE.sub(r'${\1}', input_str)
     return input_str
 
+def render_measure(values: dict) -> dict:
+    """Name and render a measure from the parent_ values pushed down from its dimension"""
+    values["name"] = f"m_{values.get('type')}_{values.get('parent_name')}"
+
+    if values.get("alias") is not None:
+        values["alias"] = [ji2("alias", values, value=v) for v in values.get("alias")]
+    if values.get("sql") is not None:
+        values["sql"] = ji2("sql", values)
+    # if values.get("html") is not None:
+        # values["html"] =  ji2("html", values)
+    if values.get("label") is not None:
+        values["label"] = ji2("label", values)
+    if values.get("group_label") is not None:
+        values["group_label"] = ji2("group_label", values)
+    if values.get("description") is not None:
+        values["description"] = ji2("description", values)
+    if values.get("group_item_label") is None:
+        values["group_item_label"] = ji2("group_item_label", values)
+    if values.get("order_by_field") is not None:
+        values["order_by_field"] = ji2("order_by_field", values)
+
+    if values.get("sql") is None:
+        values["sql"] = f"${{{values.get("parent_name")}}}"
+    if values.get("group_label") is None:
+        values["group_label"] = values.get("parent_group_label")
+    if values.get("description") is None:
+        values["description"] = f"{values.get('type')} of {values.get("parent_name")} : {values.get("parent_description")}"
+    if values.get("value_format_name") is None:
+        values["value_format_name"] = values.get("parent_value_format_name")
+    if values.get("value_format") is None:
+        values["value_format"] = values.get("parent_value_format")
+    if values.get("hidden") is None:
+        values["hidden"] = values.get("parent_hidden")
+    values["type"] = values.get("type", values.get("parent_type", "number"))
+    return values
+
+def push_down_parents(values: dict) -> dict:
+    """Push the dimension values down to its measures and variants as parent_ values"""
+
+    def push_down(field : dict, list_params : List[str]):
+        """ push down parent information to a child field as prefixed parent_{param} information """
+        for param in list_params:
+            field[f"parent_{param}"] = values.get(param)
+            if param == "label":
+                field[f"parent_{param}"] = values.get(param) if values.get(param) else values.get("name")
+        return field
+
+    if values.get("measures") is not None:
+        inherited_children = []
+        for child in values.get("measures", []):
+            child = push_down(child, ["name", "sql", "type", "group_label", "description", "tags", "value_format_name", "value_format", "label", "hidden"])
+            inherited_children.append(child)
+        values["measures"] = inherited_children
+
+    if values.get("variants") is not None:
+        inherited_children = []
+        for child in values.get("variants", []):
+            child = push_down(child, ["name", "sql", "type", "group_label", "description", "tags", "value_format_name", "value_format", "label", "hidden"])
+            inherited_children.append(child)
+        values["variants"] = inherited_children
+    return values
+
+def render_dimension(values: dict) -> dict:
+    """Render a dimension, and name a variant from the parent_ values pushed down from its dimension"""
+    if values.get("alias") is not None:
+        values["alias"] = [ji2("alias", values, value=v) for v in values.get("alias")]
+    if values.get("sql") is not None:
+        values["sql"] = ji2("sql", values)
+    if values.get("suggest_dimension") is not None:
+        values["suggest_dimension"] = ji2("suggest_dimension", values)
+    if values.get("suggest_explore") is not None:
+        values["suggest_explore"] = ji2("suggest_explore", values)
+    # if values.get("html") is not None:
+        # values["html"] = ji2("html", values)
+    if values.get("label") is not None:
+        values["label"] = ji2("label", values)
+    if values.get("group_label") is not None:
+        values["group_label"] = ji2("group_label", values)
+    if values.get("description") is not None:
+        values["description"] = ji2("description", values)
+    if values.get("group_item_label") is None:
+        values["group_item_label"] = ji2("group_item_label", values)
+    if values.get("order_by_field") is not None:
+        values["order_by_field"] = ji2("order_by_field", values)
+
+    if values.get("suffix") is not None:
+        values["name"] = f"d_{values.get('parent_name')}_{values.get('suffix')}"
+        if values.get("remove") != "" and values.get("remove") is not None:
+            values["name"] = values["name"].replace(values.get("remove"), "")
+        if values.get("group_label") is None:
+            values["group_label"] = values.get("parent_group_label")
+        if values.get("description") is None:
+            values["description"] = f"derived {values.get('suffix')} of {values.get("parent_name")} : {values.get("parent_description")}"
+        if values.get("value_format_name") is None:
+            values["value_format_name"] = values.get("parent_value_format_name", "string")
+        if values.get("value_format") is None:
+            values["value_format"] = values.get("parent_value_format")
+        if values.get("hidden") is None:
+            values["hidden"] = values.get("parent_hidden")
+        values["type"] = values.get("type", values.get("parent_type", "string"))
+    return values
+
 class LookerRecipeDerivedDimension(LookerDimension):
     """A derived dimension in Looker"""
     suffix: str
@@ -70,39 +196,7 @@ class LookerMixtureMeasure(LookerMeasure):
 
     @model_validator(mode="before")
     def fix_name(cls, values):
-        values["name"] = f"m_{values.get('type')}_{values.get('parent_name')}"
-
-        if values.get("alias") is not None:
-            values["alias"] = [ji2("alias", values, value=v) for v in values.get("alias")]
-        if values.get("sql") is not None:
-            values["sql"] = ji2("sql", values)
-        # if values.get("html") is not None:
-            # values["html"] =  ji2("html", values)
-        if values.get("label") is not None:
-            values["label"] = ji2("label", values)
-        if values.get("group_label") is not None:
-            values["group_label"] = ji2("group_label", values)
-        if values.get("description") is not None:
-            values["description"] = ji2("description", values)
-        if values.get("group_item_label") is None:
-            values["group_item_label"] = ji2("group_item_label", values)
-        if values.get("order_by_field") is not None:
-            values["order_by_field"] = ji2("order_by_field", values)
-
-        if values.get("sql") is None:
-            values["sql"] = f"${{{values.get("parent_name")}}}"
-        if values.get("group_label") is None:
-            values["group_label"] = values.get("parent_group_label")
-        if values.get("description") is None:
-            values["description"] = f"{values.get('type')} of {values.get("parent_name")} : {values.get("parent_description")}"
-        if values.get("value_format_name") is None:
-            values["value_format_name"] = values.get("parent_value_format_name")
-        if values.get("value_format") is None:
-            values["value_format"] = values.get("parent_value_format")
-        if values.get("hidden") is None:
-            values["hidden"] = values.get("parent_hidden")
-        values["type"] = values.get("type", values.get("parent_type", "number"))
-        return values
+        return render_measure(values)
 
 class LookerMixtureDimension(LookerRecipeDimension):
     measures: Optional[List[LookerMixtureMeasure]] = None
@@ -114,72 +208,15 @@ class LookerMixtureDimension(LookerRecipeDimension):
 
     @model_validator(mode="before")
     def create(cls, values):
-
-        def push_down(field : dict, list_params : List[str]):
-            """ push down parent information to a child field as prefixed parent_{param} information """
-            for param in list_params:
-                field[f"parent_{param}"] = values.get(param)
-                if param == "label":
-                    field[f"parent_{param}"] = values.get(param) if values.get(param) else values.get("name")
-            return field
-
-        if values.get("measures") is not None:
-            inherited_children = []
-            for child in values.get("measures", []):
-                child = push_down(child, ["name", "sql", "type", "group_label", "description", "tags", "value_format_name", "value_format", "label", "hidden"])
-                inherited_children.append(child)
-            values["measures"] = inherited_children
-
-        if values.get("variants") is not None:
-            inherited_children = []
-            for child in values.get("variants", []):
-                child = push_down(child, ["name", "sql", "type", "group_label", "description", "tags", "value_format_name", "value_format", "label", "hidden"])
-                inherited_children.append(child)
-            values["variants"] = inherited_children
-        return values
+        return push_down_parents(values)
 
     @model_validator(mode="before")
     def fix_name(cls, values):
-        if values.get("alias") is not None:
-            values["alias"] = [ji2("alias", values, value=v) for v in values.get("alias")]
-        if values.get("sql") is not None:
-            values["sql"] = ji2("sql", values)
-        if values.get("suggest_dimension") is not None:
-            values["suggest_dimension"] = ji2("suggest_dimension", values)
-        if values.get("suggest_explore") is not None:
-            values["suggest_explore"] = ji2("suggest_explore", values)
-        # if values.get("html") is not None:
-            # values["html"] = ji2("html", values)
-        if values.get("label") is not None:
-            values["label"] = ji2("label", values)
-        if values.get("group_label") is not None:
-            values["group_label"] = ji2("group_label", values)
-        if values.get("description") is not None:
-            values["description"] = ji2("description", values)
-        if values.get("group_item_label") is None:
-            values["group_item_label"] = ji2("group_item_label", values)
-        if values.get("order_by_field") is not None:
-            values["order_by_field"] = ji2("order_by_field", values)
-
-        if values.get("suffix") is not None:
-            values["name"] = f"d_{values.get('parent_name')}_{values.get('suffix')}"
-            if values.get("remove") != "" and values.get("remove") is not None:
-                values["name"] = values["name"].replace(values.get("remove"), "")
-            if values.get("group_label") is None:
-                values["group_label"] = values.get("parent_group_label")
-            if values.get("description") is None:
-                values["description"] = f"derived {values.get('suffix')} of {values.get("parent_name")} : {values.get("parent_description")}"
-            if values.get("value_format_name") is None:
-                values["value_format_name"] = values.get("parent_value_format_name", "string")
-            if values.get("value_format") is None:
-                values["value_format"] = values.get("parent_value_format")
-            if values.get("hidden") is None:
-                values["hidden"] = values.get("parent_hidden")
-            values["type"] = values.get("type", values.get("parent_type", "string"))
-        return values
+        return render_dimension(values)
 
 class LookerMixture(BaseModel):
     """A mixture of dimensions and measures in Looker"""
+    model_config = ConfigDict(defer_build=True)
     name: str
     fields: Optional[List[LookerMixtureDimension]] = None
     measures: Optional[List[LookerMixtureMeasure]] = None
@@ -189,6 +226,7 @@ class LookerMixture(BaseModel):
 
 class RecipeFilter(BaseModel):
     """a filter for a recipe"""
+    model_config = ConfigDict(defer_build=True)
 
     types: Optional[List[LookerType]] = None
     db_types: Optional[List[str]] = None
@@ -219,6 +257,7 @@ class Recipe(BaseModel):
     - measures: measures to generate for the columns
     that are useful for that data
     """
+    model_config = ConfigDict(defer_build=True)
 
     name: str
     filters: RecipeFilter
@@ -226,6 +265,7 @@ class Recipe(BaseModel):
 
 class CookBook(BaseModel):
     """A cookbook of recipes"""
+    model_config = ConfigDict(defer_build=True)
 
     # every recipe has a name
     recipes: List[Recipe]
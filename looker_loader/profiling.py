@@ -0,0 +1,202 @@
+"""
+    Per-stage and per-table timings and counters of a run, reported as JSON with --profile.
+
+    Instrumented code records into the module level `profiler`, which ignores everything until
+    it is enabled, so the hooks cost a single attribute check on normal runs.
+    Worker processes profile into their own profiler, their samples are drained and merged
+    into the main one with every rendered table.
+"""
+
+import functools
+import inspect
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# the table the current thread or task works on, timings are also added to its per-table totals
+_current_table: ContextVar[Optional[str]] = ContextVar("current_table", default=None)
+
+
+def percentile(ordered: list, q: float) -> float:
+    """Nearest rank percentile of a sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(values: list, scale: float = 1.0) -> dict:
+    """Count, total and distribution of a list of samples, multiplied by scale"""
+    ordered = sorted(v * scale for v in values)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "total": round(total, 3),
+        "mean": round(total / len(ordered), 3) if ordered else 0.0,
+        "p50": round(percentile(ordered, 50), 3),
+        "p95": round(percentile(ordered, 95), 3),
+        "p99": round(percentile(ordered, 99), 3),
+        "max": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+class Profiler:
+    """Collects stage timings, counters and distributions, thread safe"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.timings = defaultdict(list)
+        self.tables = defaultdict(lambda: defaultdict(float))
+        self.counters = defaultdict(int)
+        self.samples = defaultdict(list)
+
+    def enable(self):
+        self.enabled = True
+        self.reset()
+
+    def disable(self):
+        self.enabled = False
+
+    def record(self, stage: str, seconds: float, table: Optional[str] = None):
+        """Record the duration of one call of a stage"""
+        table = table or _current_table.get()
+        with self._lock:
+            self.timings[stage].append(seconds)
+            if table is not None:
+                self.tables[table][stage] += seconds
+
+    def count(self, name: str, n: int = 1):
+        """Add to a counter"""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += n
+
+    def observe(self, name: str, value: float):
+        """Add a sample to a distribution"""
+        if self.enabled:
+            with self._lock:
+                self.samples[name].append(value)
+
+    @contextmanager
+    def stage(self, name: str, table: Optional[str] = None):
+        """Time the block as a call of the stage"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, table)
+
+    @contextmanager
+    def table(self, name: str):
+        """Attribute the stages run in the block, in this thread or task, to a table"""
+        token = _current_table.set(name)
+        try:
+            yield
+        finally:
+            _current_table.reset(token)
+
+    def drain(self) -> Optional[dict]:
+        """The raw samples as plain data, for merging into another profiler, and reset. None when disabled"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            data = {
+                "timings": dict(self.timings),
+                "tables": {table: dict(stages) for table, stages in self.tables.items()},
+                "counters": dict(self.counters),
+                "samples": dict(self.samples),
+            }
+            started = self.started
+            self.reset()
+            self.started = started
+        return data
+
+    def merge(self, data: Optional[dict]):
+        """Merge drained samples, of a worker process"""
+        if not data:
+            return
+        with self._lock:
+            for stage, values in data["timings"].items():
+                self.timings[stage].extend(values)
+            for table, stages in data["tables"].items():
+                for stage, seconds in stages.items():
+                    self.tables[table][stage] += seconds
+            for name, n in data["counters"].items():
+                self.counters[name] += n
+            for name, values in data["samples"].items():
+                self.samples[name].extend(values)
+
+    def report(self, caches: Optional[dict] = None) -> dict:
+        """
+            The report of the run: stage timings in milliseconds, per-table seconds,
+            counters, distributions and cache hit rates.
+            Counters named <cache>.hits and <cache>.misses are reported as the hit rate of the cache,
+            caches adds the stats of caches living in this process.
+        """
+        with self._lock:
+            hit_rates = {}
+            for name in self.counters:
+                cache, _, kind = name.rpartition(".")
+                if kind in ("hits", "misses") and cache not in hit_rates:
+                    hits = self.counters.get(f"{cache}.hits", 0)
+                    misses = self.counters.get(f"{cache}.misses", 0)
+                    hit_rates[cache] = {
+                        "hits": hits,
+                        "misses": misses,
+                        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                    }
+            return {
+                "wall_seconds": round(time.perf_counter() - self.started, 3),
+                "stages_ms": {stage: summarize(values, scale=1000) for stage, values in sorted(self.timings.items())},
+                "tables_seconds": {
+                    table: {stage: round(seconds, 6) for stage, seconds in sorted(stages.items())}
+                    for table, stages in sorted(self.tables.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "distributions": {name: summarize(values) for name, values in sorted(self.samples.items())},
+                "caches": {**hit_rates, **(caches or {})},
+            }
+
+
+profiler = Profiler()
+
+
+def timed(stage: str):
+    """Decorator timing every call of a function, or coroutine function, as a call of the stage"""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not profiler.enabled:
+                    return await func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    profiler.record(stage, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    return decorator
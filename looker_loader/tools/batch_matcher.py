@@ -0,0 +1,118 @@
+from itertools import compress
+from typing import List
+from looker_loader.tools.recipe_index import CompiledRecipe, RecipeIndex
+
+# below this many positions a mask is built bit by bit, above it from a string of bits in one pass
+_STRING_MASK_MIN_POSITIONS = 64
+# a column is tested on its distinct values when they are this many times fewer than the fields left,
+# the mask of every distinct value is as wide as the batch
+_DISTINCT_RATIO = 8
+_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def _mask(positions: List[int], size: int) -> int:
+    """A bitmask with the bits of the positions set"""
+    if len(positions) < _STRING_MASK_MIN_POSITIONS:
+        mask = 0
+        for position in positions:
+            mask |= 1 << position
+        return mask
+    bits = bytearray(b"0" * size)
+    for position in positions:
+        bits[position] = 49  # "1"
+    bits.reverse()
+    return int(bits, 2)
+
+
+def _positions(mask: int) -> List[int]:
+    """The positions of the bits set in a bitmask, in order"""
+    bits = bin(mask)[:1:-1].encode().translate(_BITS)
+    return list(compress(range(len(bits)), bits))
+
+
+class FieldColumns:
+    """
+        The fields of a batch as columns, one per field attribute the filters read.
+        A column keeps the value of every field, and on first use the distinct values with the bitmask
+        of the fields holding them, python ints serving as bit arrays.
+    """
+
+    def __init__(self, fields: list, attributes):
+        self.size = len(fields)
+        self.values = {}
+        self.cardinality = {}
+        self._distinct = {}
+        for attribute in attributes:
+            values = [getattr(field, attribute, None) for field in fields]
+            if attribute == "tags":
+                values = [tuple(value) if isinstance(value, list) else value for value in values]
+            self.values[attribute] = values
+            self.cardinality[attribute] = len(set(values))
+
+    def distinct(self, attribute: str) -> list:
+        """(value, mask of the fields holding it) of every distinct value of a column"""
+        distinct = self._distinct.get(attribute)
+        if distinct is None:
+            positions = {}
+            for position, value in enumerate(self.values[attribute]):
+                positions.setdefault(value, []).append(position)
+            distinct = self._distinct[attribute] = [
+                (value, _mask(p, self.size)) for value, p in positions.items()
+            ]
+        return distinct
+
+
+class BatchMatcher:
+    """
+        Matches every field of a batch against every recipe of an index at once, for very wide tables.
+
+        A recipe starts from the mask of all fields, and every predicate of its filter narrows it over the whole batch.
+        A predicate on a column of few distinct values tests each of them once and keeps the fields holding
+        the passing ones with one AND, otherwise it tests the values of the fields left only, once per value.
+        The result is the field x recipe match matrix, as the matching recipes of every field in cookbook order,
+        the same as RecipeIndex.match_compiled of every field.
+    """
+
+    def __init__(self, index: RecipeIndex):
+        self.index = index
+
+    @staticmethod
+    def _narrow(columns: FieldColumns, mask: int, attribute: str, test) -> int:
+        left = mask.bit_count()
+        if columns.cardinality[attribute] * _DISTINCT_RATIO <= left:
+            passing = 0
+            for value, value_mask in columns.distinct(attribute):
+                if test(value):
+                    passing |= value_mask
+            return mask & passing
+
+        values = columns.values[attribute]
+        positions = range(columns.size) if left == columns.size else _positions(mask)
+        if columns.cardinality[attribute] == columns.size:
+            kept = [position for position in positions if test(values[position])]
+        else:
+            results = {}
+            kept = []
+            for position in positions:
+                value = values[position]
+                result = results.get(value)
+                if result is None:
+                    result = results[value] = test(value)
+                if result:
+                    kept.append(position)
+        return _mask(kept, columns.size)
+
+    def match(self, fields: list) -> List[List[CompiledRecipe]]:
+        """The recipes matching every field, in cookbook order"""
+        columns = FieldColumns(fields, self.index.field_attributes)
+        everything = (1 << len(fields)) - 1
+        matrix = [[] for _ in fields]
+        for recipe in self.index.recipes:
+            mask = everything
+            for attribute, test in recipe.filter.predicates:
+                mask = self._narrow(columns, mask, attribute, test)
+                if not mask:
+                    break
+            for position in _positions(mask):
+                matrix[position].append(recipe)
+        return matrix
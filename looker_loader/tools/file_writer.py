@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+from looker_loader.profiling import profiler
+from looker_loader.utils import lookml_file_path, write_file_if_changed
+
+
+class FileWriter:
+    """
+        Writes generated LookML files on a thread pool, off the event loop and the renderer.
+        Files whose contents are identical on disk are not rewritten, changed files are replaced atomically.
+        Counts the files written, left unchanged and removed in the run.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lookml-writer")
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def _write(self, path: str, contents: str, table: str = None) -> bool:
+        with profiler.table(table):
+            return write_file_if_changed(path, contents)
+
+    async def write(self, output_dir: str, file_path: str, contents: str, table: str = None) -> str:
+        """Write a LookML file if it changed, returns its path"""
+        path = lookml_file_path(output_dir, file_path)
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(self._executor, self._write, path, contents, table):
+            self.written += 1
+        else:
+            self.unchanged += 1
+        return path
+
+    def remove(self, paths: Iterable[str]):
+        """Remove files of tables that are no longer generated"""
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logging.warning(f"Could not remove stale file {path}: {e}")
+                continue
+            logging.info(f"Removed stale file {path}")
+            self.removed += 1
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def summary(self) -> str:
+        return f"{self.written} files written, {self.unchanged} identical, {self.removed} removed"
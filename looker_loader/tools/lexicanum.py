@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+from typing import Optional
+import yaml
+from pydantic import ValidationError
+from looker_loader.models.looker import LookerDimension
+from looker_loader.utils import YAML_DUMPER, YAML_LOADER
+
+SIDECAR_VERSION = 2
+
+
+class LexicanumStore:
+    """
+        The lexicanum of lexicanum.yml, loaded lazily and validated per entry.
+
+        The raw entries are read on first use, from a json sidecar in the cache path when the
+        yaml file did not change since it was written, and from the yaml otherwise.
+        An entry is only validated into a LookerDimension when it is looked up.
+        Field names added in a run are appended to the yaml on save, they apply from the next run.
+    """
+
+    def __init__(self, path: str = "lexicanum.yml", cache_path: Optional[str] = None):
+        self.path = path
+        self.sidecar = os.path.join(cache_path, "lexicanum.json") if cache_path else None
+        self._entries = None
+        self._validated = {}
+        self._new = {}
+
+    @property
+    def entries(self) -> dict:
+        """The raw entries of the yaml file, by field name"""
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _stat(self) -> Optional[list]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return [os.path.abspath(self.path), stat.st_mtime_ns, stat.st_size]
+
+    def _load(self) -> dict:
+        stat = self._stat()
+        if stat is None:
+            logging.warning(f"{self.path} file not found. Creating..")
+            return {}
+
+        if self.sidecar is not None:
+            try:
+                with open(self.sidecar, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == SIDECAR_VERSION and data.get("source") == stat:
+                    logging.debug(f"Loaded lexicanum from {self.sidecar}")
+                    return data["entries"]
+            except (OSError, ValueError, AttributeError, KeyError):
+                pass
+
+        with open(self.path, "r") as f:
+            entries = yaml.load(f, Loader=YAML_LOADER) or {}
+        self._write_sidecar(entries, stat)
+        return entries
+
+    def _write_sidecar(self, entries: dict, stat: Optional[list]):
+        """Cache the parsed entries, keyed on the path, mtime and size of the yaml they were parsed from"""
+        if self.sidecar is None or stat is None:
+            return
+        # json only has string keys, yaml keys like 1 or yes would be read back as other names
+        if not all(isinstance(name, str) for name in entries):
+            return
+        try:
+            content = json.dumps({"version": SIDECAR_VERSION, "source": stat, "entries": entries})
+            os.makedirs(os.path.dirname(self.sidecar) or ".", exist_ok=True)
+            tmp_path = f"{self.sidecar}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, self.sidecar)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Could not write the lexicanum cache {self.sidecar}: {e}")
+
+    def get(self, name: str) -> Optional[LookerDimension]:
+        """The validated entry of a field name, or None"""
+        entry = self._validated.get(name)
+        if entry is not None:
+            return entry
+        raw = self.entries.get(name)
+        if raw is None:
+            return None
+        try:
+            entry = LookerDimension.model_validate(raw)
+        except ValidationError:
+            logging.error(f"Invalid lexicanum entry for {name} in {self.path}")
+            raise
+        self._validated[name] = entry
+        return entry
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def add(self, name: str):
+        """Collect a field name, new names are written to the yaml on save"""
+        if name not in self._new and name not in self.entries:
+            self._new[name] = {"label": None}
+
+    def save(self):
+        """Append the field names collected in this run to the yaml, if there are any"""
+        if not self._new:
+            logging.debug("No new lexical fields, not writing lexicanum")
+            return
+
+        logging.debug(f"Writing {len(self._new)} new lexical fields to {self.path}")
+        new = yaml.dump(
+            dict(sorted(self._new.items())), Dumper=YAML_DUMPER, sort_keys=False, allow_unicode=True
+        )
+        # appended also when the yaml has no entries, it may still hold comments
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        new = "\n" + new
+        except FileNotFoundError:
+            pass
+        with open(self.path, "a") as f:
+            f.write(new)
+
+        self.entries.update(self._new)
+        self._new = {}
+        self._write_sidecar(self.entries, self._stat())
+
+    def __getstate__(self):
+        # worker processes get the loaded entries, instead of each loading them again
+        state = dict(self.__dict__)
+        state["_entries"] = self.entries
+        return state
@@ -1,105 +1,302 @@
-import lkml
+import io
 import logging
 import re
+from lkml.keys import (
+    EXPR_BLOCK_KEYS,
+    KEYS_WITH_NAME_FIELDS,
+    PLURAL_KEYS,
+    QUOTED_LITERAL_KEYS,
+    singularize,
+)
+from pydantic import BaseModel
+from looker_loader.profiling import timed
 
 
-def fix_multiline_indentation(text, indent_size=2):
-    lines = text.split('\n')
-    fixed_lines = []
+QUOTED_MULTILINE_START = re.compile(r'^(\w+):\s*"([^"]*)$')
+UNQUOTED_MULTILINE_START = re.compile(r'^(\w+):\s*<[^>]*>?$')
 
-    inside_quoted_multiline = False
-    inside_unquoted_multiline = False
-    current_indent = ''
 
-    for line in lines:
+class MultilineIndenter:
+    """
+    Indents the continuation lines of multiline values one level below their field,
+    lkml.dump writes them as they are. Fed one line at a time.
+    """
+
+    def __init__(self, indent_size=2):
+        self.indent_size = indent_size
+        self.inside_quoted_multiline = False
+        self.inside_unquoted_multiline = False
+        self.current_indent = ''
+
+    def feed(self, line):
         stripped = line.lstrip()
-        leading_spaces = ' ' * (len(line) - len(stripped))
 
         # Check if we're inside a quoted multiline string
-        if inside_quoted_multiline:
-            fixed_lines.append(current_indent + stripped)
-            if '"' in stripped:
-                # Count quotes to check for closing
-                if stripped.count('"') % 2 == 1:
-                    inside_quoted_multiline = False
-            continue
+        if self.inside_quoted_multiline:
+            # Count quotes to check for closing
+            if '"' in stripped and stripped.count('"') % 2 == 1:
+                self.inside_quoted_multiline = False
+            return self.current_indent + stripped
 
         # Check if we're inside an unquoted multiline field
-        if inside_unquoted_multiline:
-            fixed_lines.append(current_indent + stripped)
+        if self.inside_unquoted_multiline:
             if stripped.endswith(';;'):
-                inside_unquoted_multiline = False
-            continue
+                self.inside_unquoted_multiline = False
+            return self.current_indent + stripped
 
         # Check for the start of a quoted multiline field
-        match_quoted = re.match(r'^(\w+):\s*"([^"]*)$', stripped)
-        if match_quoted:
-            multiline_key = match_quoted.group(1)
-            fixed_lines.append(line)
+        if '"' in stripped and QUOTED_MULTILINE_START.match(stripped):
             if stripped.count('"') % 2 == 1:
-                inside_quoted_multiline = True
-                current_indent = leading_spaces + ' ' * indent_size
-            continue
+                self.inside_quoted_multiline = True
+                self.current_indent = ' ' * (len(line) - len(stripped) + self.indent_size)
+            return line
 
         # Check for unquoted multiline fields like html: <a ...>
-        match_unquoted = re.match(r'^(\w+):\s*<[^>]*>?$', stripped)
-        if match_unquoted and not stripped.endswith(';;'):
-            multiline_key = match_unquoted.group(1)
-            inside_unquoted_multiline = True
-            current_indent = leading_spaces + ' ' * indent_size
-            fixed_lines.append(line)
-            continue
+        if '<' in stripped and not stripped.endswith(';;') and UNQUOTED_MULTILINE_START.match(stripped):
+            self.inside_unquoted_multiline = True
+            self.current_indent = ' ' * (len(line) - len(stripped) + self.indent_size)
+            return line
 
         # Default case: just keep the line
-        fixed_lines.append(line)
-
-    return '\n'.join(fixed_lines)
-
-def remove_empty_from_dict(data):
-  """Recursively removes keys with None or empty list values from a dictionary.
-
-  Args:
-    data: The dictionary to clean.
-
-  Returns:
-    A new dictionary with empty values removed.
-  """
-  if isinstance(data, dict):
-    return {
-        k: remove_empty_from_dict(v)
-        for k, v in data.items()
-        if v is not None and (not isinstance(v, list) or len(v) > 0)
-    }
-  elif isinstance(data, list):
-    return [remove_empty_from_dict(item) for item in data if item is not None and (not isinstance(item, list) or len(item) > 0)]
-  else:
-    return data
+        return line
 
-def convert_to_lkml(views, explore):
-    """Convert a dictionary to a LookML string."""
-        
-    python_r = []
-    for view in views:
-        python_r.append(remove_empty_from_dict(view.dict(exclude_none=True)))
 
-    if explore is not None:
-      dumpfile = {
-        "explore": remove_empty_from_dict(explore),
-        "views": python_r,
-      }
+# the kinds of the latest node written, which decide the whitespace before the next one, like lkml.DictParser
+_DOCUMENT = "document"
+_BLOCK = "block"
+_PAIR = "pair"
+_LIST = "list"
+
+_PLURAL_KEYS = frozenset(PLURAL_KEYS)
+_EXPR_BLOCK_KEYS = frozenset(EXPR_BLOCK_KEYS)
+_QUOTED_LITERAL_KEYS = frozenset(QUOTED_LITERAL_KEYS)
+_KEYS_WITH_NAME_FIELDS = frozenset(KEYS_WITH_NAME_FIELDS)
+
+
+def _is_empty(value):
+    return value is None or (isinstance(value, list) and len(value) == 0)
+
+
+def _clean(value):
+    """Drop the None and empty list items of a list"""
+    if isinstance(value, list):
+        return [item for item in value if not _is_empty(item)]
+    return value
+
+
+def _items(obj):
+    """The (key, value) pairs of a dict or model, without None or empty list values"""
+    if isinstance(obj, BaseModel):
+        pairs = ((key, getattr(obj, key)) for key in type(obj).model_fields)
     else:
-      dumpfile = {
-          "views": python_r,
-      }
+        pairs = obj.items()
+    return [(key, _clean(value)) for key, value in pairs if not _is_empty(value)]
+
+
+class _LineWriter:
+    """Passes every complete line through a MultilineIndenter before writing it out"""
+
+    def __init__(self, out):
+        self.out = out
+        self.indenter = MultilineIndenter()
+        self.partial = []
+
+    def write(self, text):
+        if "\n" not in text:
+            self.partial.append(text)
+            return
+        lines = text.split("\n")
+        self.partial.append(lines[0])
+        self.out.write(self.indenter.feed("".join(self.partial)) + "\n")
+        for line in lines[1:-1]:
+            self.out.write(self.indenter.feed(line) + "\n")
+        self.partial = [lines[-1]]
+
+    def close(self):
+        self.out.write(self.indenter.feed("".join(self.partial)))
+        self.partial = []
+
+
+class LookmlWriter:
+    """
+    Writes views and explores as LookML straight to a file object.
+
+    The output is the same as lkml.dump of the cleaned view dicts, with its multiline values
+    indented by a MultilineIndenter, without dumping the models, building the lkml parse tree
+    or rescanning the whole text.
+    Models, dicts, lists and strings are walked in the same way and with the same whitespace
+    rules as lkml.simple.DictParser.
+    """
+
+    base_indent = "  "
+
+    def __init__(self, out):
+        self._out = _LineWriter(out)
+        self.level = 0
+        self.parent_key = None
+        self.latest = _DOCUMENT
+
+    def write(self, document):
+        """Write a document, a dict like {"explore": ..., "views": [...]}"""
+        for key, value in document.items():
+            self._any(key, value)
+        self._out.close()
+
+    @property
+    def newline_indent(self):
+        return "\n" + self.base_indent * self.level
+
+    @property
+    def prefix(self):
+        """Whitespace before the next node"""
+        if self.latest == _DOCUMENT:
+            return ""
+        if self.latest == _BLOCK:
+            return "\n" + self.newline_indent
+        return self.newline_indent
+
+    def _increase_level(self):
+        self.latest = None
+        self.level += 1
+
+    def _decrease_level(self):
+        self.level -= 1
+
+    def _is_plural_key(self, key):
+        singular_key = singularize(key)
+        return (
+            singular_key in _PLURAL_KEYS
+            and not (singular_key == "allowed_value" and self.parent_key.rstrip("s") == "access_grant")
+            and not (self.parent_key == "query" and singular_key != "filters")
+        )
+
+    def _any(self, key, value):
+        """Write any value, returns the number of nodes written"""
+        if isinstance(value, str):
+            self._out.write(self._pair(key, value))
+            return 1
+        if isinstance(value, (list, tuple)):
+            if self._is_plural_key(key):
+                return self._expand_list(key, value)
+            self._list(key, value)
+            return 1
+        if isinstance(value, (dict, BaseModel)):
+            items = _items(value)
+            name = None
+            if key not in _KEYS_WITH_NAME_FIELDS:
+                for i, (item_key, item_value) in enumerate(items):
+                    if item_key == "name":
+                        name = item_value
+                        del items[i]
+                        break
+            self._block(key, items, name)
+            return 1
+        raise TypeError("Value must be a string, list, tuple, or dict.")
+
+    def _expand_list(self, key, values):
+        if key == "filters":
+            filters = [_items(value) for value in values]
+            first_keys = [item_key for item_key, _ in filters[0]]
+            if "name" in first_keys:
+                # filter-only fields, e.g. filter: order_region { type: string }
+                for items in filters:
+                    name = dict(items).pop("name")
+                    self._block("filter", [(k, v) for k, v in items if k != "name"], name)
+                return len(filters)
+            if "field" in first_keys and "value" in first_keys:
+                # legacy filters: { field: dimension_name, value: "filter expression" }
+                for items in filters:
+                    self._block("filters", items)
+                return len(filters)
+            self._list("filters", values)
+            return 1
+        singular_key = singularize(key)
+        return sum(self._any(singular_key, value) for value in values)
+
+    @staticmethod
+    def _token(key, value, force_quote=False):
+        if force_quote or key in _QUOTED_LITERAL_KEYS:
+            return '"' + value.replace(r"\"", '"').replace('"', r"\"") + '"'
+        if key in _EXPR_BLOCK_KEYS:
+            return value.strip() + " ;;"
+        return str(value)
+
+    def _pair(self, key, value):
+        """The text of a pair, like hidden: yes"""
+        force_quote = self.parent_key == "filters" and key != "field"
+        token = self._token(key, value, force_quote)
+        text = self.prefix + key + ": " + token
+        self.latest = _PAIR
+        return text
+
+    def _list(self, key, values):
+        force_quote = key == "suggestions"
+        prev_parent_key = self.parent_key
+        self.parent_key = key
+        parts = [self.prefix, key, ": ["]
+
+        pair_mode = bool(values) and not isinstance(values[0], (str, int))
+        if len(values) >= 5 or pair_mode:
+            self._increase_level()
+            items = []
+            for value in values:
+                if pair_mode:
+                    [(item_key, item_value)] = _items(value)
+                    items.append(self._pair(item_key, item_value))
+                else:
+                    items.append(self.newline_indent + self._token(key, value, force_quote))
+            self._decrease_level()
+            parts.append(",".join(items))
+            if items:
+                parts.append(",")
+            parts.append(self.newline_indent + "]")
+        else:
+            parts.append(", ".join(self._token(key, value, force_quote) for value in values))
+            parts.append("]")
+
+        self.parent_key = prev_parent_key
+        self._out.write("".join(parts))
+        self.latest = _LIST
+
+    def _block(self, key, items, name=None):
+        latest_at_this_level = self.latest
+        if latest_at_this_level is not None and latest_at_this_level != _DOCUMENT:
+            prefix = "\n" + self.newline_indent
+        else:
+            prefix = self.prefix
+        self._out.write(prefix + key + ": " + (str(name) + " {" if name else "{"))
+
+        prev_parent_key = self.parent_key
+        self.parent_key = key
+        self._increase_level()
+        written = sum(self._any(item_key, value) for item_key, value in items)
+        self._decrease_level()
+        self.parent_key = prev_parent_key
+
+        self._out.write((self.newline_indent if written else "") + "}")
+        self.latest = _BLOCK
+
+
+def write_lkml(views, explore, file_object):
+    """Write views and an explore as LookML to a file object."""
+    document = {"views": views}
+    if explore is not None:
+        document = {"explore": explore, "views": views}
+    LookmlWriter(file_object).write(document)
+
+
+@timed("convert_to_lkml")
+def convert_to_lkml(views, explore):
+    """Convert views and an explore to a LookML string."""
+    buffer = io.StringIO()
     try:
-      lk = lkml.dump(dumpfile)
+        write_lkml(views, explore, buffer)
     except TypeError as e:
         logging.error(f"Error converting to LKML: {e}")
-        try:
-          for view in python_r:
-            t = lkml.dump(view)
-        except TypeError as e2:
-            logging.error(f"Error converting individual view to LKML: {view}")
-    indention_fixed = fix_multiline_indentation(lk)
-
-    return indention_fixed
\ No newline at end of file
+        for view in views:
+            try:
+                LookmlWriter(io.StringIO()).write({"views": [view]})
+            except TypeError:
+                logging.error(f"Error converting individual view to LKML: {view}")
+        raise
+    return buffer.getvalue()
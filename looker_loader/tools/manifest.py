@@ -0,0 +1,152 @@
+import functools
+import glob
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+MANIFEST_VERSION = 2
+PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def hash_object(obj) -> str:
+    """Stable hash of a json serializable object"""
+    return hashlib.sha256(
+        json.dumps(obj, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint() -> str:
+    """Hash of the source of the package, an upgrade changing how tables are rendered regenerates them"""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(PACKAGE_PATH, "**", "*.py"), recursive=True)):
+        digest.update(os.path.relpath(path, PACKAGE_PATH).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def table_version(table_json: dict) -> dict:
+    """The parts of a tables.get response that change whenever the table changes"""
+    return {
+        "etag": table_json.get("etag"),
+        "last_modified": table_json.get("lastModifiedTime"),
+    }
+
+
+class Manifest:
+    """
+        A persistent record of what was generated for every table in the last run.
+        A table is unchanged when its etag / lastModifiedTime and the fingerprint of
+        the recipes matching it, lexicanum entries and dataset config that produced it are the same,
+        and the file it produced is still on disk.
+        The recipes every table matched and the digest of the cookbook of the run are kept to tell which
+        tables a recipe change affects.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tables = {}
+        self.cookbook = None
+
+    def load(self) -> "Manifest":
+        """Load the manifest from disk, starting empty if missing or outdated"""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logging.info(f"No manifest found at {self.path}, generating all tables")
+            return self
+        except json.JSONDecodeError:
+            logging.warning(f"Manifest at {self.path} is corrupt, generating all tables")
+            return self
+
+        if data.get("version") != MANIFEST_VERSION:
+            logging.info("Manifest version changed, generating all tables")
+            return self
+
+        self.tables = data.get("tables", {})
+        self.cookbook = data.get("cookbook")
+        return self
+
+    def save(self):
+        """Write the manifest to disk atomically"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "tables": self.tables, "cookbook": self.cookbook}, f, sort_keys=True
+            )
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def fingerprint(recipe_hash: str, config, lex_entries: Optional[dict]) -> str:
+        """
+            Fingerprint of everything besides the table schema that affects a generated file,
+            recipe_hash covers the recipes matching it, and the code of the package renders it
+        """
+        return hash_object([recipe_hash, config.model_dump(mode="json"), lex_entries, code_fingerprint()])
+
+    def is_unchanged(self, key: str, version: dict, fingerprint: str, file_path: str) -> bool:
+        """Check if the table can be skipped"""
+        entry = self.tables.get(key)
+        if entry is None:
+            return False
+        if not version.get("etag") and not version.get("last_modified"):
+            return False
+        return (
+            entry.get("etag") == version.get("etag")
+            and entry.get("last_modified") == version.get("last_modified")
+            and entry.get("fingerprint") == fingerprint
+            and os.path.exists(entry.get("file", ""))
+            and entry.get("file") == file_path
+        )
+
+    def matches(self, key: str, version: dict, cookbook: str) -> Optional[dict]:
+        """
+            The recipes a table matched in the last run,
+            if neither its schema nor the cookbook it was matched with changed since
+        """
+        entry = self.tables.get(key)
+        if entry is None or entry.get("cookbook") != cookbook or "recipes" not in entry:
+            return None
+        if not version.get("etag") and not version.get("last_modified"):
+            return None
+        if entry.get("etag") != version.get("etag") or entry.get("last_modified") != version.get("last_modified"):
+            return None
+        return entry["recipes"]
+
+    def file(self, key: str) -> Optional[str]:
+        """The file generated for a table in the last run"""
+        return self.tables.get(key, {}).get("file")
+
+    def prune(self, keys: set, datasets: set) -> list[str]:
+        """
+            Forget the tables of the given datasets that are not in keys, the tables dropped since the last run.
+            Returns the files they generated.
+        """
+        stale = [key for key in self.tables if key not in keys and key.rsplit(".", 1)[0] in datasets]
+        files = [self.tables.pop(key).get("file") for key in stale]
+        return [f for f in files if f]
+
+    def update(
+        self,
+        key: str,
+        version: dict,
+        fingerprint: str,
+        file_path: str,
+        recipes: Optional[dict] = None,
+        cookbook: Optional[str] = None,
+    ):
+        """Record what was generated for a table, and the recipes of the cookbook its fields matched"""
+        self.tables[key] = {
+            "etag": version.get("etag"),
+            "last_modified": version.get("last_modified"),
+            "fingerprint": fingerprint,
+            "file": file_path,
+        }
+        if recipes is not None:
+            self.tables[key]["recipes"] = recipes
+            self.tables[key]["cookbook"] = cookbook
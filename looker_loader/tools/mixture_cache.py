@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+
+MISSING = object()
+
+
+def copy_recipe(data):
+    """Copy a merged recipe dict, faster than deepcopy for plain dicts and lists"""
+    if isinstance(data, dict):
+        return {k: copy_recipe(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [copy_recipe(v) for v in data]
+    return data
+
+
+class MixtureCache:
+    """
+        LRU cache of merged recipe dicts, keyed on the field attributes the recipe filters read.
+        Values are shared and not copied, they must not be mutated: use copy_recipe for a mutable copy.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        """Get the cached value, or MISSING"""
+        value = self._data.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store the value, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Hit and miss counters of the cache"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._data),
+        }
@@ -0,0 +1,103 @@
+import glob
+import hashlib
+import logging
+import os
+from typing import TYPE_CHECKING, Optional, Type, TypeVar
+import yaml
+from looker_loader.exceptions import CliError
+from looker_loader.utils import YAML_LOADER
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+T = TypeVar("T", bound="BaseModel")
+
+CACHE_VERSION = 2
+PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the last model validated per model and section in this process, for reruns like watch mode
+_memory = {}
+
+
+def _code_fingerprint() -> str:
+    """Changes whenever the code of the models changes, so cached models are never built by other code"""
+    paths = sorted(glob.glob(os.path.join(PACKAGE_PATH, "models", "*.py")))
+    paths.append(os.path.join(PACKAGE_PATH, "enums.py"))
+    stats = []
+    for path in paths:
+        stat = os.stat(path)
+        stats.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+    return "\n".join(stats)
+
+
+class ModelCache:
+    """
+        Cache of models validated from yaml files, keyed on the content hash of the file.
+        The last model of every kind is kept in memory for repeated loads in this process, every load gets its own copy.
+        The model is also written to the cache path as json, the next invocation validates it from there
+        instead of parsing the yaml. Only the fields set in the yaml are written, so validating them again gives the same model.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+
+    def load(self, file_path: str, model: Type[T], section: Optional[str] = None) -> T:
+        """The model validated from a yaml file, or from one of its top level sections"""
+        try:
+            with open(file_path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError as e:
+            logging.error(f"Could not find file at {file_path}.")
+            raise CliError("File not found") from e
+
+        name = f"{model.__qualname__}-{section}" if section else model.__qualname__
+        key = hashlib.sha256(
+            b"\0".join([str(CACHE_VERSION).encode(), _code_fingerprint().encode(), content])
+        ).hexdigest()
+
+        cached = _memory.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1].model_copy(deep=True)
+
+        entry_path = os.path.join(self.path, "models", f"{name}.json") if self.path else None
+        validated = self._read(entry_path, key, model)
+        if validated is not None:
+            logging.debug(f"Loaded {file_path} from the cache")
+        else:
+            data = yaml.load(content, Loader=YAML_LOADER)
+            if section is not None:
+                data = data[section]
+            validated = model(**data)
+            if entry_path is not None:
+                self._write(entry_path, key, validated)
+
+        _memory[name] = (key, validated.model_copy(deep=True))
+        return validated
+
+    @staticmethod
+    def _read(entry_path: Optional[str], key: str, model: Type[T]) -> Optional[T]:
+        """The cached model, if the entry was written for this key. The first line of an entry is its key"""
+        if entry_path is None:
+            return None
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                if f.readline().rstrip("\n") != key:
+                    return None
+                return model.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.debug(f"Ignoring the unreadable cache {entry_path}: {e}")
+            return None
+
+    @staticmethod
+    def _write(entry_path: str, key: str, validated: "BaseModel"):
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(f"{key}\n")
+                f.write(validated.model_dump_json(exclude_unset=True, by_alias=True))
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            logging.warning(f"Could not cache {entry_path}: {e}")
@@ -0,0 +1,100 @@
+from typing import Optional
+from looker_loader.models.recipe import CookBook
+from looker_loader.tools.manifest import hash_object
+from looker_loader.tools.recipe_index import RecipeIndex
+
+
+def cookbook_digest(cookbook: CookBook) -> list:
+    """[name, hash] of every recipe name in cookbook order, recipes sharing a name are hashed together"""
+    recipes = {}
+    for recipe in cookbook.recipes:
+        recipes.setdefault(recipe.name, []).append(recipe.model_dump(mode="json"))
+    return [[name, hash_object(dumps)] for name, dumps in recipes.items()]
+
+
+def changed_recipes(old: Optional[list], new: list) -> Optional[set]:
+    """
+        Names of the recipes added, removed or edited between two cookbook digests.
+        None without an old digest, or when recipes kept in both were reordered,
+        which changes how every mixture is combined.
+    """
+    if old is None:
+        return None
+    old_hashes, new_hashes = dict(old), dict(new)
+    kept = old_hashes.keys() & new_hashes.keys()
+    if [name for name, _ in old if name in kept] != [name for name, _ in new if name in kept]:
+        return None
+    return {
+        name
+        for name in old_hashes.keys() | new_hashes.keys()
+        if old_hashes.get(name) != new_hashes.get(name)
+    }
+
+
+def match_counts(index: RecipeIndex, table) -> dict:
+    """Number of fields of a table, nested fields included, every recipe of the index matches"""
+    counts = {}
+
+    def recurse_fields(fields):
+        for field in fields or []:
+            for recipe in index.match_compiled(field):
+                counts[recipe.name] = counts.get(recipe.name, 0) + 1
+            recurse_fields(field.fields)
+
+    recurse_fields(table.fields)
+    return counts
+
+
+class RecipeImpact:
+    """
+        The recipes changed since the last run, and which recipes match the fields of every table.
+
+        The manifest keeps the recipes matched by every table in the last run, the field to recipe match index.
+        For a table whose schema did not change, only the changed recipes are matched against its fields again,
+        the matches of the other recipes are taken from the index.
+        A table depends on the recipes it matches only, so a recipe edit only changes the tables matching it.
+    """
+
+    def __init__(self, index: RecipeIndex, cookbook: CookBook, previous: Optional[list] = None):
+        self.index = index
+        self.digest = cookbook_digest(cookbook)
+        self.id = hash_object(self.digest)
+        self.previous_id = hash_object(previous) if previous is not None else None
+        self.changed = changed_recipes(previous, self.digest)
+        self._order = {name: position for position, (name, _) in enumerate(self.digest)}
+        self._hashes = dict(self.digest)
+        self._changed_index = None
+        if self.changed:
+            self._changed_index = RecipeIndex(
+                CookBook(recipes=[recipe for recipe in cookbook.recipes if recipe.name in self.changed])
+            )
+
+    def matches(self, table, previous: Optional[dict] = None) -> dict:
+        """
+            Number of fields the recipes matching a table match, by name in cookbook order.
+            previous are the matches of the table in the last run, when its schema did not change since.
+        """
+        if previous is None or self.changed is None:
+            counts = match_counts(self.index, table)
+        else:
+            counts = {name: n for name, n in previous.items() if name not in self.changed}
+            if self._changed_index is not None:
+                counts.update(match_counts(self._changed_index, table))
+        return dict(sorted(counts.items(), key=lambda item: self._order[item[0]]))
+
+    def recipe_hash(self, matches: dict) -> str:
+        """Hash of the recipes matching a table, what its file depends on in the cookbook"""
+        return hash_object([[name, self._hashes[name]] for name in matches])
+
+    def affected_by(self, matches: dict, previous: Optional[dict]) -> Optional[dict]:
+        """
+            The changed recipes matching a table before or after the change, with their field counts then and now.
+            None when the changes cannot be told apart, without a previous run or after a reorder.
+        """
+        if self.changed is None or previous is None:
+            return None
+        return {
+            name: (previous.get(name, 0), matches.get(name, 0))
+            for name in sorted(self.changed)
+            if name in matches or name in previous
+        }
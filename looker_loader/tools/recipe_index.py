@@ -0,0 +1,156 @@
+import re
+from operator import attrgetter
+from typing import Callable, List, Tuple
+from looker_loader.enums import LookerBigQueryDataType
+from looker_loader.models.recipe import CookBook, Recipe, RecipeFilter
+
+# the field attribute every filter reads
+FILTER_FIELD_ATTRIBUTES = {
+    "types": "type",
+    "db_types": "db_type",
+    "regex_include": "name",
+    "regex_exclude": "name",
+    "tags": "tags",
+    "fields_include": "name",
+    "fields_exclude": "name",
+    "field_order": "order",
+    "is_nested": "is_nested",
+    "depth": "depth",
+    "table_regex_include": "table_name",
+    "table_regex_exclude": "table_name",
+    "is_clustered": "is_clustered",
+}
+
+
+def _field_getter(attribute: str) -> Callable:
+    """Reads an attribute of a field, tags are not an attribute of every field"""
+    if attribute == "tags":
+        return lambda field: getattr(field, "tags", None)
+    return attrgetter(attribute)
+
+
+class CompiledFilter:
+    """
+        A RecipeFilter compiled into a list of predicates, as (field attribute, test of its value) pairs.
+        Regexes are compiled once, list lookups become set lookups,
+        and the cheapest predicates run first so a field is rejected as early as possible.
+        The same predicates test a single field, or a column of fields at once, see BatchMatcher.
+    """
+    __slots__ = ("filter", "types", "predicates", "_field_predicates")
+
+    def __init__(self, filter: RecipeFilter):
+        self.filter = filter
+        self.types = frozenset(filter.types) if filter.types else None
+        self.predicates = self._compile(filter)
+        self._field_predicates = [(_field_getter(attribute), test) for attribute, test in self.predicates]
+
+    @staticmethod
+    def _compile(filter: RecipeFilter) -> List[Tuple[str, Callable]]:
+        predicates = []
+
+        if filter.types:
+            types = frozenset(filter.types)
+            predicates.append(("type", lambda value: value in types))
+        if filter.db_types:
+            db_types = frozenset(filter.db_types)
+            predicates.append(("db_type", lambda value: value in db_types))
+        if filter.field_order:
+            field_order = frozenset(filter.field_order)
+            predicates.append(("order", lambda value: value in field_order))
+        if filter.depth:
+            depth = frozenset(filter.depth)
+            predicates.append(("depth", lambda value: value in depth))
+        if filter.is_nested:
+            predicates.append(("is_nested", lambda value: value == True))
+        if filter.is_clustered:
+            predicates.append(("is_clustered", lambda value: bool(value)))
+        if filter.fields_include:
+            fields_include = frozenset(filter.fields_include)
+            predicates.append(("name", lambda value: value in fields_include))
+        if filter.fields_exclude:
+            fields_exclude = frozenset(filter.fields_exclude)
+            predicates.append(("name", lambda value: value not in fields_exclude))
+        if filter.tags:
+            tags = frozenset(filter.tags)
+            predicates.append(("tags", lambda value: any(tag in tags for tag in (value or []))))
+        if filter.regex_include:
+            regex_include = re.compile(filter.regex_include)
+            predicates.append(("name", lambda value: regex_include.search(value) is not None))
+        if filter.regex_exclude:
+            regex_exclude = re.compile(filter.regex_exclude)
+            predicates.append(("name", lambda value: regex_exclude.search(value) is None))
+        if filter.table_regex_include:
+            table_regex_include = re.compile(filter.table_regex_include)
+            predicates.append(
+                ("table_name", lambda value: bool(value) and table_regex_include.search(value) is not None)
+            )
+        if filter.table_regex_exclude:
+            table_regex_exclude = re.compile(filter.table_regex_exclude)
+            predicates.append(
+                ("table_name", lambda value: bool(value) and table_regex_exclude.search(value) is None)
+            )
+
+        return predicates
+
+    def matches(self, field) -> bool:
+        """Check if the field passes every predicate of the filter"""
+        for get, test in self._field_predicates:
+            if not test(get(field)):
+                return False
+        return True
+
+
+class CompiledRecipe:
+    """A recipe with its compiled filter, and its dimension dumped once to be shared by every mixture"""
+    __slots__ = ("recipe", "name", "filter", "dimension")
+
+    def __init__(self, recipe: Recipe):
+        self.recipe = recipe
+        self.name = recipe.name
+        self.filter = CompiledFilter(recipe.filters)
+        self.dimension = recipe.dimension.model_dump() if recipe.dimension is not None else {}
+
+
+class RecipeIndex:
+    """
+        A CookBook compiled once for matching fields against recipes.
+        Recipes are bucketed on the field type they accept, so only candidate recipes
+        are tested for a field. Buckets keep the cookbook order, which decides how recipes are combined.
+    """
+
+    def __init__(self, cookbook: CookBook):
+        self.recipes = [CompiledRecipe(recipe) for recipe in cookbook.recipes]
+        self._filters = {id(r.recipe.filters): r.filter for r in self.recipes}
+        # field attributes read by at least one filter, fields equal on these match the same recipes
+        self.field_attributes = tuple(sorted({
+            attribute
+            for recipe in cookbook.recipes
+            for key, attribute in FILTER_FIELD_ATTRIBUTES.items()
+            if getattr(recipe.filters, key)
+        }))
+        self._by_type = {
+            looker_type: [r for r in self.recipes if r.filter.types is None or looker_type in r.filter.types]
+            for looker_type in set(LookerBigQueryDataType.values())
+        }
+
+    def compiled_filter(self, filter: RecipeFilter) -> CompiledFilter:
+        """The compiled filter of a recipe in the cookbook, a filter from elsewhere is compiled"""
+        compiled = self._filters.get(id(filter))
+        if compiled is None or compiled.filter is not filter:
+            return CompiledFilter(filter)
+        return compiled
+
+    def candidates(self, field) -> List[CompiledRecipe]:
+        """Recipes that can match the type of the field, in cookbook order"""
+        candidates = self._by_type.get(field.type)
+        if candidates is None:
+            return [r for r in self.recipes if r.filter.types is None or field.type in r.filter.types]
+        return candidates
+
+    def match_compiled(self, field) -> List[CompiledRecipe]:
+        """Compiled recipes whose filters match the field, in cookbook order"""
+        return [r for r in self.candidates(field) if r.filter.matches(field)]
+
+    def match(self, field) -> List[Recipe]:
+        """Recipes whose filters match the field, in cookbook order"""
+        return [r.recipe for r in self.match_compiled(field)]
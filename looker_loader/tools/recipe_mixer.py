@@ -1,80 +1,135 @@
 from looker_loader.models.database import DatabaseField, DatabaseTable
-from looker_loader.models.recipe import LookerMixture, Recipe, CookBook, RecipeFilter, LookerMixtureDimension
+from looker_loader.models.recipe import Recipe, CookBook, RecipeFilter
+from looker_loader.models.mixture import Mixture, MixtureField
 from looker_loader.models.config import DatasetConfig
+from looker_loader.tools.recipe_index import RecipeIndex
+from looker_loader.tools.batch_matcher import BatchMatcher
+from looker_loader.tools.mixture_cache import MISSING, MixtureCache, copy_recipe
+from looker_loader.profiling import profiler, timed
 from typing import List, Optional, Union
 import re
 import logging
 
-def extend_unique_dicts_tuple(existing_list, new_items):
-    """Extends a list with only unique dictionaries (represented as tuples of sorted items)."""
-    existing_set = {tuple(sorted(d.items())) for d in existing_list}  # Convert existing dicts to tuples
-    for item in new_items:
-        tuple_item = tuple(sorted(item.items()))
-        if tuple_item not in existing_set:
-            existing_list.append(item)
-            existing_set.add(tuple_item)
-
-
-def remove_nones(data):
-    """Recursively removes None values from dictionaries and lists."""
-    if isinstance(data, dict):
-        return {k: remove_nones(v) for k, v in data.items() if v is not None}
-    elif isinstance(data, list):
-        return [remove_nones(item) for item in data if item is not None]
-    else:
-        return data  # Return non-None values as is
+def member_identity(value):
+    """
+    Hashable identity of a list member, equal for equal members.
+    Dicts and lists are frozen recursively, so members holding lists can be compared too.
+    """
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((k, member_identity(v)) for k, v in value.items())))
+    if isinstance(value, list):
+        return (list, tuple(member_identity(v) for v in value))
+    return value
+
 
 class RecipeMixer:
-    def __init__(self, cookbook: CookBook, lexicanum = None):
+    def __init__(
+        self, cookbook: CookBook, lexicanum = None, cache_size: int = 4096, batch_min_fields: Optional[int] = None
+    ):
         self.cookbook = cookbook
         self.lexicanum = lexicanum
+        self.index = RecipeIndex(cookbook)
+        self.cache = MixtureCache(cache_size)
+        # tables with at least this many fields, nested included, are matched in one batch, None never batches
+        self.batch_min_fields = batch_min_fields
+        # recipes matched per field id by the batch of the table being mixed
+        self._batch_matches = None
+        # recipes matched per cache key, only kept while profiling, evicted along with the cached mixtures
+        self._recipe_counts = MixtureCache(cache_size)
 
     def is_filter_relevant(
         self, filter: RecipeFilter, field: DatabaseField
     ) -> bool:
         """
         Check if a filter is relevant for the given field_name, type, and tags.
+        The filters of the cookbook are compiled once, in self.index.
         """
-        return all([
-            not filter.types or field.type in filter.types,
-            not filter.db_types or field.db_type in filter.db_types,
-            not filter.regex_include or re.search(filter.regex_include, field.name),
-            not filter.regex_exclude or not re.search(filter.regex_exclude, field.name),
-            not filter.tags or any(tag in filter.tags for tag in field.tags),
-            not filter.fields_include or field.name in filter.fields_include,
-            not filter.fields_exclude or field.name not in filter.fields_exclude,
-            not filter.field_order or field.order in filter.field_order,
-            not filter.is_nested or field.is_nested == filter.is_nested,
-            not filter.depth or field.depth in filter.depth,
-            not filter.table_regex_include or (field.table_name and re.search(filter.table_regex_include, field.table_name)),
-            not filter.table_regex_exclude or (field.table_name and not re.search(filter.table_regex_exclude, field.table_name)),
-            not filter.is_clustered or (field.is_clustered and filter.is_clustered) 
-        ])
+        return self.index.compiled_filter(filter).matches(field)
+
+    def _cache_key(self, field: DatabaseField, config: DatasetConfig) -> tuple:
+        """
+        Key of the mixture of a field. The mixture only depends on the attributes
+        the filters read, the lexicanum entry of the field and the recipes the config allows.
+        """
+        attributes = []
+        for attribute in self.index.field_attributes:
+            value = getattr(field, attribute, None)
+            attributes.append(tuple(value) if isinstance(value, list) else value)
+        return (
+            tuple(attributes),
+            field.name if self.lexicanum else None,
+            tuple(config.apply_recipe or ()),
+            tuple(config.exclude_recipe or ()),
+        )
 
     def create_mixture(
         self, field: DatabaseField, config: DatasetConfig
     ) -> Optional[Recipe]:
         """
         Combine relevant recipes from cookbook based on field_name, type, and tags.
+        Returns a copy of the cached mixture, free to mutate.
+        """
+        mixture = self._mixture(field, config)
+        if mixture is None:
+            return None
+        return copy_recipe(mixture)
+
+    def _mixture(
+        self, field: DatabaseField, config: DatasetConfig
+    ) -> Optional[dict]:
+        """
+        The mixture of a field, cached: fields with the same key share the result,
+        which shares its members with the recipes, so it must not be mutated.
         """
         if not self.cookbook.recipes:
             raise Exception("No recipes found in cookbook")
         if not config:
             raise Exception("No config found")
 
+        key = self._cache_key(field, config)
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            if profiler.enabled:
+                profiler.count("mixture_cache.hits")
+                count = self._recipe_counts.get(key)
+                profiler.observe("recipes_per_field", 0 if count is MISSING else count)
+            return cached
+
+        relevant_recipes = self._relevant_recipes(field, config)
+        output = self._create_mixture(field, config, relevant_recipes)
+        self.cache.put(key, output)
+        if profiler.enabled:
+            profiler.count("mixture_cache.misses")
+            profiler.observe("recipes_per_field", len(relevant_recipes))
+            self._recipe_counts.put(key, len(relevant_recipes))
+        return output
+
+    def _relevant_recipes(self, field: DatabaseField, config: DatasetConfig) -> list[dict]:
+        """The recipe dimensions, and lexicanum entry, that apply to a field, in order"""
+        matched = self._batch_matches.get(id(field)) if self._batch_matches else None
+        if matched is None:
+            matched = self.index.match_compiled(field)
         relevant_recipes = [
-            recipe.dimension.model_dump()
-            for recipe in self.cookbook.recipes
-            if self.is_filter_relevant(recipe.filters, field)
-            and (not config.apply_recipe or recipe.name in config.apply_recipe)
+            recipe.dimension
+            for recipe in matched
+            if (not config.apply_recipe or recipe.name in config.apply_recipe)
             and (not config.exclude_recipe or recipe.name not in config.exclude_recipe)
         ]
 
         if self.lexicanum and not config.apply_recipe:
-            if field.name in self.lexicanum.root:
-                relevant_lexical_entry = self.lexicanum.root[field.name].model_dump()
+            lexical_entry = self.lexicanum.get(field.name)
+            if lexical_entry is not None:
+                relevant_lexical_entry = lexical_entry.model_dump()
                 if relevant_lexical_entry:
                     relevant_recipes.append(relevant_lexical_entry)
+        return relevant_recipes
+
+    def _create_mixture(
+        self, field: DatabaseField, config: DatasetConfig, relevant_recipes: Optional[list[dict]] = None
+    ) -> Optional[Recipe]:
+        """Match and combine the recipes for a field, without caching"""
+        if relevant_recipes is None:
+            relevant_recipes = self._relevant_recipes(field, config)
 
         if not relevant_recipes:
             return None
@@ -119,41 +174,42 @@ class RecipeMixer:
             return {}  # Handles the case where an empty list was passed in.
 
         if len(predicts) == 1:
-            logging.debug("Only one dictionary provided, returning it as is.")
-            # If only one dictionary is provided, return it as is, but not as a tuple.
-            return predicts[0]
+            logging.debug("Only one dictionary provided, returning a copy of it.")
+            # If only one dictionary is provided, return it as a new dict, but not as a tuple.
+            return dict(predicts[0])
 
-        combined = predicts[0]  # Start with the first dictionary
-        dicts = predicts[1:]  # Remaining dictionaries to process
+        # the inputs are never mutated: the combined dict is new, and a list value
+        # is copied the first time it is extended, the members themselves are shared
+        combined = dict(predicts[0])
+        # identities of the members of every list extended during this merge, built once per key
+        seen = {}
 
-        for current_dict in dicts:
+        for current_dict in predicts[1:]:
             for key, value in current_dict.items():
-                if key in combined:
-                    if current_dict[key] is None:
-                        pass
-                    elif isinstance(combined[key], list):
-                        if isinstance(value, list):
-                            if len(value) > 0:
-                                extend_unique_dicts_tuple(combined[key], value)
-                        elif isinstance(value, dict):
-                            tuple_value = tuple(sorted(value.items()))
-                            existing_set = {tuple(sorted(d.items())) for d in combined[key]}
-                            if tuple_value not in existing_set:
-                                combined[key].append(value)
-                        else:
-                            if value not in combined[key] and value is not None:
-                                combined[key].append(value)
-                    else:
-                        if conflict_resolution == "first":
-                            pass  # Keep the first value (already in `combined`)
-                        elif conflict_resolution == "last":
-                            combined[key] = value  # Override with the last value
-                else:
+                if key not in combined:
                     combined[key] = value  # Key not in combined, add it
+                elif value is None:
+                    pass
+                elif isinstance(combined[key], list):
+                    new_items = value if isinstance(value, list) else (value,)
+                    if not new_items:
+                        continue
+                    if key not in seen:
+                        combined[key] = list(combined[key])
+                        seen[key] = {member_identity(item) for item in combined[key]}
+                    members = seen[key]
+                    for item in new_items:
+                        identity = member_identity(item)
+                        if identity not in members:
+                            combined[key].append(item)
+                            members.add(identity)
+                elif conflict_resolution == "last":
+                    combined[key] = value  # Override with the last value
+                # "first": keep the value already in combined
 
         return combined
 
-    def _flatten_mixture(self, mixture: LookerMixtureDimension) -> list[LookerMixtureDimension]:
+    def _flatten_mixture(self, mixture: MixtureField) -> list[MixtureField]:
         """
         Flatten the mixture into dimensions and measures.
         """
@@ -174,20 +230,31 @@ class RecipeMixer:
 
         return mixture
 
-    def apply_mixture(self, column: DatabaseField, config: DatasetConfig) -> tuple[LookerMixtureDimension, Optional[List[LookerMixtureDimension]]]:
+    @staticmethod
+    def _field_values(column: DatabaseField) -> dict:
+        """
+        The values of a column to mix recipes into, a shallow copy instead of a model_dump.
+        Nested fields are left out, they are mixed on their own.
+        """
+        values = dict(column.__dict__)
+        if column.fields:
+            values["fields"] = None
+        return values
+
+    def apply_mixture(self, column: DatabaseField, config: DatasetConfig) -> tuple[MixtureField, Optional[List[MixtureField]]]:
         """Create and apply a mixture to a column, returning the applied mixture and its variants."""
         
         if not config.unstyled:
-            mixture = self.create_mixture(column, config)
+            mixture = self._mixture(column, config)
         else:
             mixture = None
 
         if not mixture:
-            applied_mixture = LookerMixtureDimension(**column.model_dump())
+            applied_mixture = MixtureField.build(self._field_values(column))
             return applied_mixture, None
 
-        applied_mixture = LookerMixtureDimension(**
-            self._combine_dicts(column.model_dump(), mixture, conflict_resolution="first")
+        applied_mixture = MixtureField.build(
+            self._combine_dicts(self._field_values(column), mixture, conflict_resolution="first")
         )
 
         variants = self._flatten_mixture(applied_mixture)
@@ -196,7 +263,7 @@ class RecipeMixer:
 
     def _recursively_apply_mixture(
         self, field: DatabaseField, config: DatasetConfig
-    ) -> list[LookerMixtureDimension]:
+    ) -> list[MixtureField]:
         """
         Recursively apply the mixture to the column and its subfields.
         """
@@ -211,29 +278,49 @@ class RecipeMixer:
         result = [d]
         if isinstance(v, list):
             result.extend(v)
-        elif isinstance(v, LookerMixtureDimension):
+        elif isinstance(v, MixtureField):
             result.append(v)
         return result
 
-    def mixturize(self, table: DatabaseTable, config: DatasetConfig) -> LookerMixture:
+    def _batch_match(self, table: DatabaseTable) -> Optional[dict]:
+        """Recipes matched per field id for every field of a wide table at once, None for narrower tables"""
+        if self.batch_min_fields is None:
+            return None
+
+        fields = []
+
+        def recurse_fields(table_fields):
+            for field in table_fields or []:
+                fields.append(field)
+                recurse_fields(field.fields)
+
+        recurse_fields(table.fields)
+        if len(fields) < self.batch_min_fields:
+            return None
+        with profiler.stage("batch_match"):
+            matrix = BatchMatcher(self.index).match(fields)
+        return {id(field): matched for field, matched in zip(fields, matrix)}
+
+    @timed("mixturize")
+    def mixturize(self, table: DatabaseTable, config: DatasetConfig) -> Mixture:
         """
         Search for and apply recipes to the table.
+        Wide tables are matched against the recipes in one batch first, see batch_min_fields.
         """
         if not table.fields:
             raise Exception("No fields found in table")
 
-        fields = []
-        for field in table.fields:
-            applied = self._recursively_apply_mixture(field, config)
-            if isinstance(applied, list):
-                fields.extend(applied)
-            else:
-                fields.append(applied)
-
-        model = LookerMixture(**{
-            "name": table.name,
-            "sql_table_name": table.sql_table_name,
-            "fields": fields,
-        })
-
-        return model
\ No newline at end of file
+        if not config.unstyled:
+            self._batch_matches = self._batch_match(table)
+        try:
+            fields = []
+            for field in table.fields:
+                applied = self._recursively_apply_mixture(field, config)
+                if isinstance(applied, list):
+                    fields.extend(applied)
+                else:
+                    fields.append(applied)
+        finally:
+            self._batch_matches = None
+
+        return Mixture(name=table.name, sql_table_name=table.sql_table_name, fields=fields)
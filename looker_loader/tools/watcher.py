@@ -0,0 +1,35 @@
+import os
+from typing import Iterable, List, Optional
+
+
+class FileWatcher:
+    """
+        Polls files for changes, on their modification time and size.
+        Polling needs no extra dependency and a handful of stat calls per interval costs nothing.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.paths = list(paths)
+        self._stats = {path: self._stat(path) for path in self.paths}
+
+    @staticmethod
+    def _stat(path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def changed(self) -> List[str]:
+        """The files created, modified or removed since the last call"""
+        changed = []
+        for path in self.paths:
+            stat = self._stat(path)
+            if stat != self._stats[path]:
+                self._stats[path] = stat
+                changed.append(path)
+        return changed
+
+    def refresh(self, path: str):
+        """Take the current state of a file as seen, after writing it ourselves"""
+        self._stats[path] = self._stat(path)
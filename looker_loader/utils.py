@@ -1,8 +1,16 @@
 import logging
+import os
+import shutil
+import threading
 from looker_loader.exceptions import CliError
+from looker_loader.profiling import profiler, timed
 import json
 import yaml
 
+# the libyaml C loader and dumper, many times faster than the pure python ones, when pyyaml is built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 class FileHandler:
     def read(self, file_path: str, file_type="json") -> dict:
         """Load file from disk. Default is to load as a JSON file
@@ -18,7 +26,7 @@ class FileHandler:
                 if file_type == "json":
                     raw_file = json.load(f)
                 elif file_type == "yaml":
-                    raw_file = yaml.safe_load(f)
+                    raw_file = yaml.load(f, Loader=YAML_LOADER)
                 else:
                     raw_file = f.read()
         except FileNotFoundError as e:
@@ -30,19 +38,77 @@ class FileHandler:
         return raw_file
 
     def write(self, file_path: str, contents: str):
-        """Write contents to a file
+        """Write contents to a file atomically, through a temporary file renamed over it.
+        Readers never see a partially written file.
 
         Args:
-            file_path (str): _description_
-            contents (str): _description_
+            file_path (str): Path to the file
+            contents (str): Contents of the file
 
         Raises:
-            CLIError: _description_
+            CLIError: If the file could not be written
         """
+        # unique per process and thread, so concurrent writers never share a temporary file
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            with open(file_path, "w") as f:
-                f.truncate()  # Clear file to allow overwriting
+            # utf-8 whatever the locale, like the bytes is_unchanged compares
+            with open(tmp_path, "w", encoding="utf-8") as f:
                 f.write(contents)
+            # the replaced file keeps its permissions, instead of taking the default ones of a new file
+            if os.path.exists(file_path):
+                shutil.copymode(file_path, tmp_path)
+            os.replace(tmp_path, file_path)
         except Exception as e:
             logging.error(f"Could not write file at {file_path}.")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
             raise CliError("Could not write file") from e
+
+    def is_unchanged(self, file_path: str, contents: str) -> bool:
+        """Check if a file on disk already holds exactly these contents"""
+        data = contents.encode("utf-8")
+        try:
+            if os.path.getsize(file_path) != len(data):
+                return False
+            with open(file_path, "rb") as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+
+def lookml_file_path(output_dir: str, file_path: str) -> str:
+    """Path a LookML file will be written to"""
+    file_name = os.path.basename(file_path)
+    file_path = os.path.join(output_dir, file_path.split(file_name)[0])
+    return f"{file_path}/{file_name}"
+
+
+@timed("write")
+def write_file_if_changed(file_path: str, contents: str) -> bool:
+    """
+        Write contents to a file, unless it already holds exactly these contents.
+        Identical files are left alone, keeping their mtime, so they do not show up as changed downstream.
+        Returns whether the file was written.
+    """
+    handler = FileHandler()
+    if handler.is_unchanged(file_path, contents):
+        logging.debug(f"LookML file {file_path} is unchanged, not writing")
+        profiler.count("files_unchanged")
+        return False
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    handler.write(file_path, contents)
+    if profiler.enabled:
+        profiler.count("files_written")
+        profiler.count("bytes_written", len(contents.encode("utf-8")))
+    return True
+
+
+def write_lookml_file(output_dir: str, file_path: str, contents: str) -> str:
+    """Write LookML content to a file if it changed, creating the directory if needed."""
+    logging.debug(f"Writing LookML file to {file_path}")
+    file_path = lookml_file_path(output_dir, file_path)
+    write_file_if_changed(file_path, contents)
+    return file_path
@@ -0,0 +1,23 @@
+from benchmarks.run import compare, load_baseline, run_scenario
+from benchmarks.warehouse import SCENARIOS, generate_cookbook, generate_warehouse
+
+
+def test_warehouse_is_deterministic():
+    scenario = SCENARIOS["nested"]
+    assert generate_warehouse(scenario) == generate_warehouse(scenario)
+    assert generate_cookbook(scenario) == generate_cookbook(scenario)
+
+
+def test_small_scenario_matches_its_baseline_output():
+    result = run_scenario(SCENARIOS["small"], repeat=1)
+
+    assert set(result["stages"]) == {"parse", "mixturize", "generate", "convert", "write"}
+    assert result["counts"] == load_baseline("small")["counts"]
+
+
+def test_compare_reports_regressions_beyond_the_tolerance():
+    baseline = {"counts": {"fields": 1}, "stages": {"parse": {"seconds": 1.0, "peak_mb": 10.0}}}
+    result = {"counts": {"fields": 1}, "stages": {stage: {"seconds": 1.2, "peak_mb": 20.0} for stage in
+                                                    ("parse", "mixturize", "generate", "convert", "write")}}
+
+    assert compare(result, baseline, tolerance=0.5) == ["parse peak_mb: 10.0 -> 20.0 (+100%)"]
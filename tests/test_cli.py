@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+import sys
+import pytest
+from looker_loader.cli import Cli
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.generator.lookml import LookmlGenerator
+from looker_loader.generator.renderer import TableRenderer
+from looker_loader.models.config import Config
+from looker_loader.tools.file_writer import FileWriter
+from looker_loader.tools.manifest import Manifest
+from tests.fixtures.bigquery import fixture_2
+
+
+class SlowDatabase(BigQueryDatabase):
+    """Serves fixture_2 for every table, tracking how many fetches are pending at once"""
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.peak = 0
+
+    async def _async_fetch_table_schema(self, project_id, dataset_id, table_id, config=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.001 * (int(table_id.rsplit("_", 1)[-1]) % 3))
+        self.in_flight -= 1
+        table_json = json.loads(fixture_2)
+        table_json["tableReference"] = {"projectId": project_id, "datasetId": dataset_id, "tableId": table_id}
+        return table_json, config
+
+
+@pytest.fixture
+def cli(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["looker_loader"])
+    cli = Cli()
+    cli.config = Config(**{
+        "bigquery": [{"project_id": "p", "dataset_id": "d", "tables": [f"table_{i}" for i in range(20)]}],
+        "loader": {"max_in_flight": 4},
+    })
+    cli.database = SlowDatabase()
+    return cli
+
+
+def test_stream_schemas_bounds_tables_in_flight(cli):
+    """Every table is parsed and yielded, with at most max_in_flight fetches pending"""
+
+    async def collect():
+        return [schema async for schema in cli.stream_schemas()]
+
+    schemas = asyncio.run(collect())
+
+    assert sorted(s["schema"].name for s in schemas) == sorted(f"table_{i}" for i in range(20))
+    assert cli.database.peak <= 4
+
+
+class ListingDatabase(SlowDatabase):
+    """Lists two pages per dataset, the second page only after a table of the first one was fetched"""
+
+    def __init__(self):
+        super().__init__()
+        self.fetched = asyncio.Event()
+
+    async def stream_tables_in_dataset(self, project_id, dataset_id):
+        yield [f"{dataset_id}_table_{i}" for i in range(3)]
+        await asyncio.wait_for(self.fetched.wait(), timeout=5)
+        yield [f"{dataset_id}_table_{i}" for i in range(3, 6)] + [f"{dataset_id}_skip_0"]
+
+    async def _async_fetch_table_schema(self, project_id, dataset_id, table_id, config=None):
+        self.fetched.set()
+        return await super()._async_fetch_table_schema(project_id, dataset_id, table_id, config)
+
+
+def test_tables_are_fetched_while_datasets_are_listed(monkeypatch):
+    """Listed datasets stream into the fetches, filtered by their precompiled regexes"""
+    monkeypatch.setattr(sys, "argv", ["looker_loader"])
+    cli = Cli()
+    cli.config = Config(**{
+        "bigquery": [
+            {"project_id": "p", "dataset_id": "a", "config": {"regex_exclude": "skip"}},
+            {"project_id": "p", "dataset_id": "b", "config": {"regex_include": "table_[0-4]$"}},
+            {"project_id": "p", "dataset_id": "c", "tables": ["c_table_0", "c_skip_0"],
+             "config": {"regex_exclude": "skip"}},
+        ],
+        "loader": {"max_in_flight": 2},
+    })
+    cli.database = ListingDatabase()
+
+    async def collect():
+        return [schema async for schema in cli.stream_schemas()]
+
+    schemas = asyncio.run(collect())
+
+    names = sorted(s["schema"].name for s in schemas)
+    assert names == sorted(
+        [f"a_table_{i}" for i in range(6)] + [f"b_table_{i}" for i in range(5)] + ["c_table_0"]
+    )
+    assert sorted(cli._table_key(t) for t in cli.tables) == sorted(f"p.{n[0]}.{n}" for n in names)
+    assert cli.database.peak <= 2
+
+
+class FailingListingDatabase(SlowDatabase):
+    """Lists a first page of every dataset, the second page of dataset d fails like a 403"""
+
+    def __init__(self):
+        super().__init__()
+        self.credentials = object()
+
+    def _list_table_pages(self, project_id, dataset_id):
+        yield ["t1", "t2"]
+        if dataset_id == "d":
+            raise RuntimeError("403 Forbidden")
+
+
+def test_dataset_whose_listing_failed_is_not_pruned(monkeypatch, tmp_path):
+    """The tables of the pages listed before a failure are processed, the other tables of the dataset are kept"""
+    monkeypatch.setattr(sys, "argv", ["looker_loader"])
+    cli = Cli()
+    cli.config = Config(**{"bigquery": [{"project_id": "p", "dataset_id": "d"}, {"project_id": "p", "dataset_id": "e"}]})
+    cli.database = FailingListingDatabase()
+    cli.manifest = Manifest(str(tmp_path / "manifest.json"))
+    for key in ("p.d.t1", "p.d.t3", "p.e.t1", "p.e.t3"):
+        cli.manifest.update(key, {"etag": "e"}, "fingerprint", str(tmp_path / f"{key}.view.lkml"))
+
+    async def collect():
+        return [table async for table in cli._stream_tables()]
+
+    cli.tables = asyncio.run(collect())
+    cli.writer = FileWriter(max_workers=1)
+    cli._prune_dropped_tables()
+    cli.writer.close()
+
+    assert sorted(cli._table_key(t) for t in cli.tables) == ["p.d.t1", "p.d.t2", "p.e.t1", "p.e.t2"]
+    assert cli.incompletely_listed == {"p.d"}
+    assert sorted(cli.manifest.tables) == ["p.d.t1", "p.d.t3", "p.e.t1"]
+
+
+class WarehouseDatabase(BigQueryDatabase):
+    """Serves the given table json by table id, counting the fetches"""
+
+    def __init__(self, tables: dict):
+        super().__init__()
+        self.tables = tables
+        self.fetches = 0
+
+    async def _async_fetch_table_schema(self, project_id, dataset_id, table_id, config=None):
+        self.fetches += 1
+        return {
+            "tableReference": {"projectId": project_id, "datasetId": dataset_id, "tableId": table_id},
+            "etag": f"etag-{table_id}",
+            "lastModifiedTime": "1",
+            "schema": {"fields": self.tables[table_id]},
+        }, config
+
+
+RECIPE = """
+recipes:
+  - name: numbers
+    filters:
+      types: [number]
+    dimension:
+      value_format_name: decimal_1
+  - name: strings
+    filters:
+      types: [string]
+    dimension:
+      group_label: Text
+"""
+
+
+def _warehouse_cli(monkeypatch, tmp_path, *args, recipe=RECIPE):
+    (tmp_path / "loader_config.yml").write_text(f"""
+config:
+  loader:
+    output_path: {tmp_path / "views"}
+    cache_path: {tmp_path / "cache"}
+  bigquery:
+    - project_id: p
+      dataset_id: d
+      tables: [orders, customers]
+""")
+    (tmp_path / "loader_recipe.yml").write_text(recipe)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["looker_loader", "--config", str(tmp_path), *args])
+    cli = Cli()
+    cli._load_config()
+    cli.database = WarehouseDatabase({
+        "orders": [{"name": "order_id", "type": "STRING"}, {"name": "amount", "type": "FLOAT"}],
+        "customers": [{"name": "name", "type": "STRING"}],
+    })
+    cli.lookml = LookmlGenerator(cli_args=cli.args)
+    cli._load_recipe()
+    cli._initialize_mixer()
+    cli._load_manifest()
+    cli.schema_cache = {}
+    return cli
+
+
+def test_recipe_edit_in_watch_mode_rerenders_only_the_matched_tables(monkeypatch, tmp_path):
+    """Editing a recipe while watching regenerates the cached tables it matches, without fetching them again"""
+    cli = _warehouse_cli(monkeypatch, tmp_path, "--watch", "--watch-interval", "0.01")
+    rendered = []
+    convert = TableRenderer.convert
+
+    def recording_convert(renderer, job):
+        rendered.append(job["schema"].name)
+        return convert(renderer, job)
+
+    monkeypatch.setattr(TableRenderer, "convert", recording_convert)
+    runs = asyncio.Queue()
+    generate_and_save = cli._generate_and_save
+
+    async def recording_generate_and_save(schemas=None):
+        await generate_and_save(schemas)
+        runs.put_nowait(sorted(rendered))
+        rendered.clear()
+
+    cli._generate_and_save = recording_generate_and_save
+
+    async def session():
+        try:
+            await cli._generate_and_save()
+            first = await runs.get()
+            watching = asyncio.create_task(cli.watch())
+            await asyncio.sleep(0.05)
+            (tmp_path / "loader_recipe.yml").write_text(RECIPE.replace("decimal_1", "decimal_2"))
+            try:
+                second = await asyncio.wait_for(runs.get(), timeout=5)
+            finally:
+                watching.cancel()
+            return first, second
+        finally:
+            cli.render_pool.shutdown()
+
+    first, second = asyncio.run(session())
+
+    assert first == ["customers", "orders"]
+    assert second == ["orders"]
+    assert cli.database.fetches == 2
+    assert "decimal_2" in (tmp_path / "views" / "d" / "orders.view.lkml").read_text()
+
+
+def test_dry_run_reports_the_recipe_changes_without_writing(monkeypatch, tmp_path, caplog):
+    """A dry run after a recipe edit lists the tables it matches, with the fields per changed recipe, and writes nothing"""
+    asyncio.run(_warehouse_cli(monkeypatch, tmp_path)._run())
+    edited = RECIPE.replace("decimal_1", "decimal_2")
+    cli = _warehouse_cli(monkeypatch, tmp_path, "--dry-run", recipe=edited)
+    files = {path: path.read_text() for path in tmp_path.rglob("*") if path.is_file()}
+    monkeypatch.setattr(FileWriter, "write", lambda *args, **kwargs: pytest.fail("a dry run wrote a file"))
+    monkeypatch.setattr(Manifest, "save", lambda *args, **kwargs: pytest.fail("a dry run saved the manifest"))
+    with caplog.at_level(logging.INFO):
+        asyncio.run(cli._run())
+
+    assert cli.render_pool is None
+    assert {path: path.read_text() for path in tmp_path.rglob("*") if path.is_file()} == files
+    messages = [record.getMessage() for record in caplog.records]
+    assert "Recipes changed since the last run: numbers" in messages
+    assert any(message.endswith("orders: recipes numbers (1 fields)") for message in messages)
+    assert not any("customers:" in message for message in messages)
+    assert "Dry run, 1 tables would be regenerated, 1 are unchanged" in messages
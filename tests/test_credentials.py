@@ -0,0 +1,83 @@
+import asyncio
+import datetime
+import time
+import httpx
+from looker_loader.databases.bigquery.credentials import TokenProvider
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+
+NOW = datetime.datetime(2024, 1, 1, 12, 0, 0)
+
+
+class FakeCredentials:
+    """Credentials issuing token-1, token-2, ... valid for an hour, with a slow refresh"""
+
+    def __init__(self, expiry=None):
+        self.token = "token-0"
+        self.expiry = expiry or NOW + datetime.timedelta(hours=1)
+        self.refreshed = 0
+
+    def refresh(self, request):
+        time.sleep(0.05)
+        self.refreshed += 1
+        self.token = f"token-{self.refreshed}"
+        self.expiry = NOW + datetime.timedelta(hours=1)
+
+
+def test_token_is_refreshed_ahead_of_expiry_once_for_concurrent_requests():
+    """A token close to expiry is refreshed once, on a thread, and every waiting request gets the new one"""
+    credentials = FakeCredentials(expiry=NOW + datetime.timedelta(minutes=4))
+    tokens = TokenProvider(credentials, refresh_margin=300, clock=lambda: NOW)
+
+    async def run():
+        return await asyncio.gather(*[tokens.atoken() for _ in range(20)])
+
+    assert asyncio.run(run()) == ["token-1"] * 20
+    assert credentials.refreshed == 1
+
+    # far from expiry, the token is reused
+    assert tokens.token() == "token-1"
+    assert credentials.refreshed == 1
+
+
+def test_rejected_token_is_refreshed_once_and_the_request_retried():
+    """Requests rejected with 401 share one refresh and are retried with the new token"""
+    credentials = FakeCredentials()
+
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        if request.headers["Authorization"] == "Bearer token-0":
+            return httpx.Response(401, json={"error": "expired"})
+        table_id = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={
+            "tableReference": {"projectId": "p", "datasetId": "d", "tableId": table_id},
+            "schema": {"fields": [{"name": "pk_obt", "type": "STRING"}]},
+        })
+
+    db = BigQueryDatabase(max_connections=4, max_concurrency=4)
+    db.credentials = credentials
+    db.tokens = TokenProvider(credentials, clock=lambda: NOW)
+    db._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        try:
+            return await asyncio.gather(*[db._async_fetch_table_schema("p", "d", f"t{i}") for i in range(10)])
+        finally:
+            await db.aclose()
+
+    results = asyncio.run(run())
+
+    assert [table_json["tableReference"]["tableId"] for table_json, _ in results] == [f"t{i}" for i in range(10)]
+    assert credentials.refreshed == 1
+
+
+def test_client_credentials_take_the_provider_token():
+    """The bigquery clients apply the token of the provider, refreshed by it"""
+    credentials = FakeCredentials(expiry=NOW)
+    tokens = TokenProvider(credentials, clock=lambda: NOW)
+    client_credentials = tokens.client_credentials()
+
+    headers = {}
+    client_credentials.before_request(None, "GET", "https://bigquery.googleapis.com", headers)
+
+    assert headers["authorization"] == "Bearer token-1"
+    assert credentials.refreshed == 1
@@ -0,0 +1,124 @@
+import asyncio
+import copy
+import httpx
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.databases.bigquery.scheduler import RequestScheduler
+from looker_loader.databases.bigquery.normalizer import normalize_table
+
+
+def _table_response(request):
+    table_id = request.url.path.rsplit("/", 1)[-1]
+    return {
+        "tableReference": {"projectId": "p", "datasetId": "d", "tableId": table_id},
+        "schema": {"fields": [{"name": "pk_obt", "type": "STRING"}]},
+    }
+
+
+def test_fetch_uses_shared_client_with_bounded_concurrency():
+    """All fetches go through one client and never exceed max_concurrency"""
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json=_table_response(request))
+
+    db = BigQueryDatabase(max_connections=4, max_concurrency=3)
+    db.headers = {}
+    db._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        tasks = [db._async_fetch_table_schema("p", "d", f"t{i}") for i in range(20)]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            await db.aclose()
+
+    results = asyncio.run(run())
+
+    assert [r[0]["tableReference"]["tableId"] for r in results] == [f"t{i}" for i in range(20)]
+    assert peak <= 3
+    assert db._client is None
+
+
+def test_fetch_retries_rate_limits_and_honours_retry_after():
+    """A 429 is retried after the Retry-After delay instead of dropping the table"""
+    calls = 0
+    sleeps = []
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        if calls < 3:
+            return httpx.Response(429, headers={"Retry-After": "2"})
+        return httpx.Response(200, json=_table_response(request))
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    db = BigQueryDatabase(scheduler=RequestScheduler(sleep=fake_sleep))
+    db.headers = {}
+    db._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    schema, _ = asyncio.run(db._async_fetch_table_schema("p", "d", "t1"))
+
+    assert schema["tableReference"]["tableId"] == "t1"
+    assert calls == 3
+    assert sleeps == [2.0, 2.0]
+
+
+def test_retry_budget_is_shared_across_the_run():
+    """Once the run-level budget is spent, failing requests are not retried"""
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(503)
+
+    async def fake_sleep(seconds):
+        pass
+
+    db = BigQueryDatabase(scheduler=RequestScheduler(max_retries=5, retry_budget=2, sleep=fake_sleep))
+    db.headers = {}
+    db._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        first = await db._async_fetch_table_schema("p", "d", "t1")
+        second = await db._async_fetch_table_schema("p", "d", "t2")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first[0] == {} and second[0] == {}
+    assert calls == 4
+
+
+def test_normalizer_builds_the_same_table_as_validation():
+    """The single pass normalizer gives the same models as full pydantic validation"""
+    table_json = {
+        "tableReference": {"projectId": "p", "datasetId": "d", "tableId": "orders"},
+        "clustering": {"fields": ["customer_id"]},
+        "schema": {"fields": [
+            {"name": "customer_id", "type": "INTEGER", "mode": "REQUIRED"},
+            {"name": "tags", "type": "STRING", "mode": "REPEATED", "description": "tags"},
+            {"name": "address", "type": "RECORD", "fields": [
+                {"name": "city", "type": "STRING"},
+                {"name": "geo", "type": "RECORD", "fields": [{"name": "lat", "type": "FLOAT"}]},
+            ]},
+            {"name": "items", "type": "RECORD", "mode": "REPEATED", "fields": [{"name": "sku", "type": "STRING"}]},
+        ]},
+    }
+
+    fast = normalize_table(copy.deepcopy(table_json))
+    strict = normalize_table(copy.deepcopy(table_json), strict=True)
+
+    assert fast.model_dump() == strict.model_dump()
+    assert [f.name for f in fast.fields] == ["customer_id", "tags", "address.city", "address.geo.lat", "items"]
+    assert fast.fields[0].is_clustered
+    assert fast.fields[1].fields[0].sql == "${TABLE}"
+    assert fast.fields[1].fields[0].sub_table_name == "orders__tags"
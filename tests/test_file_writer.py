@@ -0,0 +1,40 @@
+import asyncio
+import os
+from looker_loader.tools.file_writer import FileWriter
+
+
+def test_identical_files_are_not_rewritten(tmp_path):
+    writer = FileWriter(max_workers=2)
+
+    async def write(contents):
+        return await writer.write(str(tmp_path), "view.view.lkml", contents)
+
+    path = asyncio.run(write("view: a {}"))
+    os.utime(path, ns=(0, 0))
+    asyncio.run(write("view: a {}"))
+    assert os.stat(path).st_mtime_ns == 0
+
+    asyncio.run(write("view: b {}"))
+    writer.remove([path, str(tmp_path / "missing.view.lkml")])
+    writer.close()
+
+    assert (writer.written, writer.unchanged, writer.removed) == (2, 1, 1)
+    assert os.listdir(tmp_path) == []
+
+
+def test_rewritten_files_keep_their_permissions(tmp_path):
+    writer = FileWriter(max_workers=1)
+
+    async def write(contents):
+        return await writer.write(str(tmp_path), "view.view.lkml", contents)
+
+    path = asyncio.run(write("view: a { description: \"Kundenummer å\" }"))
+    os.chmod(path, 0o640)
+    asyncio.run(write("view: a { description: \"Kundenummer å\" }"))
+    asyncio.run(write("view: b { description: \"Kundenummer ø\" }"))
+    writer.close()
+
+    assert (writer.written, writer.unchanged) == (2, 1)
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "view: b { description: \"Kundenummer ø\" }"
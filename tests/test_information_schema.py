@@ -0,0 +1,87 @@
+import copy
+import json
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.databases.bigquery.information_schema import parse_data_type, rows_to_table_schemas
+from tests.fixtures.bigquery import fixture_1
+
+WEEKLY_DATA_TYPE = (
+    "ARRAY<STRUCT<question_cohort_week_id STRING, start_of_week DATE, duration_seconds INT64, "
+    "number_of_people INT64, answer_value_response_information "
+    "ARRAY<STRUCT<question_cohort_week_answer_id STRING, answer_value STRING(10)>>>>"
+)
+
+# rows of COLUMNS_QUERY as returned by BigQuery for the table in fixture_1
+RECORDED_ROWS = [
+    ("pk_obt", 1, "STRING", 1, "pk_obt", "pk of the table"),
+    ("weekly_data", 2, WEEKLY_DATA_TYPE, None, "weekly_data", ""),
+    ("weekly_data", 2, WEEKLY_DATA_TYPE, None, "weekly_data.question_cohort_week_id", "pk of the week"),
+    ("weekly_data", 2, WEEKLY_DATA_TYPE, None, "weekly_data.start_of_week", ""),
+    ("weekly_data", 2, WEEKLY_DATA_TYPE, None, "weekly_data.duration_seconds", "x."),
+    ("weekly_data", 2, WEEKLY_DATA_TYPE, None, "weekly_data.number_of_people", ""),
+    ("weekly_data", 2, WEEKLY_DATA_TYPE, None, "weekly_data.answer_value_response_information", ""),
+    (
+        "weekly_data", 2, WEEKLY_DATA_TYPE, None,
+        "weekly_data.answer_value_response_information.question_cohort_week_answer_id", "pk of the answer",
+    ),
+    ("weekly_data", 2, WEEKLY_DATA_TYPE, None, "weekly_data.answer_value_response_information.answer_value", ""),
+]
+
+
+def _rows():
+    for column_name, position, data_type, clustering, field_path, description in RECORDED_ROWS:
+        yield {
+            "table_name": "table_id",
+            "column_name": column_name,
+            "ordinal_position": position,
+            "is_nullable": "YES",
+            "data_type": data_type,
+            "clustering_ordinal_position": clustering,
+            "field_path": field_path,
+            "description": description,
+            "last_modified_time": "1700000000000",
+        }
+
+
+def test_parse_data_type():
+    """Standard sql types are parsed into the legacy tables.get shape"""
+    assert parse_data_type("INT64") == {"type": "INTEGER", "mode": "NULLABLE"}
+    assert parse_data_type("ARRAY<NUMERIC(10, 2)>") == {"type": "NUMERIC", "mode": "REPEATED"}
+    assert parse_data_type("STRUCT<`from` STRING NOT NULL, b ARRAY<BOOL>>") == {
+        "type": "RECORD",
+        "mode": "NULLABLE",
+        "fields": [
+            {"name": "from", "type": "STRING", "mode": "REQUIRED"},
+            {"name": "b", "type": "BOOLEAN", "mode": "REPEATED"},
+        ],
+    }
+
+
+def test_information_schema_rows_match_tables_get():
+    """Rows from INFORMATION_SCHEMA parse into the same table as the tables.get response"""
+    schemas = rows_to_table_schemas("project_id", "dataset", _rows())
+    rebuilt = schemas["table_id"]
+
+    assert rebuilt["lastModifiedTime"] == "1700000000000"
+    assert rebuilt["clustering"] == {"fields": ["pk_obt"]}
+
+    expected = json.loads(fixture_1)
+    assert _without_nullable_mode(rebuilt["schema"]["fields"]) == expected["schema"]["fields"]
+
+    expected["tableReference"] = {"projectId": "project_id", "datasetId": "dataset", "tableId": "table_id"}
+    expected["clustering"] = {"fields": ["pk_obt"]}
+    db = BigQueryDatabase()
+    assert db._parse_schema(copy.deepcopy(rebuilt)).model_dump(exclude={"fields": {"__all__": {"mode"}}}) == (
+        db._parse_schema(expected).model_dump(exclude={"fields": {"__all__": {"mode"}}})
+    )
+
+
+def _without_nullable_mode(fields):
+    """tables.get leaves out the mode of nullable fields"""
+    return [
+        {
+            k: _without_nullable_mode(v) if k == "fields" else v
+            for k, v in field.items()
+            if not (k == "mode" and v == "NULLABLE")
+        }
+        for field in fields
+    ]
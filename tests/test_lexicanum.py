@@ -0,0 +1,64 @@
+import os
+import pytest
+from pydantic import ValidationError
+from looker_loader.tools.lexicanum import LexicanumStore
+
+
+@pytest.fixture
+def lexicanum_path(tmp_path):
+    path = tmp_path / "lexicanum.yml"
+    path.write_text("customer_id:\n  label: Customer\nbroken:\n  label: [not, a, label]\n")
+    return path
+
+
+def test_entries_are_validated_when_looked_up(lexicanum_path, tmp_path):
+    store = LexicanumStore(str(lexicanum_path), cache_path=str(tmp_path / "cache"))
+
+    assert store.get("customer_id").label == "Customer"
+    assert store.get("unknown") is None
+    with pytest.raises(ValidationError):
+        store.get("broken")
+
+
+def test_sidecar_is_used_until_the_yaml_changes(lexicanum_path, tmp_path):
+    cache = str(tmp_path / "cache")
+    LexicanumStore(str(lexicanum_path), cache_path=cache).get("customer_id")
+    assert os.path.exists(os.path.join(cache, "lexicanum.json"))
+
+    # same size and mtime, so the sidecar is read instead of the yaml
+    stat = os.stat(lexicanum_path)
+    lexicanum_path.write_text(lexicanum_path.read_text().replace("Customer", "Cached!!"))
+    os.utime(lexicanum_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert LexicanumStore(str(lexicanum_path), cache_path=cache).get("customer_id").label == "Customer"
+
+    os.utime(lexicanum_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert LexicanumStore(str(lexicanum_path), cache_path=cache).get("customer_id").label == "Cached!!"
+
+
+def test_only_new_names_are_appended_on_save(lexicanum_path, tmp_path):
+    store = LexicanumStore(str(lexicanum_path), cache_path=str(tmp_path / "cache"))
+    store.add("customer_id")
+    store.save()
+    mtime = os.stat(lexicanum_path).st_mtime_ns
+
+    store.add("order_id")
+    store.add("amount")
+    assert store.get("order_id") is None
+    store.save()
+
+    assert os.stat(lexicanum_path).st_mtime_ns != mtime
+    assert lexicanum_path.read_text().endswith("amount:\n  label: null\norder_id:\n  label: null\n")
+    reloaded = LexicanumStore(str(lexicanum_path), cache_path=str(tmp_path / "cache"))
+    assert set(reloaded.entries) == {"customer_id", "broken", "amount", "order_id"}
+
+
+def test_save_keeps_a_yaml_without_entries(tmp_path):
+    path = tmp_path / "lexicanum.yml"
+    path.write_text("# labels of the shared fields\n# customer_id:\n#   label: Customer")
+    store = LexicanumStore(str(path), cache_path=str(tmp_path / "cache"))
+    store.add("order_id")
+    store.save()
+
+    assert path.read_text() == (
+        "# labels of the shared fields\n# customer_id:\n#   label: Customer\norder_id:\n  label: null\n"
+    )
@@ -0,0 +1,119 @@
+import copy
+import io
+
+import lkml
+
+from looker_loader.models.config import DatasetConfig
+from looker_loader.models.looker import LookerView
+from looker_loader.tools.lkml_converter import LookmlWriter, MultilineIndenter, convert_to_lkml
+
+VIEW = {
+    "name": "orders",
+    "sql_table_name": "project.dataset.orders",
+    "dimensions": [
+        {"name": "id", "type": "number", "sql": "${TABLE}.id", "primary_key": True, "hidden": True},
+        {
+            "name": "status",
+            "type": "string",
+            "sql": "CASE\n  WHEN ${TABLE}.status = 'a' THEN 'Active'\n  ELSE 'Other'\nEND",
+            "description": "The status,\nwith a \"quoted\" word",
+            "html": "<a href=\"/x\">\n{{ value }}</a>",
+            "tags": ["a", "b", "c", "d", "e"],
+            "label": None,
+            "alias": [],
+        },
+        {"name": "created_at", "type": "timestamp", "sql": "${TABLE}.created_at", "timeframes": ["raw", "date"]},
+    ],
+    "measures": [
+        {"name": "m_sum_amount", "type": "sum", "sql": "${amount}", "value_format_name": "usd", "group_label": "Amounts"},
+    ],
+}
+
+EXPLORE = {
+    "name": "orders",
+    "hidden": "yes",
+    "joins": [
+        {
+            "name": "orders__items",
+            "sql": "LEFT JOIN UNNEST(${orders.items}) AS orders__items",
+            "type": "left_outer",
+            "relationship": "one_to_many",
+            "required_joins": None,
+        }
+    ],
+}
+
+
+def fix_multiline_indentation(text):
+    """Indent the multiline values of text written by lkml.dump, like the writer does while writing"""
+    indenter = MultilineIndenter()
+    return "\n".join(indenter.feed(line) for line in text.split("\n"))
+
+
+def remove_empty_from_dict(data):
+    """Recursively remove None and empty list values, the converter dropped them before lkml.dump"""
+    if isinstance(data, dict):
+        return {
+            k: remove_empty_from_dict(v)
+            for k, v in data.items()
+            if v is not None and (not isinstance(v, list) or len(v) > 0)
+        }
+    if isinstance(data, list):
+        return [
+            remove_empty_from_dict(item)
+            for item in data
+            if item is not None and (not isinstance(item, list) or len(item) > 0)
+        ]
+    return data
+
+
+def _views():
+    return [LookerView(**copy.deepcopy(VIEW), config=DatasetConfig())]
+
+
+def _lkml_dump(views, explore):
+    """The output of the converter before the writer, through lkml.dump"""
+    document = {"views": [remove_empty_from_dict(view.model_dump(exclude_none=True)) for view in views]}
+    if explore is not None:
+        document = {"explore": remove_empty_from_dict(explore), **document}
+    return fix_multiline_indentation(lkml.dump(document))
+
+
+def test_writer_matches_lkml_dump():
+    assert convert_to_lkml(_views(), EXPLORE) == _lkml_dump(_views(), EXPLORE)
+    assert convert_to_lkml(_views(), None) == _lkml_dump(_views(), None)
+
+
+def test_writer_output_loads_back():
+    loaded = lkml.load(convert_to_lkml(_views(), EXPLORE))
+
+    view = loaded["views"][0]
+    dimensions = {d["name"]: d for d in view["dimensions"]}
+    assert view["sql_table_name"] == "project.dataset.orders"
+    assert dimensions["status"]["tags"] == ["a", "b", "c", "d", "e"]
+    assert "label" not in dimensions["status"]
+    assert view["dimension_groups"][0]["timeframes"] == ["raw", "date"]
+    assert view["measures"][0]["value_format_name"] == "usd"
+    assert loaded["explores"][0]["joins"][0]["sql"] == "LEFT JOIN UNNEST(${orders.items}) AS orders__items"
+
+
+def test_multiline_values_are_indented_below_their_field():
+    output = convert_to_lkml(_views(), None)
+
+    assert '    html: <a href="/x">\n      {{ value }}</a> ;;' in output
+    assert '    description: "The status,\n      with a \\"quoted\\" word"' in output
+
+
+def test_writer_streams_generic_documents():
+    document = {
+        "views": [{
+            "name": "v",
+            "filters": [{"name": "region", "type": "string"}],
+            "sets": [{"name": "s", "fields": ["a", "b", "c", "d", "e", "f"]}],
+            "dimension": {"suggestions": ["x", "y"], "link": {"label": "L", "url": "u"}},
+        }]
+    }
+    buffer = io.StringIO()
+    LookmlWriter(buffer).write(document)
+
+    assert buffer.getvalue() == fix_multiline_indentation(lkml.dump(document))
@@ -0,0 +1,44 @@
+from looker_loader.models.config import DatasetConfig
+from looker_loader.tools import manifest as manifest_module
+from looker_loader.tools.manifest import Manifest
+
+
+def test_manifest_skips_only_unchanged_tables(tmp_path):
+    """A table is unchanged only when its version, fingerprint and output file all match"""
+    view = tmp_path / "table.view.lkml"
+    view.write_text("view: table {}")
+    version = {"etag": "abc", "last_modified": "1"}
+    fingerprint = Manifest.fingerprint("recipe", DatasetConfig(), {"pk": {"label": "Key"}})
+
+    manifest = Manifest(str(tmp_path / "state" / "manifest.json"))
+    manifest.update("p.d.table", version, fingerprint, str(view))
+    manifest.save()
+
+    loaded = Manifest(manifest.path).load()
+    assert loaded.is_unchanged("p.d.table", version, fingerprint, str(view))
+    assert not loaded.is_unchanged("p.d.table", {"etag": "def", "last_modified": "2"}, fingerprint, str(view))
+    assert not loaded.is_unchanged(
+        "p.d.table", version, Manifest.fingerprint("recipe", DatasetConfig(explore=False), None), str(view)
+    )
+
+    view.unlink()
+    assert not loaded.is_unchanged("p.d.table", version, fingerprint, str(view))
+
+
+def test_prune_forgets_only_dropped_tables_of_the_run_datasets(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    version = {"etag": "abc", "last_modified": "1"}
+    for key in ("p.d.kept", "p.d.dropped", "p.other.table"):
+        manifest.update(key, version, "fingerprint", f"{key}.view.lkml")
+
+    assert manifest.prune({"p.d.kept"}, {"p.d"}) == ["p.d.dropped.view.lkml"]
+    assert sorted(manifest.tables) == ["p.d.kept", "p.other.table"]
+
+
+def test_fingerprint_changes_with_the_code_of_the_package(monkeypatch):
+    """An upgrade of the package regenerates the tables, even when nothing else changed"""
+    fingerprint = Manifest.fingerprint("recipe", DatasetConfig(), None)
+    assert Manifest.fingerprint("recipe", DatasetConfig(), None) == fingerprint
+
+    monkeypatch.setattr(manifest_module, "code_fingerprint", lambda: "upgraded")
+    assert Manifest.fingerprint("recipe", DatasetConfig(), None) != fingerprint
@@ -0,0 +1,45 @@
+from looker_loader.models.config import Config
+from looker_loader.tools import model_cache
+from looker_loader.tools.model_cache import ModelCache
+
+CONFIG = """
+config:
+  bigquery:
+    - project_id: p
+      dataset_id: d
+"""
+
+
+def test_models_are_cached_on_the_content_of_the_file(tmp_path, monkeypatch):
+    path = tmp_path / "loader_config.yml"
+    path.write_text(CONFIG)
+    cache = ModelCache(str(tmp_path / "cache"))
+
+    first = cache.load(str(path), Config, section="config")
+    # every load gets its own copy, mutating one does not change the next
+    first.bigquery[0].dataset_id = "mutated"
+    second = cache.load(str(path), Config, section="config")
+    assert second is not first and second.bigquery[0].dataset_id == "d"
+
+    # a new process reads the cached json instead of parsing the yaml again
+    monkeypatch.setattr(model_cache, "_memory", {})
+    monkeypatch.setattr(model_cache.yaml, "load", lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError))
+    assert cache.load(str(path), Config, section="config") == second
+    monkeypatch.undo()
+
+    path.write_text(CONFIG.replace("dataset_id: d", "dataset_id: e"))
+    assert cache.load(str(path), Config, section="config").bigquery[0].dataset_id == "e"
+
+
+def test_unreadable_or_stale_entries_are_ignored(tmp_path):
+    path = tmp_path / "loader_config.yml"
+    path.write_text(CONFIG)
+    cache = ModelCache(str(tmp_path / "cache"))
+    cache.load(str(path), Config, section="config")
+    entry = tmp_path / "cache" / "models" / "Config-config.json"
+    assert entry.exists()
+
+    for content in ("not the key\n{}", entry.read_text().split("\n")[0] + "\nnot json", ""):
+        entry.write_text(content)
+        model_cache._memory.clear()
+        assert cache.load(str(path), Config, section="config").bigquery[0].dataset_id == "d"
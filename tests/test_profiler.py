@@ -0,0 +1,113 @@
+import asyncio
+import json
+import pytest
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.generator.lookml import LookmlGenerator
+from looker_loader.generator.renderer import RenderPool
+from looker_loader.models.config import DatasetConfig
+from looker_loader.models.recipe import CookBook
+from looker_loader.tools.file_writer import FileWriter
+from looker_loader.profiling import Profiler, profiler, summarize
+from looker_loader.tools.recipe_mixer import RecipeMixer
+from tests.test_recipe_mixer import COOKBOOK
+from tests.fixtures.bigquery import fixture_1
+
+
+def _jobs(output_dir, tables=3):
+    jobs = []
+    for i in range(tables):
+        table_json = json.loads(fixture_1)
+        table_json["tableReference"] = {"projectId": "p", "datasetId": "d", "tableId": f"table_{i}"}
+        jobs.append({
+            "schema": BigQueryDatabase()._parse_schema(table_json),
+            "config": DatasetConfig(),
+            "output_dir": str(output_dir),
+            "file_path": f"table_{i}.view.lkml",
+        })
+    return jobs
+
+
+def test_summarize_reports_nearest_rank_percentiles():
+    summary = summarize(list(range(1, 101)))
+
+    assert summary["count"] == 100
+    assert summary["p50"] == 50
+    assert summary["p95"] == 95
+    assert summary["max"] == 100
+
+
+def test_disabled_profiler_records_nothing():
+    p = Profiler()
+    with p.stage("mixturize"):
+        p.count("bytes_written", 10)
+        p.observe("recipes_per_field", 2)
+
+    assert p.drain() is None
+    assert p.report()["stages_ms"] == {}
+
+
+def test_drained_samples_merge_into_another_profiler():
+    worker, main = Profiler(), Profiler()
+    worker.enable()
+    main.enable()
+    with worker.table("p.d.t"), worker.stage("generate"):
+        worker.count("mixture_cache.hits", 3)
+        worker.count("mixture_cache.misses")
+
+    main.merge(worker.drain())
+    report = main.report()
+
+    assert report["stages_ms"]["generate"]["count"] == 1
+    assert list(report["tables_seconds"]["p.d.t"]) == ["generate"]
+    assert report["caches"]["mixture_cache"] == {"hits": 3, "misses": 1, "hit_rate": 0.75}
+    assert worker.report()["counters"] == {}
+
+
+def _render(jobs, workers=1):
+    """Convert the jobs on the render pool of the cli and write them, merging the samples of the workers"""
+    pool = RenderPool(RecipeMixer(CookBook(**COOKBOOK)), LookmlGenerator(cli_args=None), workers)
+    writer = FileWriter(max_workers=1)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for job in jobs:
+            contents, samples = await loop.run_in_executor(pool.executor, pool.render, job)
+            profiler.merge(samples)
+            await writer.write(job["output_dir"], job["file_path"], contents, table=job["schema"].sql_table_name)
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+        writer.close()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rendering_is_profiled_per_stage_and_table(tmp_path, workers):
+    profiler.enable()
+    try:
+        _render(_jobs(tmp_path), workers)
+        report = profiler.report()
+    finally:
+        profiler.disable()
+
+    for stage in ("mixturize", "generate", "convert_to_lkml", "write"):
+        assert report["stages_ms"][stage]["count"] == 3
+    assert set(report["tables_seconds"]) == {"p.d.table_0", "p.d.table_1", "p.d.table_2"}
+    assert report["counters"]["files_written"] == 3
+    assert report["counters"]["bytes_written"] == sum(f.stat().st_size for f in tmp_path.iterdir())
+    assert report["distributions"]["recipes_per_field"]["count"] > 0
+
+
+def test_recipe_counts_are_bounded_by_the_mixture_cache():
+    mixer = RecipeMixer(CookBook(**COOKBOOK), cache_size=2)
+    profiler.enable()
+    try:
+        for job in _jobs("unused", tables=1):
+            mixer.mixturize(job["schema"], job["config"])
+        report = profiler.report()
+    finally:
+        profiler.disable()
+
+    assert len(mixer._recipe_counts) == len(mixer.cache) == 2
+    assert report["distributions"]["recipes_per_field"]["count"] > 2
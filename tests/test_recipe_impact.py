@@ -0,0 +1,72 @@
+import copy
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.models.recipe import CookBook
+from looker_loader.tools.recipe_impact import RecipeImpact, changed_recipes, cookbook_digest
+from looker_loader.tools.recipe_index import RecipeIndex
+
+COOKBOOK = {
+    "recipes": [
+        {"name": "primary_key", "filters": {"field_order": [0]}, "dimension": {"primary_key": True}},
+        {"name": "ids", "filters": {"regex_include": "_id$|^pk_"}, "dimension": {"group_label": "Ids"}},
+        {"name": "numbers", "filters": {"types": ["number"], "regex_exclude": "_id$"}, "dimension": {}},
+        {"name": "seconds", "filters": {"types": ["number"], "regex_include": "_seconds$"}, "dimension": {}},
+        {"name": "nested", "filters": {"is_nested": True}, "dimension": {}},
+    ]
+}
+
+
+def _table():
+    return BigQueryDatabase()._parse_schema({
+        "tableReference": {"projectId": "p", "datasetId": "d", "tableId": "table_id"},
+        "schema": {"fields": [
+            {"name": "pk_obt", "type": "STRING"},
+            {"name": "customer_id", "type": "INTEGER"},
+            {"name": "duration_seconds", "type": "INTEGER"},
+            {"name": "wait_seconds", "type": "FLOAT"},
+        ]},
+    })
+
+
+def _impact(cookbook: dict, previous: list = None) -> RecipeImpact:
+    cookbook = CookBook(**copy.deepcopy(cookbook))
+    return RecipeImpact(RecipeIndex(cookbook), cookbook, previous=previous)
+
+
+def test_changed_recipes_between_digests():
+    """Edited, added and removed recipes are found by name, reordering changes every mixture"""
+    old = cookbook_digest(CookBook(**copy.deepcopy(COOKBOOK)))
+    edited = copy.deepcopy(COOKBOOK)
+    edited["recipes"][3]["dimension"] = {"group_label": "Duration"}
+    edited["recipes"].pop(4)
+    edited["recipes"].insert(0, {"name": "dates", "filters": {"types": ["date"]}, "dimension": {}})
+
+    assert changed_recipes(old, cookbook_digest(CookBook(**edited))) == {"seconds", "nested", "dates"}
+    assert changed_recipes(old, old) == set()
+    assert changed_recipes(None, old) is None
+
+    reordered = copy.deepcopy(COOKBOOK)
+    reordered["recipes"].reverse()
+    assert changed_recipes(old, cookbook_digest(CookBook(**reordered))) is None
+
+
+def test_only_tables_matching_a_changed_recipe_change():
+    """A table depends on the recipes it matches, the matches of unchanged recipes come from the last run"""
+    table = _table()
+    before = _impact(COOKBOOK)
+    matches = before.matches(table)
+    assert matches == {"primary_key": 1, "ids": 2, "numbers": 2, "seconds": 2}
+
+    unrelated = copy.deepcopy(COOKBOOK)
+    unrelated["recipes"][4]["dimension"] = {"hidden": True}
+    after = _impact(unrelated, previous=before.digest)
+    assert after.matches(table, previous=matches) == matches
+    assert after.recipe_hash(matches) == before.recipe_hash(matches)
+    assert after.affected_by(matches, matches) == {}
+
+    edited = copy.deepcopy(COOKBOOK)
+    edited["recipes"][3]["filters"] = {"regex_include": "^duration"}
+    after = _impact(edited, previous=before.digest)
+    rematched = after.matches(table, previous=matches)
+    assert rematched == {"primary_key": 1, "ids": 2, "numbers": 2, "seconds": 1}
+    assert after.recipe_hash(rematched) != before.recipe_hash(matches)
+    assert after.affected_by(rematched, matches) == {"seconds": (2, 1)}
@@ -0,0 +1,72 @@
+from benchmarks.warehouse import SCENARIOS, generate_cookbook, generate_warehouse
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.models.recipe import CookBook, RecipeFilter
+from looker_loader.tools.batch_matcher import BatchMatcher
+from looker_loader.tools.recipe_index import RecipeIndex
+
+COOKBOOK = {
+    "recipes": [
+        {"name": "primary_key", "filters": {"field_order": [0]}, "dimension": {"primary_key": True}},
+        {"name": "ids", "filters": {"regex_include": "_id$|^pk_"}, "dimension": {"group_label": "Ids"}},
+        {"name": "numbers", "filters": {"types": ["number"], "regex_exclude": "_id$"}, "dimension": {}},
+        {"name": "seconds", "filters": {"types": ["number"], "regex_include": "_seconds$"}, "dimension": {}},
+        {"name": "strings_in_table", "filters": {"types": ["string"], "table_regex_include": "^table"}, "dimension": {}},
+        {"name": "nested", "filters": {"is_nested": True}, "dimension": {}},
+    ]
+}
+
+
+def _fields():
+    table_json = {
+        "tableReference": {"projectId": "p", "datasetId": "d", "tableId": "table_id"},
+        "schema": {"fields": [
+            {"name": "pk_obt", "type": "STRING"},
+            {"name": "customer_id", "type": "INTEGER"},
+            {"name": "duration_seconds", "type": "INTEGER"},
+            {"name": "scores", "type": "FLOAT", "mode": "REPEATED"},
+        ]},
+    }
+    table = BigQueryDatabase()._parse_schema(table_json)
+
+    return {field.name: field for field in table.fields}
+
+
+def test_index_matches_recipes_in_cookbook_order():
+    """Only recipes whose filters match are returned, in the order of the cookbook"""
+    index = RecipeIndex(CookBook(**COOKBOOK))
+    fields = _fields()
+
+    assert [r.name for r in index.match(fields["pk_obt"])] == ["primary_key", "ids", "strings_in_table"]
+    assert [r.name for r in index.match(fields["customer_id"])] == ["ids"]
+    assert [r.name for r in index.match(fields["duration_seconds"])] == ["numbers", "seconds"]
+    assert [r.name for r in index.match(fields["scores"])] == ["numbers"]
+    assert [r.name for r in index.match(fields["scores"].fields[0])] == ["numbers"]
+
+
+
+def test_filters_of_the_cookbook_are_compiled_once():
+    cookbook = CookBook(**COOKBOOK)
+    index = RecipeIndex(cookbook)
+    ids = cookbook.recipes[1].filters
+
+    assert index.compiled_filter(ids) is index.recipes[1].filter
+    other = RecipeFilter(regex_include="_id$")
+    assert index.compiled_filter(other).filter is other
+    assert index.compiled_filter(other).matches(_fields()["customer_id"])
+
+
+def test_batch_matches_every_field_like_the_index():
+    """The batch match matrix holds the recipes the index matches for every field, in cookbook order"""
+    def all_fields(fields):
+        for field in fields or []:
+            yield field
+            yield from all_fields(field.fields)
+
+    batches = [(RecipeIndex(CookBook(**COOKBOOK)), list(all_fields(_fields().values())))]
+    for scenario in (SCENARIOS["wide"], SCENARIOS["nested"]):
+        index = RecipeIndex(CookBook(**generate_cookbook(scenario)))
+        for table_json in generate_warehouse(scenario)[:3]:
+            batches.append((index, list(all_fields(BigQueryDatabase()._parse_schema(table_json).fields))))
+
+    for index, fields in batches:
+        assert BatchMatcher(index).match(fields) == [index.match_compiled(field) for field in fields]
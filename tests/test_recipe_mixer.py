@@ -0,0 +1,140 @@
+import copy
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.models.config import DatasetConfig
+from looker_loader.models.recipe import CookBook
+from looker_loader.tools.mixture_cache import MISSING, MixtureCache
+from looker_loader.tools.recipe_mixer import RecipeMixer
+
+COOKBOOK = {
+    "recipes": [
+        {
+            "name": "ids",
+            "filters": {"regex_include": "_id$"},
+            "dimension": {"group_label": "Ids", "measures": [{"type": "count_distinct"}]},
+        },
+        {"name": "numbers", "filters": {"types": ["number"]}, "dimension": {"value_format_name": "decimal_1"}},
+    ]
+}
+
+
+def _table(name, fields):
+    return BigQueryDatabase()._parse_schema({
+        "tableReference": {"projectId": "p", "datasetId": "d", "tableId": name},
+        "schema": {"fields": fields},
+    })
+
+
+def test_identical_fields_across_tables_share_a_cached_mixture():
+    """The same column in two tables is mixed once, and hits are safe to mutate"""
+    mixer = RecipeMixer(CookBook(**COOKBOOK))
+    config = DatasetConfig()
+    first = _table("orders", [{"name": "customer_id", "type": "INTEGER"}]).fields[0]
+    second = _table("payments", [{"name": "customer_id", "type": "INTEGER"}]).fields[0]
+
+    mixture = mixer.create_mixture(first, config)
+    mixture["measures"].append({"type": "sum"})
+    cached = mixer.create_mixture(second, config)
+
+    assert mixer.cache.stats()["hits"] == 1
+    assert cached["group_label"] == "Ids"
+    assert cached["value_format_name"] == "decimal_1"
+    assert len(cached["measures"]) == 1
+
+    mixer.mixturize(_table("orders", [{"name": "customer_id", "type": "INTEGER"}]), config)
+    mixer.mixturize(_table("payments", [{"name": "customer_id", "type": "INTEGER"}]), config)
+    assert mixer.create_mixture(first, config) == cached
+
+
+def test_mixture_cache_evicts_least_recently_used():
+    cache = MixtureCache(maxsize=2)
+    cache.put("a", {"x": 1})
+    cache.put("b", {"x": 2})
+    cache.get("a")
+    cache.put("c", {"x": 3})
+
+    assert cache.get("a") == {"x": 1}
+    assert cache.get("c") == {"x": 3}
+    assert cache.stats()["size"] == 2
+    assert cache.get("b") is MISSING
+
+
+def test_mixture_fields_match_the_pydantic_mixture():
+    """The slotted records carry the same output attributes as LookerMixtureDimension"""
+    from looker_loader.models.mixture import DIMENSION_ATTRIBUTES, MixtureField
+    from looker_loader.models.recipe import LookerMixtureDimension
+
+    cookbook = {
+        "recipes": [{
+            "name": "amounts",
+            "filters": {"types": ["number"]},
+            "dimension": {
+                "label": "{{ name }} amount",
+                "hidden": True,
+                "measures": [{"type": "sum", "hidden": True}],
+                "variants": [{"suffix": "rounded", "sql": "ROUND(${ {{ parent_name }} })"}],
+            },
+        }]
+    }
+    mixer = RecipeMixer(CookBook(**cookbook))
+    config = DatasetConfig()
+    field = _table("orders", [{"name": "rec", "type": "RECORD", "fields": [{"name": "amount", "type": "FLOAT"}]}]).fields[0]
+    mixture = mixer.create_mixture(field, config)
+
+    model = LookerMixtureDimension(**mixer._combine_dicts(field.model_dump(), mixer.create_mixture(field, config)))
+    record = MixtureField.build(mixer._combine_dicts(mixer._field_values(field), mixture))
+
+    assert not hasattr(record, "__dict__")
+    assert record.dump() == {k: v for k, v in model.model_dump().items() if v is not None and k in DIMENSION_ATTRIBUTES}
+    assert record.dump_measures()[0]["name"] == "m_sum_rec__amount"
+    assert [v.name for v in mixer._flatten_mixture(record)] == ["d_rec.amount_rounded"]
+    assert record.variants[0].attributes["sql"] == "ROUND(${rec.amount})"
+    assert "description" not in record.dump(include_descriptions=False)
+
+
+def test_combine_dicts_does_not_mutate_its_inputs():
+    mixer = RecipeMixer(CookBook(**COOKBOOK))
+    first = {"name": "a", "measures": [{"type": "sum"}], "tags": ["x"]}
+    second = {"measures": [{"type": "sum"}, {"type": "max", "filters": [{"filter_dimension": "a", "filter_expression": "b"}]}], "tags": ["y", "x"]}
+    third = {"measures": [{"type": "max", "filters": [{"filter_dimension": "a", "filter_expression": "b"}]}], "label": "L"}
+    before = copy.deepcopy([first, second, third])
+
+    combined = mixer._combine_dicts(first, second, third, conflict_resolution="last")
+
+    assert [first, second, third] == before
+    assert combined["measures"] == [{"type": "sum"}, second["measures"][1]]
+    assert combined["tags"] == ["x", "y"]
+    assert combined["label"] == "L"
+    assert combined["measures"][1] is second["measures"][1]
+
+
+def test_mixing_leaves_the_compiled_recipes_untouched():
+    mixer = RecipeMixer(CookBook(**COOKBOOK))
+    before = copy.deepcopy([r.dimension for r in mixer.index.recipes])
+
+    mixer.mixturize(_table("orders", [{"name": "customer_id", "type": "INTEGER"}, {"name": "order_id", "type": "INTEGER"}]), DatasetConfig())
+
+    assert [r.dimension for r in mixer.index.recipes] == before
+
+
+def test_batch_matched_tables_mix_like_field_by_field():
+    """A table matched in one batch gets the same mixture as one matched field by field"""
+    table = _table("orders", [
+        {"name": "order_id", "type": "STRING"},
+        {"name": "amount", "type": "FLOAT"},
+        {"name": "shipping", "type": "RECORD", "fields": [
+            {"name": "carrier_id", "type": "INTEGER"},
+            {"name": "weight", "type": "FLOAT"},
+        ]},
+        {"name": "discounts", "type": "FLOAT", "mode": "REPEATED"},
+    ])
+    config = DatasetConfig()
+
+    def dumps(mixture):
+        return [(field.dump(), field.dump_measures()) for field in mixture.fields]
+
+    expected = RecipeMixer(CookBook(**COOKBOOK)).mixturize(table, config)
+    batched = RecipeMixer(CookBook(**COOKBOOK), batch_min_fields=6)
+
+    assert batched._batch_match(table) is not None
+    assert dumps(batched.mixturize(table, config)) == dumps(expected)
+    assert batched._batch_matches is None
@@ -0,0 +1,10 @@
+from jinja2 import Environment
+from looker_loader.models.recipe import ji2, postprocess_jinja
+
+
+def test_ji2_fast_path_matches_jinja():
+    """Strings without template markers render exactly like Jinja2 would"""
+    values = {"parent_name": "amount", "label": "x"}
+    for source in ["plain", "trailing\n", "two\n\n", "", "${ amount }", "a\r\nb", "{{ parent_name }}s", "${{{ parent_name }}}/60"]:
+        expected = postprocess_jinja(Environment().from_string(source.replace("{{{", "{ {{").replace("}}}", "}} }")).render(values))
+        assert ji2("label", values, value=source) == expected
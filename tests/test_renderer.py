@@ -0,0 +1,72 @@
+import copy
+import json
+import pickle
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.generator.lookml import LookmlGenerator
+from looker_loader.generator.renderer import RenderPool
+from looker_loader.models.config import DatasetConfig
+from looker_loader.models.recipe import CookBook
+from looker_loader.tools.recipe_mixer import RecipeMixer
+from tests.test_recipe_mixer import COOKBOOK
+from tests.fixtures.bigquery import fixture_1
+
+
+def _jobs(output_dir):
+    jobs = []
+    for i in range(6):
+        table_json = json.loads(fixture_1)
+        table_json["tableReference"] = {"projectId": "p", "datasetId": "d", "tableId": f"table_{i}"}
+        jobs.append({
+            "schema": BigQueryDatabase()._parse_schema(table_json),
+            "config": DatasetConfig(explore=i % 2 == 0),
+            "output_dir": str(output_dir),
+            "file_path": f"table_{i}.view.lkml",
+        })
+    return jobs
+
+
+def _convert(jobs, mixer, lookml, workers):
+    pool = RenderPool(mixer, lookml, workers=workers)
+    try:
+        return list(pool.executor.map(pool.render, jobs))
+    finally:
+        pool.shutdown()
+
+
+def test_process_pool_converts_the_same_lookml(tmp_path):
+    """Converting on a process pool gives the same LookML as in process, with the profile samples of the workers"""
+    mixer = RecipeMixer(CookBook(**COOKBOOK))
+    lookml = LookmlGenerator(cli_args=None)
+
+    serial = _convert(_jobs(tmp_path), mixer, lookml, workers=1)
+    parallel = _convert(_jobs(tmp_path), mixer, lookml, workers=2)
+
+    assert [contents for contents, _ in parallel] == [contents for contents, _ in serial]
+    assert all(f"view: table_{i}" in contents for i, (contents, _) in enumerate(serial))
+    assert [samples for _, samples in serial + parallel] == [None] * 12
+
+
+def test_pool_converts_with_the_updated_mixer_without_restarting_workers(tmp_path):
+    """A pool kept for a watch session converts with the mixer of the last update, on the same worker processes"""
+    lookml = LookmlGenerator(cli_args=None)
+    edited = copy.deepcopy(COOKBOOK)
+    edited["recipes"].append({"name": "strings", "filters": {"types": ["string"]}, "dimension": {"group_label": "Edited"}})
+    expected = [contents for contents, _ in _convert(_jobs(tmp_path), RecipeMixer(CookBook(**edited)), lookml, 1)]
+
+    for workers in (1, 2):
+        pool = RenderPool(RecipeMixer(CookBook(**COOKBOOK)), lookml, workers=workers)
+        try:
+            before = [contents for contents, _ in pool.executor.map(pool.render, _jobs(tmp_path))]
+            processes = set(getattr(pool.executor, "_processes", None) or {})
+            pool.update(RecipeMixer(CookBook(**edited)))
+            if workers > 1:
+                # jobs carry the path of the new state, not the state itself
+                assert len(pickle.dumps(pool.render)) < 1000
+            after = [contents for contents, _ in pool.executor.map(pool.render, _jobs(tmp_path))]
+            assert processes <= set(getattr(pool.executor, "_processes", None) or {})
+        finally:
+            pool.shutdown()
+        assert pool._state_path is None
+
+        assert "Edited" not in "".join(before)
+        assert after == expected
@@ -0,0 +1,41 @@
+import asyncio
+import json
+from looker_loader.databases.bigquery.database import BigQueryDatabase
+from looker_loader.databases.bigquery.snapshot import SnapshotStore
+from tests.fixtures.bigquery import fixture_1, fixture_2
+
+
+def test_snapshot_round_trip_and_merge(tmp_path):
+    """Tables are read back individually, and later flushes keep earlier tables"""
+    store = SnapshotStore(str(tmp_path))
+    store.add("p", "d", "table_1", json.loads(fixture_1))
+    store.flush()
+
+    store = SnapshotStore(str(tmp_path))
+    store.add("p", "d", "table_2", json.loads(fixture_2))
+    store.flush()
+
+    store = SnapshotStore(str(tmp_path))
+    assert store.tables("p", "d") == ["table_1", "table_2"]
+    assert store.read("p", "d", "table_1") == json.loads(fixture_1)
+    assert store.read("p", "d", "table_2") == json.loads(fixture_2)
+    assert store.read("p", "d", "missing") is None
+    assert store.tables("p", "other") == []
+
+
+def test_database_replays_from_snapshot(tmp_path):
+    """In replay mode tables are listed and fetched from the snapshot without credentials"""
+    store = SnapshotStore(str(tmp_path))
+    store.add("p", "d", "table_1", json.loads(fixture_1))
+    store.flush()
+
+    db = BigQueryDatabase(snapshot=SnapshotStore(str(tmp_path)), replay=True)
+
+    async def list_tables():
+        return [page async for page in db.stream_tables_in_dataset("p", "d")]
+
+    assert asyncio.run(list_tables()) == [["table_1"]]
+    schema, config = asyncio.run(db._async_fetch_table_schema("p", "d", "table_1", config="c"))
+    assert schema == json.loads(fixture_1)
+    assert config == "c"
+    assert asyncio.run(db._async_fetch_table_schema("p", "d", "missing"))[0] == {}
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+import time
+
+# heavy dependencies only the code paths using them may import
+DEFERRED_MODULES = [
+    "google.auth",
+    "google.cloud.bigquery",
+    "requests",
+    "httpx",
+    "lkml",
+    "jinja2",
+    "rich",
+    "pydantic",
+]
+
+# allowed time of `looker_loader --help` over a bare interpreter, generous so it only fails on a real regression
+HELP_BUDGET_SECONDS = 0.75
+
+
+def _best_of(command: list, runs: int = 3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_importing_the_cli_defers_heavy_dependencies():
+    """The cli module imports nothing heavy, so --help and argument errors start fast"""
+    code = (
+        "import sys; import looker_loader.cli; "
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+
+    assert result.stdout.strip() == ""
+
+
+def test_help_starts_fast():
+    """--help stays within its budget over the startup of the interpreter itself"""
+    interpreter = _best_of([sys.executable, "-c", "pass"])
+    help = _best_of([sys.executable, "-m", "looker_loader.cli", "--help"])
+
+    assert help - interpreter < HELP_BUDGET_SECONDS
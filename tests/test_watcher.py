@@ -0,0 +1,20 @@
+from looker_loader.tools.watcher import FileWatcher
+
+
+def test_refresh_hides_changes_written_by_the_run(tmp_path):
+    """Field names the run appends to the lexicanum are not an edit, later edits and new files are"""
+    lexicanum = tmp_path / "lexicanum.yml"
+    recipe = tmp_path / "loader_recipe.yml"
+    lexicanum.write_text("order_id: {}\n")
+    watcher = FileWatcher([str(lexicanum), str(recipe)])
+    assert watcher.changed() == []
+
+    with open(lexicanum, "a") as f:
+        f.write("amount: {}\n")
+    watcher.refresh(str(lexicanum))
+    assert watcher.changed() == []
+
+    lexicanum.write_text("order_id:\n  label: Order\namount: {}\n")
+    recipe.write_text("recipes: []\n")
+    assert watcher.changed() == [str(lexicanum), str(recipe)]
+    assert watcher.changed() == []